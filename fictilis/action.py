@@ -10,9 +10,21 @@ class Action:
 
     По сути своей абстракция Вводов + Выводов к черному ящику
     Для Действия пишутся реализации - Стратегии
+
+    pure - Действие без побочных эффектов: если его результаты не нужны,
+    Интерпретатор вправе его не выполнять (см. BaseInterpreter.evaluate(..., outputs=))
+
+    resource_class - класс ресурсов, ограничивающий количество одновременно выполняющихся
+    Шагов с этим Действием (см. scheduling.ResourceClass)
+
+    cost - оценка стоимости выполнения (в любых, но одинаковых для всех Действий единицах);
+    используется для приоритизации Шагов по критическому пути
     """
-    def __init__(self, code, in_params=None, out_params=None):
+    def __init__(self, code, in_params=None, out_params=None, pure=False, resource_class=None, cost=1.):
         self.code = code
+        self.pure = pure
+        self.resource_class = resource_class
+        self.cost = cost
         self.inlets = dict()
         self.outlets = dict()
         self._inlets_indexes = None
@@ -125,17 +137,18 @@ class Action:
         kwinputs = self._validate_values_quality(kwvalues=kwinputs, t='in')
         return kwinputs
 
-    def validate_outputs(self, kwoutputs):
+    def validate_outputs(self, kwoutputs, outlets=None):
         """
         Валидация выходных параметров
 
         :param kwoutputs: <dict> результаты выполнения Действия
+        :param outlets: коды ожидаемых Выводов (по умолчанию - все Выводы Действия)
         :return: <dict> отвалидированные параметры Действия
                         (возможно видоизмененные: например, приведены к типам)
         """
         kwoutputs = kwoutputs or dict()
         assert isinstance(kwoutputs, dict)
-        kwoutputs = self._validate_values_quantity(kwvalues=kwoutputs, t='out')
+        kwoutputs = self._validate_values_quantity(kwvalues=kwoutputs, t='out', expected=outlets)
         kwoutputs = self._validate_values_quality(kwvalues=kwoutputs, t='out')
         return kwoutputs
 
@@ -159,9 +172,12 @@ class Action:
                 )
         return kwvalues
 
-    def _validate_values_quantity(self, kwvalues, t):
+    def _validate_values_quantity(self, kwvalues, t, expected=None):
         kwkeys = set(kwvalues.keys())
-        actionkeys = set(self.get_inlets_keys() if t == 'in' else self.get_outlets_keys())
+        if expected is not None:
+            actionkeys = set(expected)
+        else:
+            actionkeys = set(self.get_inlets_keys() if t == 'in' else self.get_outlets_keys())
         if kwkeys != actionkeys:
             unexpected = kwkeys - actionkeys
             notreceived = actionkeys - kwkeys
@@ -184,11 +200,19 @@ class Implementation:
     Стратегия действия
 
     По сути своей является реализацией Действия с помощью определенной Стратегии
+
+    resources - ключи пулов ресурсов Контекста (см. Context.register_resource), которые
+    берутся из пулов на время вызова и подставляются в Контекст, передаваемый в function
+
+    fusible - function не выполняет, а возвращает скрипт (fusion.Script); подряд идущие
+    такие Шаги одного Движка выполняются одним вызовом исполнителя (см. fusion.ScriptRunnerPool)
     """
-    def __init__(self, action, engine, function):
+    def __init__(self, action, engine, function, resources=None, fusible=False):
         self.action = action
         self.engine = engine
         self.function = function
+        self.resources = tuple(resources or ())
+        self.fusible = fusible
         ImplementationPool.register(code=action.code, engine=engine, implementation=self)
 
     @staticmethod
@@ -80,6 +80,7 @@ class AlgorithmBuilder:
             bind(cls._outlet_from_step(res[i]), alg.get_outlet(index=i))
         alg.set_params(steps=steps, binds=binds)
         alg.validate_graph()
+        alg.build_index()
         return alg
 
     @classmethod
@@ -161,6 +162,7 @@ class MagicAlgorithmBuilder(AlgorithmBuilder):
         
         old_acall = Action.__call__
         Action.__call__ = __acall__
-        result = super(MagicAlgorithmBuilder, cls)._build(builder=builder, params=params)
-        Action.__call__ = old_acall
-        return result
+        try:
+            return super(MagicAlgorithmBuilder, cls)._build(builder=builder, params=params)
+        finally:
+            Action.__call__ = old_acall
@@ -1,7 +1,12 @@
+import hashlib
+import pickle
+
+from .artifacts import ArtifactPool
 from .errors import AlreadyExistsError, NotExistsError, InvalidParams, InvalidDeclaration
 from .action import Action
-from .types import ContextType
+from .types import ContextType, Stream
 from .lets import BaseLet
+from .memory import plan_order, check_order
 
 
 class Algorithm(Action):
@@ -12,16 +17,141 @@ class Algorithm(Action):
         super(Algorithm, self).__init__(code=code, in_params=in_params, out_params=out_params)
         self.steps = None
         self.binds = None
+        self.index = None
+        # порядок последовательного выполнения Шагов (None - порядок регистрации), см. plan_memory
+        self.execution_order = None
+        self._fingerprint = None
         AlgorithmPool.register(code=code, algorithm=self)
 
     def set_params(self, steps, binds):
         self.steps = steps
         self.binds = binds
+        self.index = None
+        self.execution_order = None
+        self._fingerprint = None
+        # Алгоритм без побочных эффектов, если таковы все его Шаги
+        self.pure = all(step.action.pure for step in steps)
+
+    def required_steps(self, outputs):
+        """
+        Шаги, которые нужно выполнить, чтобы получить Выводы outputs:
+        Шаги, от которых они зависят, и Шаги с побочными эффектами (вместе с их зависимостями)
+
+        :param outputs: коды Выводов Алгоритма
+        :return: <set> номера Шагов
+        """
+        index = self.get_index()
+        demanded = set()
+        for code in outputs:
+            demanded |= index.outlet_dependencies[code]
+        demanded |= set(step.number for step in self.steps if not step.action.pure)
+        return index.closure(demanded)
+
+    def build_index(self):
+        """
+        Построение индекса зависимостей Шагов (см. DependencyIndex)
+
+        :raises: InvalidDeclaration если в графе есть цикл
+        :return: <DependencyIndex>
+        """
+        # индекс ссылается только на номера Шагов - одинаковые по устройству Алгоритмы делят один индекс
+        self.index = ArtifactPool.get_or_build(self.fingerprint(), 'index', lambda: DependencyIndex(self))
+        # стоимость Алгоритма - длина его критического пути
+        self.cost = max(self.index.critical_length.values()) if self.steps else 0.
+        return self.index
+
+    def plan_memory(self, sizes=None):
+        """
+        Выбор порядка выполнения Шагов, уменьшающего пик памяти (см. memory.plan_order);
+        дальше Шаги выполняются (последовательно) в этом порядке
+
+        :param sizes: <dict(step.number=<int>, ...)> размеры результатов Шагов, измеренные на прошлых запусках
+                      (например: Explanation.output_sizes()); по умолчанию - size_hint Параметров и Типов
+        :return: <memory.MemoryPlan>
+        """
+        if sizes is None:
+            plan = ArtifactPool.get_or_build(self.fingerprint(), 'memory_plan', lambda: plan_order(self))
+        else:
+            plan = plan_order(self, sizes)
+        self.execution_order = plan.order
+        return plan
+
+    def set_order(self, order):
+        """
+        Явное задание порядка последовательного выполнения Шагов
+        :param order: [step.number, ...] (None - порядок регистрации)
+        :raises: InvalidDeclaration, если порядок нарушает зависимости
+        """
+        if order is not None:
+            check_order(self, order)
+        self.execution_order = list(order) if order is not None else None
+
+    def get_order(self):
+        """
+        :return: [step.number, ...] порядок последовательного выполнения Шагов
+        """
+        if self.execution_order is not None:
+            return self.execution_order
+        return [step.number for step in self.steps]
+
+    def fingerprint(self):
+        """
+        Структурный отпечаток Алгоритма: хэш Действий Шагов (код, pure, cost, size_hint Выводов;
+        для вложенных Алгоритмов - их отпечатки), порядка Шагов, связей, значений констант и Типов Вводов и Выводов.
+        Код самого Алгоритма не учитывается: у одинаковых по устройству Алгоритмов отпечатки совпадают
+        (см. artifacts.ArtifactPool)
+
+        :return: <str> или None, если у Алгоритма есть несериализуемые константы (их значения не сравнить)
+        """
+        if self._fingerprint is None:
+            try:
+                structure = self._structure()
+            except _NoFingerprint:
+                return None
+            self._fingerprint = hashlib.sha256(repr(structure).encode('utf-8')).hexdigest()
+        return self._fingerprint
+
+    def _structure(self):
+        def let_key(let):
+            if isinstance(let, StepInlet):
+                return 'step', let.step.number, let.inlet.code
+            if isinstance(let, StepOutlet):
+                return 'step', let.step.number, let.outlet.code
+            if isinstance(let, BaseLet):
+                return 'let', let.code
+            # константа
+            return 'const', _value_key(let.value)
+
+        def action_key(action):
+            if isinstance(action, Algorithm):
+                fingerprint = action.fingerprint()
+                if fingerprint is None:
+                    raise _NoFingerprint
+                return 'algorithm', fingerprint
+            # от pure, cost и size_hint зависят индекс и план памяти
+            return 'action', action.code, action.pure, action.cost, tuple(
+                outlet.parameter.get_size_hint() for outlet in action.get_outlets().values())
+
+        return (
+            [(code, let.get_type().code) for code, let in self.get_inlets().items()],
+            [(code, let.get_type().code) for code, let in self.get_outlets().items()],
+            [action_key(step.action) for step in self.steps],
+            sorted((let_key(tolet), let_key(fromlet)) for tolet, fromlet in self.binds.items()))
+
+    def get_index(self):
+        """
+        Индекс зависимостей Шагов (строится один раз)
+        :return: <DependencyIndex>
+        """
+        if self.index is None:
+            self.build_index()
+        return self.index
 
     def validate_graph(self):
         """
         Валидация графа Алгоритма
         Проверяет, что у всех зарегистрированнх Шагов привязаны/"указаны" входные параметры
+        и что потоковые Выводы (types.Stream) читает не более одного потребителя
 
         :raises: InvalidDeclaration
         """
@@ -33,6 +163,15 @@ class Algorithm(Action):
                     raise InvalidDeclaration(
                         'In algorithm `{}` for step `{}` not registered inlet `{}`'.format(
                             self.code, step, stepinlet.inlet.code))
+        consumed = set()
+        for fromlet in self.binds.values():
+            if not isinstance(fromlet, StepOutlet) or not isinstance(fromlet.outlet.get_type(), Stream):
+                continue
+            if fromlet in consumed:
+                raise InvalidDeclaration(
+                    'In algorithm `{}` stream outlet `{}` of step `{}` is consumed more than once'.format(
+                        self.code, fromlet.outlet.code, fromlet.step))
+            consumed.add(fromlet)
 
     def __iter__(self):
         for step in self.steps:
@@ -46,6 +185,8 @@ class Algorithm(Action):
                 return '{}.{}'.format(let.step.action.code, let.outlet.code)
             if isinstance(let, BaseLet):
                 return let.code
+            # константа
+            return repr(let.value)
 
         return 'Algorithm: {}\n  steps:\n    {}\n  binds:\n    {}'.format(
             self.code,
@@ -53,6 +194,19 @@ class Algorithm(Action):
             '\n    '.join(_let_to_str(fromlet) + ' ---> ' + _let_to_str(tolet) for tolet, fromlet in self.binds.items()))
 
 
+class _NoFingerprint(Exception):
+    pass
+
+
+def _value_key(value):
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # id не годится: после сборки мусора он достается другому объекту
+        raise _NoFingerprint
+    return type(value).__name__, hashlib.sha256(data).hexdigest()
+
+
 class Step:
     """
     Шаг Алгоритма - действие на определенном "шаге" алгоритма
@@ -143,6 +297,141 @@ class StepOutlet:
             repr(self.step), repr(self.outlet))
 
 
+class DependencyIndex:
+    """
+    Индекс зависимостей Шагов Алгоритма
+
+    Строится один раз по binds и отвечает на вопросы о графе без полного перебора связей.
+    Шаги обозначаются своими номерами (Step.number):
+
+        consumers[n] - Шаги, использующие результаты Шага n
+        producers[n] - Шаги, результаты которых использует Шаг n
+        levels - топологические уровни: [[n, ...], ...] (Шаги уровня зависят только от предыдущих уровней)
+        level_of[n] - номер уровня Шага n
+        ancestors[n] - все Шаги, от которых (транзитивно) зависит Шаг n
+        descendants[n] - все Шаги, (транзитивно) зависящие от Шага n
+        inlet_consumers[code] - Шаги, напрямую использующие Ввод Алгоритма code
+        outlet_dependencies[code] - Шаги, необходимые для вычисления Вывода Алгоритма code
+        outputs - Шаги, результаты которых напрямую идут в Выводы Алгоритма
+        waits_for[n] - Шаги, которые должны закончиться до начала Шага n при параллельном выполнении:
+                       producers[n] и, для Шага с побочными эффектами, предыдущий такой же Шаг
+                       (побочные эффекты выполняются в порядке регистрации)
+        unblocks[n] - обратное к waits_for
+        critical_length[n] - длина (по Action.cost) самого "дорогого" пути от Шага n до конца Алгоритма
+    """
+    def __init__(self, algorithm):
+        numbers = [step.number for step in algorithm.steps]
+        consumers = {n: set() for n in numbers}
+        producers = {n: set() for n in numbers}
+        inlet_consumers = {code: set() for code in algorithm.get_inlets()}
+        for tolet, fromlet in algorithm.binds.items():
+            if not isinstance(tolet, StepInlet):
+                continue
+            if isinstance(fromlet, StepOutlet):
+                consumers[fromlet.step.number].add(tolet.step.number)
+                producers[tolet.step.number].add(fromlet.step.number)
+            elif isinstance(fromlet, BaseLet) and fromlet.code in inlet_consumers:
+                inlet_consumers[fromlet.code].add(tolet.step.number)
+
+        self.consumers = {n: frozenset(v) for n, v in consumers.items()}
+        self.producers = {n: frozenset(v) for n, v in producers.items()}
+        self.inlet_consumers = {code: frozenset(v) for code, v in inlet_consumers.items()}
+        self.levels, self.level_of = self._levels(algorithm, numbers)
+        self.order = [n for level in self.levels for n in level]
+
+        ancestors = dict()
+        for n in self.order:
+            acc = set(self.producers[n])
+            for p in self.producers[n]:
+                acc |= ancestors[p]
+            ancestors[n] = frozenset(acc)
+        descendants = dict()
+        for n in reversed(self.order):
+            acc = set(self.consumers[n])
+            for c in self.consumers[n]:
+                acc |= descendants[c]
+            descendants[n] = frozenset(acc)
+        self.ancestors = ancestors
+        self.descendants = descendants
+
+        waits_for = {n: set(producers[n]) for n in numbers}
+        previous_effect = None
+        for step in algorithm.steps:
+            if step.action.pure:
+                continue
+            if previous_effect is not None:
+                waits_for[step.number].add(previous_effect)
+            previous_effect = step.number
+        unblocks = {n: set() for n in numbers}
+        for n, before in waits_for.items():
+            for b in before:
+                unblocks[b].add(n)
+        self.waits_for = {n: frozenset(v) for n, v in waits_for.items()}
+        self.unblocks = {n: frozenset(v) for n, v in unblocks.items()}
+
+        critical_length = dict()
+        for n in reversed(self._waits_order(numbers)):
+            after = max((critical_length[u] for u in self.unblocks[n]), default=0.)
+            critical_length[n] = algorithm.steps[n].action.cost + after
+        self.critical_length = critical_length
+
+        self.outlet_dependencies = dict()
+        outputs = set()
+        for outlet in algorithm.get_outlets().values():
+            fromlet = algorithm.binds.get(outlet)
+            if isinstance(fromlet, StepOutlet):
+                n = fromlet.step.number
+                outputs.add(n)
+                self.outlet_dependencies[outlet.code] = ancestors[n] | {n}
+            else:
+                self.outlet_dependencies[outlet.code] = frozenset()
+        self.outputs = frozenset(outputs)
+
+    def _levels(self, algorithm, numbers):
+        remaining = {n: len(self.producers[n]) for n in numbers}
+        level = [n for n in numbers if remaining[n] == 0]
+        levels, level_of = [], dict()
+        while level:
+            levels.append(level)
+            following = []
+            for n in level:
+                level_of[n] = len(levels) - 1
+                for c in sorted(self.consumers[n]):
+                    remaining[c] -= 1
+                    if remaining[c] == 0:
+                        following.append(c)
+            level = sorted(following)
+        if len(level_of) != len(numbers):
+            raise InvalidDeclaration('Algorithm `{}` has cyclic dependencies between steps {}'.format(
+                algorithm.code, sorted(set(numbers) - set(level_of))))
+        return levels, level_of
+
+    def _waits_order(self, numbers):
+        # топологический порядок с учетом порядка побочных эффектов
+        remaining = {n: len(self.waits_for[n]) for n in numbers}
+        order = [n for n in numbers if remaining[n] == 0]
+        for n in order:
+            for u in sorted(self.unblocks[n]):
+                remaining[u] -= 1
+                if remaining[u] == 0:
+                    order.append(u)
+        if len(order) != len(numbers):
+            raise InvalidDeclaration('Order of steps with side effects contradicts data flow: steps {}'.format(
+                sorted(set(numbers) - set(order))))
+        return order
+
+    def closure(self, numbers):
+        """
+        Шаги, необходимые для выполнения Шагов numbers (включая их самих)
+        :param numbers: номера Шагов
+        :return: <set>
+        """
+        result = set(numbers)
+        for n in numbers:
+            result |= self.ancestors[n]
+        return result
+
+
 class AlgorithmPool:
     """
     Пул Алгоритмов
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+
+class ArtifactPool:
+    """
+    Пул артефактов, построенных по Алгоритму (индекс зависимостей, план памяти, столбцовое ядро, ...)
+
+    Ключ - структурный отпечаток Алгоритма (Algorithm.fingerprint) и вид артефакта, поэтому
+    одинаковые по устройству Алгоритмы (например, построенные MagicAlgorithmBuilder на каждый запрос
+    с новыми кодами) строят артефакт один раз. Хранится не более max_size артефактов,
+    давно не использованные вытесняются
+    """
+    _pool = OrderedDict()
+    _lock = threading.Lock()
+    max_size = 1024
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def get_or_build(fingerprint, kind, build):
+        """
+        :param fingerprint: отпечаток Алгоритма (None - у Алгоритма нет отпечатка, артефакт не кэшируется)
+        :param kind: вид артефакта (например: 'index', ('columnar', engine, ...))
+        :param build: <func()> построение артефакта (вызывается без блокировки пула)
+        :return: артефакт
+        """
+        if fingerprint is None:
+            return build()
+        key = (fingerprint, kind)
+        with ArtifactPool._lock:
+            if key in ArtifactPool._pool:
+                ArtifactPool._pool.move_to_end(key)
+                ArtifactPool.hits += 1
+                return ArtifactPool._pool[key]
+            ArtifactPool.misses += 1
+        artifact = build()
+        with ArtifactPool._lock:
+            ArtifactPool._pool[key] = artifact
+            ArtifactPool._pool.move_to_end(key)
+            while len(ArtifactPool._pool) > ArtifactPool.max_size:
+                ArtifactPool._pool.popitem(last=False)
+        return artifact
+
+    @staticmethod
+    def find(fingerprint, kind):
+        """
+        :return: артефакт | None
+        """
+        with ArtifactPool._lock:
+            return ArtifactPool._pool.get((fingerprint, kind))
+
+    @staticmethod
+    def _reset():
+        with ArtifactPool._lock:
+            ArtifactPool._pool = OrderedDict()
+            ArtifactPool.hits = 0
+            ArtifactPool.misses = 0
@@ -0,0 +1,201 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import ExitStack
+
+from . import types
+from .cancellation import poll_interval
+from .errors import AlreadyExistsError, InvalidDeclaration, InvalidParams
+from .singleflight import freeze
+
+
+class _Batch:
+    def __init__(self):
+        self.keys = dict()
+        self.calls = []
+        self.full = threading.Event()
+
+    def add(self, key, params):
+        """
+        :param key: (Контексты, отпечаток параметров) - см. BatchLoader._key
+        """
+        future = self.keys.get(key)
+        if future is None:
+            # одинаковые вызовы в пакете - одна запись
+            future = self.keys[key] = Future()
+            self.calls.append((key[0], params, future))
+        return future
+
+    def groups(self):
+        """
+        Вызовы пакета, разбитые по Контекстам
+        :return: [[(params, future), ...], ...]
+        """
+        groups = dict()
+        for contexts, params, future in self.calls:
+            groups.setdefault(contexts, []).append((params, future))
+        return list(groups.values())
+
+
+class BatchLoader:
+    """
+    Пакетный загрузчик Реализации
+
+    Вызовы Реализации (из разных Шагов и разных одновременных запусков), пришедшие в течение window секунд,
+    объединяются: loader вызывается один раз со списком параметров всех вызовов,
+    каждый вызов получает свой результат. Одинаковые вызовы в пакете объединяются.
+    Пакет отправляется раньше, если в нем набралось max_batch вызовов.
+    Вызовы с разными Контекстами не объединяются: пакет разбивается по Контекстам, и каждый вызов loader
+    получает вызовы одного Контекста; ресурсы Реализации (Implementation.resources) берутся на время
+    вызова loader.
+
+    Выигрыш - при одновременных вызовах (concurrent-исполнитель или одновременные запуски);
+    последовательный вызов просто ждет window
+
+        :param implementation: <Implementation>
+        :param loader: <func([params, ...])> -> [результат, ...] в том же порядке
+                       (каждый результат - как у function Реализации)
+        :param window: секунды, в течение которых копится пакет
+        :param max_batch: максимальный размер пакета
+    """
+    def __init__(self, implementation, loader, window=0.002, max_batch=256):
+        self.implementation = implementation
+        self.loader = loader
+        self.window = window
+        self.max_batch = max_batch
+        self._batch = None
+        self._lock = threading.Lock()
+        BatchLoaderPool.register(
+            code=implementation.action.code, engine=implementation.engine, loader=self)
+
+    def load(self, params, token=None):
+        """
+        Вызов Реализации в составе пакета
+
+        :param params: <dict> отвалидированные параметры
+        :param token: <CancellationToken> прерывание ожидания ресурсов и результата пакета
+                      (по умолчанию - токен отмены Контекста из параметров)
+        :return: результат Реализации (как его вернул бы function)
+        :raises: EvaluationCancelled
+        """
+        if token is None:
+            token = self._context_token(params)
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _Batch()
+            future = batch.add(self._key(params), params)
+            if len(batch.calls) >= self.max_batch:
+                self._batch = None
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            self._dispatch(batch, token)
+        return self._wait(future, token)
+
+    @staticmethod
+    def _wait(future, token):
+        while True:
+            try:
+                return future.result(timeout=poll_interval(token))
+            except FutureTimeout:
+                if token is not None:
+                    token.check()
+
+    def _context_token(self, params):
+        inlets = self.implementation.action.get_inlets()
+        for code, value in params.items():
+            if inlets[code].get_type() == types.ContextType and value is not None:
+                return getattr(value, 'cancellation', None)
+        return None
+
+    def _key(self, params):
+        inlets = self.implementation.action.get_inlets()
+        contexts = tuple(
+            id(value) for code, value in sorted(params.items()) if inlets[code].get_type() == types.ContextType)
+        return contexts, freeze({
+            code: value for code, value in params.items() if inlets[code].get_type() != types.ContextType})
+
+    def _checkout(self, stack, calls, token):
+        """
+        Подстановка в параметры вызовов Контекстов со взятыми ресурсами Реализации
+        :param stack: <ExitStack> ресурсы возвращаются при его закрытии
+        :return: [params, ...]
+        """
+        resources = self.implementation.resources
+        if not resources:
+            return calls
+        inlets = self.implementation.action.get_inlets()
+        contexts = [code for code, inlet in inlets.items() if inlet.get_type() == types.ContextType]
+        checked_out = dict()
+        result = []
+        for params in calls:
+            params = dict(params)
+            for code in contexts:
+                context = params.get(code)
+                if context is None:
+                    raise InvalidParams(
+                        'Implementation of `{action}` requires resources {resources}, but context is empty'.format(
+                            action=self.implementation.action.code, resources=', '.join(resources)))
+                if id(context) not in checked_out:
+                    checked_out[id(context)] = stack.enter_context(context.checkout(*resources, token=token))
+                params[code] = checked_out[id(context)]
+            result.append(params)
+        return result
+
+    def _dispatch(self, batch, token=None):
+        for calls in batch.groups():
+            self._dispatch_group(calls, token)
+
+    def _dispatch_group(self, calls, token=None):
+        """
+        Вызов loader для вызовов пакета с одними и теми же Контекстами
+        :param calls: [(params, future), ...]
+        """
+        try:
+            with ExitStack() as stack:
+                params = self._checkout(stack, [params for params, _ in calls], token)
+                results = list(self.loader(params))
+            if len(results) != len(calls):
+                raise InvalidDeclaration('Batch loader of `{}` returned {} results for {} calls'.format(
+                    self.implementation.action.code, len(results), len(calls)))
+        except BaseException as e:
+            for _, future in calls:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(calls, results):
+            future.set_result(result)
+
+
+class BatchLoaderPool:
+    """
+    Пул пакетных загрузчиков
+
+    В этом пуле хранятся BatchLoader, привязанные к Реализациям (код Действия + Движок)
+    """
+    _pool = dict()
+
+    @staticmethod
+    def register(code, engine, loader):
+        """
+        :param code: код Действия
+        :param engine: Движок
+        :param loader: <BatchLoader>
+        """
+        if (code, engine) in BatchLoaderPool._pool:
+            raise AlreadyExistsError('Batch loader for action {} with engine {} already exists'.format(code, engine))
+        BatchLoaderPool._pool[(code, engine)] = loader
+
+    @staticmethod
+    def find(code, engine):
+        """
+        :return: <BatchLoader> | None
+        """
+        return BatchLoaderPool._pool.get((code, engine))
+
+    @staticmethod
+    def _reset():
+        BatchLoaderPool._pool = dict()
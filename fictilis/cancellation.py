@@ -0,0 +1,86 @@
+import threading
+from timeit import default_timer
+
+from .errors import EvaluationCancelled
+
+CANCELLED = 'cancelled'
+DEADLINE_EXCEEDED = 'deadline exceeded'
+
+
+class CancellationToken:
+    """
+    Токен отмены выполнения
+
+    Срабатывает при явной отмене (cancel), по истечении deadline или при срабатывании родителя.
+    Интерпретатор проверяет токен перед каждым Шагом и в местах ожидания (слоты классов ресурсов,
+    пулы ресурсов Контекста, ожидание одновременно выполняющихся Шагов)
+
+        :param deadline: момент (по timeit.default_timer), после которого токен срабатывает
+        :param parent: <CancellationToken> родительский токен
+    """
+    def __init__(self, deadline=None, parent=None):
+        self.deadline = deadline
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Отменить выполнение
+        """
+        self._cancelled.set()
+
+    @property
+    def reason(self):
+        """
+        :return: причина срабатывания (CANCELLED, DEADLINE_EXCEEDED) или None
+        """
+        if self._cancelled.is_set():
+            return CANCELLED
+        if self.deadline is not None and default_timer() >= self.deadline:
+            return DEADLINE_EXCEEDED
+        return self.parent.reason if self.parent is not None else None
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    def remaining(self):
+        """
+        :return: <float> секунды до ближайшего deadline (с учетом родителей) или None
+        """
+        remaining = None if self.deadline is None else max(0., self.deadline - default_timer())
+        parent = self.parent.remaining() if self.parent is not None else None
+        if remaining is None or parent is None:
+            return parent if remaining is None else remaining
+        return min(remaining, parent)
+
+    def check(self):
+        """
+        :raises: EvaluationCancelled, если токен сработал
+        """
+        reason = self.reason
+        if reason is not None:
+            raise EvaluationCancelled(reason)
+
+    def child(self, timeout=None):
+        """
+        Дочерний токен: срабатывает вместе с этим и, дополнительно, через timeout секунд
+        :param timeout: секунды (None - без своего deadline)
+        :return: <CancellationToken>
+        """
+        return CancellationToken(deadline=None if timeout is None else default_timer() + timeout, parent=self)
+
+
+def poll_interval(token, timeout=None, interval=0.05):
+    """
+    Сколько ждать за один раз, чтобы вовремя заметить срабатывание токена
+
+    :param token: <CancellationToken> | None
+    :param timeout: оставшееся время ожидания (None - бесконечно)
+    :return: секунды или None (ждать без ограничения)
+    """
+    if token is None:
+        return timeout
+    remaining = token.remaining()
+    candidates = [t for t in (timeout, remaining, interval) if t is not None]
+    return max(0., min(candidates))
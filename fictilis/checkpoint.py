@@ -0,0 +1,171 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import warnings
+from uuid import uuid4
+
+from .errors import NotExistsError, InvalidParams
+from . import types
+
+
+def params_fingerprint(action, params, engine=None):
+    """
+    Отпечаток входов запуска: продолжать запуск можно только с теми же параметрами и Движком
+
+    :param action: выполняемое Действие
+    :param params: <dict> параметры (Контекст не учитывается)
+    :param engine: Движок (из Контекста) или None
+    :return: <str> или None, если параметры не сериализуются (тогда входы не сверяются)
+    """
+    inlets = action.get_inlets()
+    values = sorted(
+        (code, value) for code, value in params.items()
+        if code not in inlets or inlets[code].get_type() != types.ContextType)
+    try:
+        data = pickle.dumps((engine, values), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+class BaseCheckpointStore:
+    """
+    Хранилище контрольных точек
+
+    Сохраняет результаты выполненных Шагов Алгоритма по ходу выполнения,
+    что позволяет продолжить упавший запуск с первого невыполненного Шага.
+
+    Шаг идентифицируется путем - кортежем номеров Шагов от корневого Алгоритма
+    до вложенного (например: (3, 1) - Шаг №1 Алгоритма, выполняемого Шагом №3)
+    """
+
+    @staticmethod
+    def new_run_id():
+        """
+        Генерация идентификатора нового запуска
+        :return: <str>
+        """
+        return uuid4().hex
+
+    def start(self, run_id, action_code, fingerprint=None):
+        """
+        Регистрация начала (или продолжения) запуска
+
+        :param run_id: идентификатор запуска
+        :param action_code: код выполняемого Действия
+        :param fingerprint: отпечаток входов запуска (см. params_fingerprint; None - не сверяется)
+        :raises: InvalidParams если запуск с таким идентификатором принадлежит другому Действию
+                 или начат с другими параметрами
+        """
+        raise NotImplementedError
+
+    def save(self, run_id, path, results):
+        """
+        Сохранение результатов Шага
+
+        :param run_id: идентификатор запуска
+        :param path: <tuple> путь Шага
+        :param results: <dict> результаты Шага
+        """
+        raise NotImplementedError
+
+    def load(self, run_id):
+        """
+        Загрузка результатов выполненных Шагов запуска
+
+        :param run_id: идентификатор запуска
+        :return: <dict(path=results, ...)>
+        :raises: NotExistsError
+        """
+        raise NotImplementedError
+
+    def finish(self, run_id):
+        """
+        Завершение запуска - контрольные точки больше не нужны
+        :param run_id: идентификатор запуска
+        """
+        raise NotImplementedError
+
+    def list_runs(self):
+        """
+        Список незавершенных запусков
+        :return: [<run_id>, ...]
+        """
+        raise NotImplementedError
+
+
+class FileCheckpointStore(BaseCheckpointStore):
+    """
+    Хранилище контрольных точек на локальном диске
+
+    Каждый запуск - отдельная директория, каждый Шаг - отдельный pickle-файл
+    """
+    _meta = 'run.meta'
+    _suffix = '.step'
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'fictilis-checkpoints')
+
+    def _run_dir(self, run_id):
+        return os.path.join(self.directory, str(run_id))
+
+    def _write(self, filename, data):
+        # сначала пишем во временный файл: при падении посреди записи
+        # не должно остаться "битой" контрольной точки
+        tmp = '{}.{}.tmp'.format(filename, uuid4().hex)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
+
+    def start(self, run_id, action_code, fingerprint=None):
+        run_dir = self._run_dir(run_id)
+        meta = os.path.join(run_dir, self._meta)
+        if os.path.exists(meta):
+            with open(meta, 'rb') as f:
+                stored_code, stored_fingerprint = pickle.load(f)
+            if stored_code != action_code:
+                raise InvalidParams(
+                    'Run `{run_id}` was started for action `{stored}`, not `{code}`'.format(
+                        run_id=run_id, stored=stored_code, code=action_code))
+            if None not in (stored_fingerprint, fingerprint) and stored_fingerprint != fingerprint:
+                raise InvalidParams(
+                    'Run `{run_id}` was started with other params or engine: its checkpoints do not apply'.format(
+                        run_id=run_id))
+            return
+        os.makedirs(run_dir, exist_ok=True)
+        self._write(meta, pickle.dumps((action_code, fingerprint)))
+
+    def save(self, run_id, path, results):
+        try:
+            data = pickle.dumps(results)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            warnings.warn('Results of step {path} of run `{run_id}` can not be checkpointed: {e}'.format(
+                path=path, run_id=run_id, e=e))
+            return
+        filename = os.path.join(self._run_dir(run_id), '.'.join(str(p) for p in path) + self._suffix)
+        self._write(filename, data)
+
+    def load(self, run_id):
+        run_dir = self._run_dir(run_id)
+        if not os.path.exists(os.path.join(run_dir, self._meta)):
+            raise NotExistsError('Checkpoints for run `{run_id}` does not exists'.format(run_id=run_id))
+        completed = dict()
+        for filename in os.listdir(run_dir):
+            if not filename.endswith(self._suffix):
+                continue
+            path = tuple(int(p) for p in filename[:-len(self._suffix)].split('.'))
+            with open(os.path.join(run_dir, filename), 'rb') as f:
+                completed[path] = pickle.load(f)
+        return completed
+
+    def finish(self, run_id):
+        shutil.rmtree(self._run_dir(run_id), ignore_errors=True)
+
+    def list_runs(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            run_id for run_id in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self._run_dir(run_id), self._meta))]
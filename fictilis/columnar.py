@@ -0,0 +1,222 @@
+from collections import Counter
+
+from .action import Action, ImplementationPool
+from .algbuilder import Const
+from .algorithm import Algorithm
+from .artifacts import ArtifactPool
+from .errors import InvalidDeclaration
+from . import types
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy - необязательная зависимость
+    numpy = None
+
+ENGINE = 'numpy'
+
+
+class ColumnarKernel:
+    """
+    Скомпилированный Алгоритм: одна функция над столбцами (массивами numpy)
+
+    Каждый Шаг (включая Шаги вложенных Алгоритмов) - один прямой вызов Реализации Движка engine
+    над целыми столбцами, без Интерпретатора и поэлементной валидации:
+    оценка миллиона строк - по одному проходу по массивам на Шаг.
+    Шаги, Реализации которых - поэлементные функции numpy (numpy.ufunc), а результат нужен одному
+    потребителю, встраиваются в выражение потребителя: add(multiply(a, b), c) вместо промежуточных
+    переменных и обращений к Реализациям (проход по массивам на Шаг при этом остается)
+
+        :param algorithm: Алгоритм
+        :param source: текст сгенерированной функции
+        :param function: <func(context, columns)> сгенерированная функция
+        :param passes: количество вызовов Реализаций (проходов по массивам)
+        :param inlined: сколько из них встроено в выражения
+    """
+    def __init__(self, algorithm, source, function, passes, inlined=0):
+        self.algorithm = algorithm
+        self.source = source
+        self.function = function
+        self.passes = passes
+        self.inlined = inlined
+
+    def __call__(self, context=None, **columns):
+        """
+        :param context: Контекст (для Шагов с Вводом-Контекстом)
+        :param columns: значения Вводов Алгоритма: столбцы (последовательности одной длины) или скаляры
+        :return: <dict(code=<numpy.ndarray>, ...)> Выводы Алгоритма
+        """
+        return self.evaluate(columns, context)
+
+    def evaluate(self, columns, context=None):
+        inlets = self.algorithm.get_inlets()
+        values = {
+            code: _to_column(inlets[code].get_type(), value)
+            for code, value in columns.items() if inlets[code].get_type() != types.ContextType}
+        missing = set(inlets) - set(values) - set(
+            code for code, inlet in inlets.items() if inlet.get_type() == types.ContextType)
+        if missing:
+            raise InvalidDeclaration('Algorithm `{}`: Not received some columns: {}'.format(
+                self.algorithm.code, ', '.join(sorted(missing))))
+        return self.function(context, values)
+
+
+def _to_column(type_, value):
+    if type_ is types.Numeric:
+        return numpy.asarray(value, dtype=numpy.float64)
+    return numpy.asarray(value)
+
+
+class _Emitter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.lines = []
+        self.namespace = dict()
+        self.passes = 0
+        self.inlined = 0
+        self._names = 0
+
+    def name(self, prefix):
+        self._names += 1
+        return '{}{}'.format(prefix, self._names)
+
+    def constant(self, value):
+        name = self.name('c')
+        self.namespace[name] = value
+        return name
+
+    def algorithm(self, algorithm, inputs):
+        # встроенное выражение вычисляется там, где используется, - поэтому только при одном потребителе
+        uses = Counter(algorithm.binds.values())
+        values = dict()
+        for code, expr in inputs.items():
+            inlet = algorithm.get_inlet(code)
+            values[inlet] = expr if expr.isidentifier() or uses[inlet] == 1 else self.assign(expr)
+
+        def value_of(fromlet):
+            if isinstance(fromlet, Const):
+                return self.constant(fromlet.value)
+            return values[fromlet]
+
+        def expr(stepinlet):
+            if stepinlet.inlet.get_type() == types.ContextType:
+                return 'context'
+            return value_of(algorithm.binds[stepinlet])
+
+        # порядок по данным: Шаги без побочных эффектов (см. _Emitter.action)
+        for n in algorithm.get_index().order:
+            step = algorithm.steps[n]
+            args = {code: expr(stepinlet) for code, stepinlet in step.get_inlets().items()}
+            for code, out in self.action(step.action, args).items():
+                outlet = step.get_outlet(code)
+                if not out.isidentifier() and uses[outlet] != 1:
+                    out = self.assign(out)
+                values[outlet] = out
+        return {code: value_of(algorithm.binds[outlet]) for code, outlet in algorithm.get_outlets().items()}
+
+    def action(self, action, args):
+        if isinstance(action, Algorithm):
+            return self.algorithm(action, args)
+        if type(action) is not Action:
+            raise InvalidDeclaration('Step `{}` can not be compiled to columns: `{}` is not a plain action'.format(
+                action.code, action.__class__.__name__))
+        if not action.pure:
+            # ядро вызывает Реализацию один раз на весь столбец, а не на каждую строку
+            raise InvalidDeclaration('Step `{}` can not be compiled to columns: action has side effects'.format(
+                action.code))
+        implementation = ImplementationPool.get(code=action.code, engine=self.engine)
+        if isinstance(implementation, Action):
+            return self.action(implementation, args)
+        function = self.name('f')
+        self.namespace[function] = implementation.function
+        outlets = action.get_outlets_keys()
+        if _is_elementwise(implementation.function, len(args), len(outlets)):
+            # ufunc принимает аргументы по позиции - в порядке Вводов Действия
+            self.passes += 1
+            self.inlined += 1
+            call = '{}({})'.format(function, ', '.join(args[code] for code in action.get_inlets_keys()))
+            return {outlets[0]: call}
+        call = '{}({})'.format(function, ', '.join('{}={}'.format(code, arg) for code, arg in args.items()))
+        results = {code: self.name('v') for code in outlets}
+        if not outlets:
+            self.lines.append(call)
+        elif len(outlets) == 1:
+            self.lines.append('{} = {}'.format(results[outlets[0]], call))
+        else:
+            self.lines.append('{} = {}'.format(', '.join(results[code] for code in outlets), call))
+        self.passes += 1
+        return results
+
+    def assign(self, expr):
+        """
+        Вычисление встроенного выражения в переменную
+        :return: имя переменной
+        """
+        name = self.name('v')
+        self.lines.append('{} = {}'.format(name, expr))
+        return name
+
+
+def _is_elementwise(function, nargs, nresults):
+    return isinstance(function, numpy.ufunc) and function.nin == nargs and function.nout == nresults == 1
+
+
+def compile_algorithm(algorithm, engine=ENGINE):
+    """
+    Компиляция Алгоритма в функцию над столбцами
+
+    Действия Алгоритма должны быть без побочных эффектов (Action.pure), и для каждого должна быть
+    зарегистрирована Реализация Движка engine, принимающая и возвращающая массивы numpy
+    (например: Implementation(SumA, 'numpy', lambda a, b: a + b)); Реализации-ufunc
+    (Implementation(SumA, 'numpy', numpy.add)) встраиваются в выражения (см. ColumnarKernel);
+    вложенные Алгоритмы встраиваются, константы подставляются как скаляры.
+    Сгенерированная функция общая для одинаковых по устройству Алгоритмов (см. Algorithm.fingerprint)
+
+    :param algorithm: Алгоритм
+    :param engine: Движок столбцовых Реализаций
+    :return: <ColumnarKernel>
+    """
+    if numpy is None:
+        raise ImportError('numpy is required for the columnar engine')
+    # ядро хранит ссылки на функции Реализаций, поэтому их id в ключе не достанутся другим функциям
+    functions = tuple(id(function) for function in _functions(algorithm, engine))
+    kernel = ArtifactPool.get_or_build(
+        algorithm.fingerprint(), ('columnar', engine, functions), lambda: _compile(algorithm, engine))
+    if kernel.algorithm is not algorithm:
+        kernel = ColumnarKernel(algorithm, kernel.source, kernel.function, kernel.passes, kernel.inlined)
+    return kernel
+
+
+def _functions(action, engine):
+    """
+    Функции Реализаций, которые вызывает ядро (в порядке Шагов)
+    """
+    if isinstance(action, Algorithm):
+        for step in action.steps:
+            yield from _functions(step.action, engine)
+        return
+    if type(action) is not Action:
+        # такой Шаг не компилируется - ошибку выдаст _compile
+        return
+    implementation = ImplementationPool.get(code=action.code, engine=engine)
+    if isinstance(implementation, Action):
+        yield from _functions(implementation, engine)
+    else:
+        yield implementation.function
+
+
+def _compile(algorithm, engine):
+    emitter = _Emitter(engine)
+    inputs = dict()
+    for code, inlet in algorithm.get_inlets().items():
+        if inlet.get_type() == types.ContextType:
+            inputs[code] = 'context'
+        else:
+            inputs[code] = emitter.name('v')
+            emitter.lines.append('{} = columns[{!r}]'.format(inputs[code], code))
+    outputs = emitter.algorithm(algorithm, inputs)
+    emitter.lines.append('return {{{}}}'.format(
+        ', '.join('{!r}: {}'.format(code, expr) for code, expr in outputs.items())))
+    source = 'def kernel(context, columns):\n' + '\n'.join('    ' + line for line in emitter.lines) + '\n'
+    namespace = dict(emitter.namespace)
+    exec(compile(source, '<columnar {}>'.format(algorithm.code), 'exec'), namespace)
+    return ColumnarKernel(algorithm, source, namespace['kernel'], emitter.passes, emitter.inlined)
@@ -1,7 +1,183 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from timeit import default_timer
+
+from .cancellation import CancellationToken, poll_interval
+from .errors import AlreadyExistsError, NotExistsError, InvalidParams, ResourceExhausted
+
+
+class ResourcePool:
+    """
+    Пул ресурсов (например: коннектов к БД)
+
+        :param factory: <func()> создание нового ресурса
+        :param min_size: количество ресурсов, создаваемых сразу
+        :param max_size: максимальное количество одновременно существующих ресурсов
+        :param timeout: сколько (в секундах) ждать освобождения ресурса; None - ждать бесконечно
+        :param close: <func(resource)> закрытие ресурса при закрытии пула
+    """
+    def __init__(self, factory, min_size=0, max_size=10, timeout=None, close=None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise InvalidParams('Invalid pool sizes: min_size={}, max_size={}'.format(min_size, max_size))
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._close = close
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append(factory())
+            self._size += 1
+
+    def acquire(self, timeout=None, token=None):
+        """
+        Взять ресурс из пула
+        :param timeout: время ожидания (по умолчанию - из пула)
+        :param token: <CancellationToken> - ожидание прерывается при его срабатывании
+        :return: ресурс
+        :raises: ResourceExhausted, EvaluationCancelled
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else default_timer() + timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = None if deadline is None else deadline - default_timer()
+                if remaining is not None and remaining <= 0:
+                    raise ResourceExhausted('All {} resources of pool are in use'.format(self.max_size))
+                if token is not None:
+                    token.check()
+                self._cond.wait(poll_interval(token, remaining))
+            if self._idle:
+                return self._idle.popleft()
+            # создаем ресурс вне блокировки: это может быть долго
+            self._size += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, resource):
+        """
+        Вернуть ресурс в пул
+        :param resource: ресурс
+        """
+        with self._cond:
+            self._idle.append(resource)
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Менеджер контекста: ресурс берется на время блока и возвращается после
+        """
+        resource = self.acquire(timeout=timeout)
+        try:
+            yield resource
+        finally:
+            self.release(resource)
+
+    def close(self):
+        """
+        Закрыть все свободные ресурсы пула
+        """
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+        if self._close is not None:
+            for resource in idle:
+                self._close(resource)
+
+
 class Context(dict):
     """
     Контекст выполнения
 
     Особый Параметр, для которого не нужно проводить "Связывание" через указание потока данных
+
+    Кроме данных может хранить пулы ресурсов (Context.register_resource):
+    Реализация, объявившая ресурс (Implementation(..., resources=['conn'])), на время своего вызова
+    получает Контекст, в котором по ключу ресурса лежит взятый из пула экземпляр
+
+    Context.cancellation - токен отмены: context.cancellation.cancel() останавливает
+    выполнение всех Алгоритмов, запущенных с этим Контекстом
+
+    Пулы ресурсов и токен отмены относятся к текущему процессу: при сериализации и copy.copy/deepcopy
+    переносятся только данные (у копии - свои пустые пулы и свой токен). Копия, разделяющая их
+    с исходным Контекстом, - Context.copy()
     """
-    pass
+    def __init__(self, *args, **kwargs):
+        super(Context, self).__init__(*args, **kwargs)
+        self._pools = dict()
+        self.cancellation = CancellationToken()
+
+    def __reduce_ex__(self, protocol):
+        return self.__class__, (dict(self), )
+
+    def copy(self):
+        """
+        Копия данных Контекста с теми же пулами ресурсов и тем же токеном отмены
+        :return: <Context>
+        """
+        result = self.__class__(self)
+        result._pools = self._pools
+        result.cancellation = self.cancellation
+        return result
+
+    def register_resource(self, name, factory, min_size=0, max_size=10, timeout=None, close=None):
+        """
+        Регистрация пула ресурсов
+
+        :param name: ключ, по которому ресурс доступен Реализации
+        :param factory: <func()> создание нового ресурса
+        :return: <ResourcePool>
+        """
+        if name in self._pools or name in self:
+            raise AlreadyExistsError('Resource `{}` already exists in context'.format(name))
+        pool = ResourcePool(factory, min_size=min_size, max_size=max_size, timeout=timeout, close=close)
+        self._pools[name] = pool
+        return pool
+
+    def get_pool(self, name):
+        """
+        :param name: ключ ресурса
+        :return: <ResourcePool>
+        """
+        if name not in self._pools:
+            raise NotExistsError('Resource `{}` does not exists in context'.format(name))
+        return self._pools[name]
+
+    @contextmanager
+    def checkout(self, *names, token=None):
+        """
+        Менеджер контекста: взять ресурсы на время блока
+
+        :param names: ключи ресурсов
+        :param token: <CancellationToken> прерывание ожидания ресурсов (по умолчанию - Context.cancellation)
+        :return: <Context> копия Контекста, в которой по ключам лежат взятые ресурсы
+        """
+        token = token or self.cancellation
+        taken = []
+        try:
+            for name in names:
+                pool = self.get_pool(name)
+                taken.append((pool, pool.acquire(token=token)))
+            child = self.copy()
+            for name, (_, resource) in zip(names, taken):
+                child[name] = resource
+            yield child
+        finally:
+            for pool, resource in taken:
+                pool.release(resource)
+
+    def close_resources(self):
+        """
+        Закрыть все пулы ресурсов
+        """
+        for pool in self._pools.values():
+            pool.close()
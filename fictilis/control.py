@@ -0,0 +1,186 @@
+from . import types
+from .action import Action
+from .errors import InvalidDeclaration
+from .mapreduce import _get_or_create, _value_inlets
+from .parameter import Parameter
+
+CONDITION = 'condition'
+
+
+class BranchAction(Action):
+    """
+    Ветвление: выполняется только одна из веток (Действий или Алгоритмов) - then_action или else_action
+
+    Вводы - Ввод condition и объединение Вводов веток (одноименные Вводы должны иметь один Тип),
+    Выводы - общие Выводы веток (набор и Типы должны совпадать).
+    Каждая ветка получает только свои Вводы; Шаги невыбранной ветки не выполняются
+
+    В AlgorithmBuilder: step = register(BranchAction.of(Then, Else)), далее bind к step.get_inlet('condition'), ...
+    В MagicAlgorithmBuilder - см. Branch
+
+        :param code: код Действия
+        :param then_action: ветка для истинного условия
+        :param else_action: ветка для ложного условия
+    """
+    def __init__(self, code, then_action, else_action):
+        self.then_action = then_action
+        self.else_action = else_action
+        inlets = dict()
+        for branch in (then_action, else_action):
+            for c in branch.get_inlets_keys():
+                inlet = branch.get_inlet(c)
+                if c == CONDITION:
+                    raise InvalidDeclaration('Branch `{}` has inlet `{}` that clashes with branch condition'.format(
+                        branch.code, CONDITION))
+                if c in inlets and inlets[c].get_type() is not inlet.get_type():
+                    raise InvalidDeclaration('Branches `{}` and `{}` have inlet `{}` of different types'.format(
+                        then_action.code, else_action.code, c))
+                inlets.setdefault(c, inlet)
+        if then_action.get_outlets_keys() != else_action.get_outlets_keys() or any(
+                then_action.get_outlet(c).get_type() is not else_action.get_outlet(c).get_type()
+                for c in then_action.get_outlets_keys()):
+            raise InvalidDeclaration('Branches `{}` and `{}` must have the same outlets'.format(
+                then_action.code, else_action.code))
+        in_params = [Parameter(name=CONDITION, type_=types.Boolean)] + [
+            Parameter(name=c, type_=inlet.get_type()) for c, inlet in inlets.items()]
+        out_params = [
+            Parameter(name=c, type_=then_action.get_outlet(c).get_type()) for c in then_action.get_outlets_keys()]
+        super(BranchAction, self).__init__(
+            code=code, in_params=in_params, out_params=out_params,
+            pure=then_action.pure and else_action.pure, cost=max(then_action.cost, else_action.cost))
+
+    def choose(self, condition):
+        """
+        :param condition: значение условия
+        :return: Действие выбранной ветки
+        """
+        return self.then_action if condition else self.else_action
+
+    @classmethod
+    def of(cls, then_action, else_action):
+        """
+        Действие-ветвление (для одинаковых веток - одно и то же)
+        :return: <BranchAction>
+        """
+        code = 'Branch[{}|{}]'.format(then_action.code, else_action.code)
+        return _get_or_create(cls, code, then_action, else_action)
+
+
+def Branch(condition, then_action, else_action, **kwargs):
+    """
+    Ветвление в MagicAlgorithmBuilder:
+
+        ```
+        def builder(a, b):
+            return Branch(Less(a, b), then_action=SubBA, else_action=SubAB, a=a, b=b)
+        ```
+
+    :param condition: Шаг, Вывод или Ввод с условием
+    :param then_action: ветка для истинного условия
+    :param else_action: ветка для ложного условия
+    :param kwargs: значения Вводов веток
+    :return: <Step>
+    """
+    return BranchAction.of(then_action, else_action)(**dict(kwargs, **{CONDITION: condition}))
+
+
+def unchanged(old, new):
+    """
+    Совпадают ли значения (для пропуска повторных вычислений в Loop)
+    """
+    if old is new:
+        return True
+    try:
+        return bool(old == new)
+    except Exception:
+        # например, массивы numpy: поэлементное сравнение - не ответ "да/нет"
+        return False
+
+
+class LoopAction(Action):
+    """
+    Цикл до сходимости: тело (Действие или Алгоритм) выполняется, пока не выполнится условие
+
+    Переносимые значения - Выводы тела, одноименные его Вводам (Типы должны совпадать):
+    после итерации они подаются на эти Вводы. Вводы цикла - Вводы тела (начальные значения),
+    Выводы - Выводы тела после последней итерации.
+
+    Цикл останавливается, когда:
+    - until (Действие с одним Выводом, Вводы - подмножество Выводов тела) вернуло истину;
+    - переносимые значения не изменились (неподвижная точка);
+    - выполнено max_iter итераций.
+
+    На каждой итерации Алгоритма-тела заново выполняются только Шаги, параметры которых изменились
+    (Шаги Действий с побочными эффектами - всегда), поэтому сходящийся цикл с каждой итерацией дешевле.
+    Шаги тела выполняются последовательно
+
+    В AlgorithmBuilder: step = register(LoopAction.of(Body, until=Converged)), далее bind к Вводам тела.
+    В MagicAlgorithmBuilder - см. Loop
+
+        :param code: код Действия
+        :param body: тело цикла
+        :param until: условие остановки (None - только неподвижная точка и max_iter)
+        :param max_iter: максимальное количество итераций
+    """
+    def __init__(self, code, body, until=None, max_iter=100):
+        if max_iter < 1:
+            raise InvalidDeclaration('Loop `{}` must have at least one iteration, got max_iter={}'.format(
+                code, max_iter))
+        self.body = body
+        self.until = until
+        self.max_iter = max_iter
+        self.carried = [
+            c for c in body.get_outlets_keys()
+            if c in body.get_inlets_keys() and body.get_inlet(c).get_type() != types.ContextType]
+        if not self.carried:
+            raise InvalidDeclaration('Body `{}` of loop has no outlets with the same names as its inlets'.format(
+                body.code))
+        for c in self.carried:
+            if body.get_outlet(c).get_type() is not body.get_inlet(c).get_type():
+                raise InvalidDeclaration('Loop-carried value `{}` of body `{}` changes its type'.format(c, body.code))
+        if until is not None:
+            if len(until.get_outlets_keys()) != 1:
+                raise InvalidDeclaration('Loop condition `{}` must have exactly one outlet'.format(until.code))
+            unknown = set(_value_inlets(until)) - set(body.get_outlets_keys())
+            if unknown:
+                raise InvalidDeclaration('Loop condition `{}` has inlets that are not outlets of body `{}`: {}'.format(
+                    until.code, body.code, ', '.join(sorted(unknown))))
+        in_params = [Parameter(name=c, type_=body.get_inlet(c).get_type()) for c in body.get_inlets_keys()]
+        out_params = [Parameter(name=c, type_=body.get_outlet(c).get_type()) for c in body.get_outlets_keys()]
+        super(LoopAction, self).__init__(
+            code=code, in_params=in_params, out_params=out_params,
+            pure=body.pure and (until is None or until.pure), cost=body.cost)
+
+    def condition_params(self, values):
+        """
+        :param values: <dict> Выводы тела
+        :return: <dict> параметры условия until
+        """
+        return {c: values[c] for c in _value_inlets(self.until)}
+
+    @classmethod
+    def of(cls, body, until=None, max_iter=100):
+        """
+        Действие-цикл (для одинаковых аргументов - одно и то же)
+        :return: <LoopAction>
+        """
+        code = 'Loop[{}|{}|{}]'.format(body.code, until.code if until is not None else '', max_iter)
+        return _get_or_create(cls, code, body, until, max_iter)
+
+
+def Loop(body, until=None, max_iter=100, **kwargs):
+    """
+    Цикл в MagicAlgorithmBuilder:
+
+        ```
+        def builder(x, target):
+            return Loop(NewtonStep, until=CloseEnough, max_iter=50, x=x, target=target)
+        ```
+
+    :param body: тело цикла
+    :param until: условие остановки
+    :param max_iter: максимальное количество итераций
+    :param kwargs: начальные значения Вводов тела
+    :return: <Step>
+    """
+    return LoopAction.of(body, until, max_iter)(**kwargs)
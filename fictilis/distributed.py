@@ -0,0 +1,448 @@
+import importlib
+import itertools
+import multiprocessing
+import pickle
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from timeit import default_timer
+
+from . import types
+from .action import ActionPool, ImplementationPool
+from .cancellation import poll_interval
+from .context import Context
+from .errors import WorkerLost, RemoteError, EvaluationCancelled
+from .executor import BaseExecutor
+
+
+class StepTask:
+    """
+    Задача на выполнение Реализации: то, что уходит к процессу-обработчику
+
+        :param task_id: идентификатор задачи
+        :param code: код Действия
+        :param engine: Движок
+        :param params: <dict> отвалидированные параметры (без Контекста)
+        :param attempt: номер попытки
+    """
+    def __init__(self, task_id, code, engine, params, attempt=1):
+        self.task_id = task_id
+        self.code = code
+        self.engine = engine
+        self.params = params
+        self.attempt = attempt
+
+    def __repr__(self):
+        return 'StepTask(task_id={}, code={}, engine={}, attempt={})'.format(
+            self.task_id, self.code, self.engine, self.attempt)
+
+
+# события от обработчиков: (тип, worker_id, task_id, данные)
+HEARTBEAT = 'heartbeat'
+STARTED = 'started'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class BaseBroker:
+    """
+    Транспорт между исполнителем и обработчиками
+
+    Две очереди: задачи (исполнитель -> обработчики, FIFO) и события (обработчики -> исполнитель).
+    Своя реализация транспорта (например: поверх TCP или внешней очереди) должна
+    реализовать эти четыре метода; объект брокера передается в процессы-обработчики
+    """
+    def send_task(self, task):
+        """
+        :param task: <StepTask> | None (None - сигнал обработчику завершиться)
+        """
+        raise NotImplementedError
+
+    def receive_task(self, timeout=None):
+        """
+        :return: <StepTask> | None (сигнал завершиться)
+        :raises: queue.Empty, если за timeout задач не пришло
+        """
+        raise NotImplementedError
+
+    def send_event(self, event):
+        raise NotImplementedError
+
+    def receive_event(self, timeout=None):
+        """
+        :raises: queue.Empty
+        """
+        raise NotImplementedError
+
+
+class QueueBroker(BaseBroker):
+    """
+    Локальный брокер на multiprocessing
+
+    События отправляются синхронно через pipe (а не через фоновый поток multiprocessing.Queue):
+    событие "задача взята" не должно потеряться, если обработчик тут же упадет
+    """
+    def __init__(self, mp_context=None):
+        mp_context = mp_context or multiprocessing.get_context()
+        self._tasks = mp_context.Queue()
+        self._events_reader, self._events_writer = mp_context.Pipe(duplex=False)
+        self._events_lock = mp_context.Lock()
+
+    def send_task(self, task):
+        self._tasks.put(task)
+
+    def receive_task(self, timeout=None):
+        return self._tasks.get(timeout=timeout)
+
+    def send_event(self, event):
+        data = pickle.dumps(event)
+        with self._events_lock:
+            self._events_writer.send_bytes(data)
+
+    def receive_event(self, timeout=None):
+        if not self._events_reader.poll(timeout):
+            raise queue.Empty
+        return pickle.loads(self._events_reader.recv_bytes())
+
+
+def resolve_setup(setup):
+    """
+    Функция загрузки Действий и Реализаций в процесс
+
+    :param setup: <func()> | 'package.module:function' | 'package.module' (регистрация при импорте) | None
+    :return: <func()> | None
+    """
+    if setup is None or callable(setup):
+        return setup
+    # 'package.module:function' или 'package.module' (достаточно импорта - регистрация при импорте)
+    module, _, function = setup.partition(':')
+    module = importlib.import_module(module)
+    return getattr(module, function) if function else None
+
+
+def _pack_exception(e):
+    try:
+        data = pickle.dumps(e)
+        pickle.loads(data)
+        return e
+    except Exception:
+        return RemoteError('{}: {}\n{}'.format(e.__class__.__name__, e, traceback.format_exc()))
+
+
+def worker_main(broker, worker_id, setup=None, heartbeat=0.5, transport=None):
+    """
+    Цикл процесса-обработчика: забирает задачи из брокера, выполняет Реализации, отправляет результаты
+
+    :param broker: <BaseBroker>
+    :param worker_id: идентификатор обработчика
+    :param setup: <func()> | 'module[:function]' - загрузка Действий и Реализаций в процесс;
+                  может вернуть Контекст, который подставляется в параметры типа Контекст
+    :param heartbeat: период (в секундах) сообщений "я жив"
+    :param transport: <SharedMemoryTransport> передача больших значений через разделяемую память
+                      (должен совпадать с транспортом исполнителя)
+    """
+    setup = resolve_setup(setup)
+    context = setup() if setup is not None else None
+    if not isinstance(context, Context):
+        context = Context()
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(heartbeat):
+            broker.send_event((HEARTBEAT, worker_id, None, None))
+
+    broker.send_event((HEARTBEAT, worker_id, None, None))
+    threading.Thread(target=beat, daemon=True).start()
+    try:
+        while True:
+            try:
+                task = broker.receive_task(timeout=heartbeat)
+            except queue.Empty:
+                continue
+            if task is None:
+                return
+            broker.send_event((STARTED, worker_id, task.task_id, task.attempt))
+            blocks = []
+            try:
+                action = ActionPool.get(task.code)
+                params = dict(task.params if transport is None else transport.unpack(task.params, owner=False))
+                for code, inlet in action.get_inlets().items():
+                    if inlet.get_type() == types.ContextType:
+                        params[code] = context
+                result = ImplementationPool.get(code=task.code, engine=task.engine).evaluate(params)
+                del params
+                if transport is not None:
+                    result = transport.pack(result, blocks)
+            except Exception as e:
+                if transport is not None:
+                    transport.release(blocks)
+                broker.send_event((FAILED, worker_id, task.task_id, _pack_exception(e)))
+                continue
+            try:
+                broker.send_event((DONE, worker_id, task.task_id, result))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                if transport is not None:
+                    transport.release(blocks)
+                broker.send_event((FAILED, worker_id, task.task_id, RemoteError(
+                    'Result of {} can not be sent back: {}'.format(task, e))))
+            else:
+                if transport is not None:
+                    # блоки результата теперь принадлежат исполнителю
+                    transport.release(blocks, unlink=False)
+    finally:
+        stop.set()
+
+
+class DistributedExecutor(BaseExecutor):
+    """
+    Исполнитель, отправляющий вызовы Реализаций процессам-обработчикам через брокер
+
+    Процессы-обработчики (см. worker_main) должны загрузить те же Действия и Реализации.
+    Обработчик, от которого дольше heartbeat_timeout нет событий, считается упавшим:
+    его задачи отправляются повторно (не более max_attempts попыток), затем - WorkerLost.
+    Задачи отслеживаются с момента отправки. Очередь задач - FIFO, поэтому не начатая задача,
+    отправленная раньше уже начатой, взята из очереди; обработчик сообщает STARTED сразу, так что
+    такая задача, отправленная до потери обработчика, считается взятой им и тоже отправляется повторно.
+    Задачи, еще ждущие в очереди, не трогаются
+
+        :param broker: <BaseBroker>
+        :param heartbeat_timeout: секунды
+        :param max_attempts: максимальное количество попыток выполнения задачи
+        :param on_worker_lost: <func(worker_id)> вызывается при потере обработчика
+        :param transport: <SharedMemoryTransport> передача больших значений через разделяемую память
+                          (только для обработчиков на той же машине)
+    """
+    concurrent = True
+
+    def __init__(self, broker, heartbeat_timeout=5., max_attempts=3, on_worker_lost=None, transport=None):
+        self.broker = broker
+        self.transport = transport
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.on_worker_lost = on_worker_lost
+        self._ids = itertools.count()
+        self._pending = dict()
+        self._assigned = dict()
+        # порядковые номера отправок: последней отправки задачи, наибольший среди начатых задач,
+        # первый после последней потери обработчика
+        self._sent = dict()
+        self._sequence = 0
+        self._started = -1
+        self._lost = 0
+        self._last_seen = dict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._collector = threading.Thread(target=self._collect, daemon=True, name='fictilis-collector')
+        self._collector.start()
+
+    def call(self, action, implementation, params, token=None):
+        task_params = {
+            code: value for code, value in params.items()
+            if action.get_inlet(code).get_type() != types.ContextType}
+        future = self.submit(action.code, implementation.engine, task_params)
+        while True:
+            try:
+                return future.result(timeout=poll_interval(token))
+            except FutureTimeout:
+                if token is not None and token.cancelled:
+                    self.cancel(future.task_id, EvaluationCancelled(token.reason))
+                    return future.result()
+
+    def submit(self, code, engine, params):
+        """
+        Отправка задачи
+
+        :param code: код Действия
+        :param engine: Движок
+        :param params: <dict> параметры (сериализуемые)
+        :return: <Future> результат Реализации
+        """
+        blocks = []
+        if self.transport is not None:
+            params = self.transport.pack(params, blocks)
+        task = StepTask(task_id=next(self._ids), code=code, engine=engine, params=params)
+        future = Future()
+        future.task_id = task.task_id
+        with self._lock:
+            self._pending[task.task_id] = (task, future, blocks)
+        self._send(task)
+        return future
+
+    def _send(self, task):
+        # номер отправки соответствует порядку в очереди
+        with self._lock:
+            self._sent[task.task_id] = self._sequence
+            self._sequence += 1
+            self.broker.send_task(task)
+
+    def cancel(self, task_id, error):
+        """
+        Отказ от результата задачи (обработчик, уже начавший задачу, доведет её до конца)
+
+        :param task_id: идентификатор задачи
+        :param error: исключение для Future задачи
+        """
+        with self._lock:
+            self._assigned.pop(task_id, None)
+            self._sent.pop(task_id, None)
+            pending = self._pending.pop(task_id, None)
+        if pending is None:
+            return
+        _, future, blocks = pending
+        if self.transport is not None:
+            self.transport.release(blocks)
+        future.set_exception(error)
+
+    def _collect(self):
+        while not self._stopped.is_set():
+            try:
+                event = self.broker.receive_event(timeout=min(0.1, self.heartbeat_timeout / 4.))
+            except queue.Empty:
+                event = None
+            except (EOFError, OSError):
+                return
+            if event is not None:
+                self._handle(event)
+            self._check_workers()
+
+    def _handle(self, event):
+        kind, worker_id, task_id, data = event
+        with self._lock:
+            self._last_seen[worker_id] = default_timer()
+            if kind == STARTED:
+                if task_id in self._pending:
+                    self._assigned[task_id] = worker_id
+                    self._started = max(self._started, self._sent[task_id])
+                return
+            if kind not in (DONE, FAILED):
+                return
+            self._assigned.pop(task_id, None)
+            self._sent.pop(task_id, None)
+            # результат повторно отправленной задачи может прийти дважды
+            pending = self._pending.pop(task_id, None)
+        if pending is None:
+            return
+        _, future, blocks = pending
+        if self.transport is not None:
+            self.transport.release(blocks)
+            if kind == DONE:
+                try:
+                    data = self.transport.unpack(data, owner=True)
+                except Exception as e:
+                    kind, data = FAILED, RemoteError('Result of task {} is lost: {!r}'.format(task_id, e))
+        if kind == DONE:
+            future.set_result(data)
+        else:
+            future.set_exception(data)
+
+    def _check_workers(self):
+        now = default_timer()
+        with self._lock:
+            lost = [w for w, seen in self._last_seen.items() if now - seen > self.heartbeat_timeout]
+            for worker_id in lost:
+                del self._last_seen[worker_id]
+            orphans = [t for t, w in self._assigned.items() if w in lost]
+            if lost:
+                self._lost = self._sequence
+            # взята из очереди (отправлена раньше начатой) до потери обработчика, но STARTED не пришел -
+            # обработчик упал, не успев его отправить
+            orphans.extend(
+                t for t in self._pending
+                if t not in self._assigned and self._sent[t] < min(self._started, self._lost))
+            resend, failed = [], []
+            for task_id in orphans:
+                self._assigned.pop(task_id, None)
+                task, future, blocks = self._pending[task_id]
+                if task.attempt < self.max_attempts:
+                    task.attempt += 1
+                    resend.append(task)
+                else:
+                    del self._pending[task_id]
+                    del self._sent[task_id]
+                    failed.append((task, future, blocks))
+        for task in resend:
+            self._send(task)
+        for task, future, blocks in failed:
+            if self.transport is not None:
+                self.transport.release(blocks)
+            future.set_exception(WorkerLost('Task {} was lost {} times together with its worker'.format(
+                task, task.attempt)))
+        if self.on_worker_lost is not None:
+            for worker_id in lost:
+                self.on_worker_lost(worker_id)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._collector.join()
+
+
+class LocalCluster:
+    """
+    Локальный "кластер": брокер на очередях multiprocessing + процессы-обработчики
+
+    Упавшие обработчики перезапускаются. Пример:
+
+        ```
+        with LocalCluster(workers=4, setup='myproject.registry') as cluster:
+            BaseInterpreter.evaluate(BigAlgorithm, params=..., executor=cluster.executor)
+        ```
+
+        :param workers: количество процессов-обработчиков
+        :param setup: см. worker_main
+        :param heartbeat: см. worker_main
+        :param heartbeat_timeout: см. DistributedExecutor
+        :param max_attempts: см. DistributedExecutor
+        :param mp_context: контекст multiprocessing (по умолчанию - стандартный для платформы)
+        :param transport: <SharedMemoryTransport> передача больших значений через разделяемую память
+                          (например: LocalCluster(transport=SharedMemoryTransport(threshold=64 * 1024)))
+    """
+    def __init__(self, workers=2, setup=None, heartbeat=0.2, heartbeat_timeout=2., max_attempts=3,
+                 mp_context=None, transport=None):
+        self.workers = workers
+        self.setup = setup
+        self.heartbeat = heartbeat
+        self.transport = transport
+        self._mp_context = mp_context or multiprocessing.get_context()
+        self.broker = QueueBroker(self._mp_context)
+        self.processes = dict()
+        self._ids = itertools.count()
+        self._closing = False
+        for _ in range(workers):
+            self._start_worker()
+        self.executor = DistributedExecutor(
+            self.broker, heartbeat_timeout=heartbeat_timeout, max_attempts=max_attempts,
+            on_worker_lost=self._replace_worker, transport=transport)
+
+    def _start_worker(self):
+        worker_id = next(self._ids)
+        process = self._mp_context.Process(
+            target=worker_main, args=(self.broker, worker_id, self.setup, self.heartbeat, self.transport),
+            daemon=True)
+        process.start()
+        self.processes[worker_id] = process
+
+    def _replace_worker(self, worker_id):
+        process = self.processes.pop(worker_id, None)
+        if process is None or self._closing:
+            return
+        if process.is_alive():
+            process.kill()
+        process.join()
+        self._start_worker()
+
+    def shutdown(self):
+        self._closing = True
+        for _ in self.processes:
+            self.broker.send_task(None)
+        for process in list(self.processes.values()):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
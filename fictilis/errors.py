@@ -18,9 +18,48 @@ class InvalidDeclaration(BaseFictilisException):
     pass
 
 
-class InvalidType(BaseFictilisException):
-    pass
+class InvalidType(InvalidParams):
+    """
+    Значение Параметра не подходит под его Тип
+    """
 
 
 class UnexpectedError(BaseFictilisException):
     pass
+
+
+class ResourceExhausted(BaseFictilisException):
+    pass
+
+
+class WorkerLost(BaseFictilisException):
+    pass
+
+
+class RemoteError(BaseFictilisException):
+    pass
+
+
+class EvaluationCancelled(BaseFictilisException):
+    """
+    Выполнение отменено (см. cancellation.CancellationToken)
+
+        reason - причина: 'cancelled' или 'deadline exceeded'
+        completed - пути (см. Run) Шагов, выполненных до отмены
+    """
+    def __init__(self, reason, completed=()):
+        super(EvaluationCancelled, self).__init__(reason)
+        self.reason = reason
+        self.completed = list(completed)
+
+    def __str__(self):
+        return 'Evaluation {}; completed steps: {}'.format(
+            'cancelled' if self.reason == 'cancelled' else 'stopped: ' + self.reason,
+            ', '.join('.'.join(str(n) for n in path) for path in self.completed) or 'none')
+
+
+class RequestRejected(ResourceExhausted):
+    """
+    Запрос не принят сервисом (очередь заполнена) или вытеснен из очереди более приоритетным
+    """
+    pass
@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import Future
+
+from .cancellation import poll_interval
+from .errors import EvaluationCancelled
+
+_spawn_lock = threading.Lock()
+
+
+class BaseExecutor:
+    """
+    Исполнитель - определяет, где и как выполняются вызовы Реализаций
+
+    Базовый исполнитель вызывает Реализацию в текущем потоке;
+    Шаги Алгоритма выполняются последовательно
+    """
+    # можно ли выполнять независимые Шаги Алгоритма одновременно
+    concurrent = False
+    # максимальное количество одновременно живущих потоков Шагов (см. spawn)
+    max_spawned = 64
+    _spawned = None
+
+    def call(self, action, implementation, params, token=None):
+        """
+        Вызов Реализации
+
+        :param action: Действие
+        :param implementation: <Implementation>
+        :param params: <dict> отвалидированные параметры
+        :param token: <CancellationToken> - ожидание (слота, результата) прерывается при его срабатывании
+        :raises: EvaluationCancelled
+        :return: результат Реализации (как его вернула function)
+        """
+        return implementation.evaluate(params)
+
+    def spawn(self, function):
+        """
+        Запуск выполнения Шага (для concurrent-исполнителей)
+
+        Шаг может сам ждать вложенные Шаги, поэтому выполняется в отдельном потоке,
+        а не в пуле с очередью: ограничение накладывается на вызовы Реализаций (call).
+        Потоков Шагов - не более max_spawned; сверх этого Шаг выполняется в вызывающем потоке
+        (так ожидание вложенных Шагов не может заблокировать исполнитель)
+
+        :param function: <func()>
+        :return: <Future>
+        """
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = function()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        slots = self._get_spawned()
+        if not slots.acquire(blocking=False):
+            run()
+            return future
+
+        def target():
+            try:
+                run()
+            finally:
+                slots.release()
+
+        threading.Thread(target=target, daemon=True, name='fictilis-step').start()
+        return future
+
+    def _get_spawned(self):
+        with _spawn_lock:
+            if self._spawned is None:
+                self._spawned = threading.BoundedSemaphore(self.max_spawned)
+            return self._spawned
+
+    def shutdown(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+
+class ThreadExecutor(BaseExecutor):
+    """
+    Исполнитель в потоках текущего процесса
+
+    Независимые Шаги выполняются одновременно, одновременно идущих вызовов Реализаций - не более max_workers
+    """
+    concurrent = True
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def call(self, action, implementation, params, token=None):
+        while not self._slots.acquire(timeout=poll_interval(token)):
+            if token is not None and token.cancelled:
+                raise EvaluationCancelled(token.reason)
+        try:
+            return implementation.evaluate(params)
+        finally:
+            self._slots.release()
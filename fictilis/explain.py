@@ -0,0 +1,169 @@
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from timeit import default_timer
+
+
+def approx_size(value, _seen=None, _depth=0):
+    """
+    Приблизительный размер значения в байтах (с учетом вложенных контейнеров)
+
+    :param value: значение
+    :return: <int> байты
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen or _depth > 8:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += approx_size(k, _seen, _depth + 1) + approx_size(v, _seen, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += approx_size(item, _seen, _depth + 1)
+    return size
+
+
+class StepProfile:
+    """
+    Профиль выполнения Шага
+    """
+    def __init__(self, path, step):
+        self.path = path
+        self.step = step
+        self.wall = 0.
+        self.nested = 0.
+        self.output_size = 0
+        self.alloc = 0
+
+    @property
+    def self_time(self):
+        return self.wall - self.nested
+
+    def set_outputs(self, outputs):
+        self.output_size = approx_size(outputs)
+
+
+class Profiler:
+    """
+    Сборщик профилей Шагов в рамках запуска (см. Run.profiler)
+    """
+    def __init__(self):
+        self.steps = dict()
+        self._nested = dict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, path, step):
+        """
+        Менеджер контекста: замер выполнения Шага
+        :param path: <tuple> путь Шага
+        :param step: <Step>
+        :return: <StepProfile>
+        """
+        record = StepProfile(path, step)
+        tracing = tracemalloc.is_tracing()
+        mem_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = default_timer()
+        try:
+            yield record
+        finally:
+            record.wall = default_timer() - start
+            if tracing:
+                record.alloc = tracemalloc.get_traced_memory()[0] - mem_before
+            with self._lock:
+                self.steps[path] = record
+                # родитель еще выполняется - время вложенных Шагов копим отдельно
+                parent = path[:-1]
+                if parent:
+                    self._nested[parent] = self._nested.get(parent, 0.) + record.wall
+
+    def finalize(self):
+        """
+        Разнесение времени вложенных Шагов по родителям
+        """
+        for path, record in self.steps.items():
+            record.nested = self._nested.get(path, 0.)
+
+
+def critical_path(algorithm, weights):
+    """
+    Критический путь по графу зависимостей Шагов Алгоритма
+
+    :param algorithm: <Algorithm>
+    :param weights: <dict(step.number=<float>, ...)> длительности Шагов
+    :return: ([<Step>, ...], <float> суммарная длительность)
+    """
+    index = algorithm.get_index()
+    best = dict()
+    previous = dict()
+    for n in index.order:
+        before = max(index.producers[n], key=lambda p: best[p], default=None)
+        best[n] = weights.get(n, 0.) + (best[before] if before is not None else 0.)
+        previous[n] = before
+    if not best:
+        return [], 0.
+    last = max(best, key=lambda n: best[n])
+    path = []
+    while last is not None:
+        path.append(algorithm.steps[last])
+        last = previous[last]
+    return list(reversed(path)), max(best.values())
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return '{:.0f}{}'.format(size, unit)
+        size /= 1024.
+    return '{:.1f}GB'.format(size)
+
+
+def _ms(seconds):
+    return '{:.3f}ms'.format(seconds * 1000)
+
+
+class Explanation:
+    """
+    Результат EXPLAIN ANALYZE: результаты выполнения + профили Шагов + критический путь
+    """
+    def __init__(self, algorithm, result, profiler, total):
+        profiler.finalize()
+        self.algorithm = algorithm
+        self.result = result
+        self.total = total
+        self.steps = profiler.steps
+        weights = {path[0]: record.wall for path, record in self.steps.items() if len(path) == 1}
+        self.critical_path, self.critical_time = critical_path(algorithm, weights)
+
+    def output_sizes(self):
+        """
+        Измеренные размеры результатов Шагов Алгоритма (для Algorithm.plan_memory)
+        :return: <dict(step.number=<int>, ...)>
+        """
+        return {path[0]: record.output_size for path, record in self.steps.items() if len(path) == 1}
+
+    def __str__(self):
+        critical = set(step.number for step in self.critical_path)
+        width = max([len(s.action.code) for s in self.algorithm.steps] + [1])
+        lines = ['Algorithm: {} (total {})'.format(self.algorithm.code, _ms(self.total)), '  steps:']
+        for path in sorted(self.steps):
+            record = self.steps[path]
+            lines.append('    {indent}{code:<{width}} wall={wall} self={self_} nested={nested} '
+                         'out~{size} alloc={alloc}{mark}'.format(
+                             indent='  ' * (len(path) - 1),
+                             code=record.step.action.code,
+                             width=width,
+                             wall=_ms(record.wall),
+                             self_=_ms(record.self_time),
+                             nested=_ms(record.nested),
+                             size=_format_size(record.output_size),
+                             alloc=('+' if record.alloc >= 0 else '') + _format_size(record.alloc),
+                             mark=' *' if len(path) == 1 and path[0] in critical else ''))
+        graph = str(self.algorithm)
+        lines.append(graph[graph.index('  binds:'):])
+        lines.append('  critical path (*): {} ({})'.format(
+            ' -> '.join(step.action.code for step in self.critical_path), _ms(self.critical_time)))
+        return '\n'.join(lines)
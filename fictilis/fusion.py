@@ -0,0 +1,127 @@
+import threading
+
+from .errors import AlreadyExistsError, NotExistsError, InvalidDeclaration
+
+
+class Script:
+    """
+    Скрипт - текст (например SQL), который Реализация возвращает вместо того, чтобы выполнить его самой
+
+        :param text: текст скрипта
+        :param result: результат Шага (то, что Реализация вернула бы после выполнения скрипта)
+    """
+    def __init__(self, text, result=None):
+        self.text = text
+        self.result = result
+
+    def __repr__(self):
+        return 'Script(text={})'.format(repr(self.text))
+
+
+class ScriptBatch:
+    """
+    Накопленные подряд идущие скрипты одного Движка
+
+    Выполняются одним вызовом исполнителя Движка (см. ScriptRunnerPool),
+    т.е. за один сетевой round trip и (если так сделан исполнитель) в одной транзакции
+    """
+    def __init__(self, engine, context):
+        self.engine = engine
+        self.context = context
+        self.texts = []
+
+    def accepts(self, engine, context):
+        return self.engine == engine and self.context is context
+
+    def append(self, text):
+        self.texts.append(text)
+
+    def execute(self):
+        if self.texts:
+            ScriptRunnerPool.get(self.engine)(self.context, list(self.texts))
+
+
+class ScriptFuser:
+    """
+    Слияние скриптов в рамках запуска
+
+    Скрипты копятся, пока идут Шаги со скриптовыми Реализациями одного Движка;
+    любой другой Шаг (или завершение запуска) сначала выполняет накопленное
+    """
+    def __init__(self):
+        self._batch = None
+        self._lock = threading.Lock()
+
+    def defer(self, engine, context, script):
+        """
+        Отложить выполнение скрипта
+
+        :param engine: Движок
+        :param context: Контекст выполнения
+        :param script: <Script>
+        :return: результат Шага
+        """
+        if not isinstance(script, Script):
+            raise InvalidDeclaration(
+                'Fusible implementation for engine `{}` must return `Script`, got {}'.format(engine, repr(script)))
+        with self._lock:
+            if self._batch is not None and not self._batch.accepts(engine, context):
+                self._flush()
+            if self._batch is None:
+                self._batch = ScriptBatch(engine=engine, context=context)
+            self._batch.append(script.text)
+        return script.result
+
+    def flush(self):
+        """
+        Выполнить накопленные скрипты
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        batch, self._batch = self._batch, None
+        if batch is not None:
+            batch.execute()
+
+
+class ScriptRunnerPool:
+    """
+    Пул исполнителей скриптов
+
+    Исполнитель - <func(context, texts)>, выполняющий список скриптов Движка за один вызов, например:
+
+        ```
+        def sqlite_runner(context, texts):
+            context['conn'].executescript('BEGIN;\\n{}\\nCOMMIT;'.format('\\n'.join(texts)))
+
+        ScriptRunnerPool.register(engine='sql', runner=sqlite_runner)
+        ```
+    """
+    _pool = dict()
+
+    @staticmethod
+    def register(engine, runner):
+        """
+        Регистрация исполнителя скриптов Движка
+
+        :param engine: Движок
+        :param runner: <func(context, texts)>
+        """
+        if engine in ScriptRunnerPool._pool:
+            raise AlreadyExistsError('Script runner for engine {} already exists'.format(engine))
+        ScriptRunnerPool._pool[engine] = runner
+
+    @staticmethod
+    def get(engine):
+        """
+        :param engine: Движок
+        :return: <func(context, texts)>
+        """
+        if engine not in ScriptRunnerPool._pool:
+            raise NotExistsError('Script runner for engine {} does not exists'.format(engine))
+        return ScriptRunnerPool._pool[engine]
+
+    @staticmethod
+    def _reset():
+        ScriptRunnerPool._pool = dict()
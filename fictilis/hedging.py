@@ -0,0 +1,199 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from timeit import default_timer
+
+from .cancellation import poll_interval
+from .errors import AlreadyExistsError, InvalidParams
+from . import utils
+
+
+class HedgingPolicy:
+    """
+    Политика хеджирования Действия
+
+    Если выбранная Реализация не вернула результат за время, равное
+    `percentile`-перцентилю её наблюдаемых задержек, то тот же вызов запускается
+    на другом Движке. Берется результат того, кто закончил первым,
+    второй вызов отменяется (если еще не начался) или игнорируется.
+
+        :param action: Действие
+        :param hedge_engine: Движок для повторного вызова
+                             (по умолчанию - первый Движок, отличный от выбранного)
+        :param percentile: перцентиль задержек выбранного Движка, после которого запускается хедж
+        :param delay: задержка (в секундах), используемая пока не набрано `min_samples` наблюдений
+        :param min_samples: минимальное количество наблюдений для расчета перцентиля
+        :param window: количество последних наблюдений, по которым считается перцентиль
+        :param max_workers: количество потоков для основных вызовов и, отдельно, для хеджей Действия
+                            (хеджи не ждут в очереди за вызовами, с которыми соревнуются)
+        :param executor: <concurrent.futures.Executor> свой пул для всех вызовов (вместо пулов max_workers)
+    """
+    def __init__(self, action, hedge_engine=None, percentile=95, delay=0.05, min_samples=20, window=1000,
+                 max_workers=16, executor=None):
+        if not 0 < percentile <= 100:
+            raise InvalidParams('Percentile for hedging must be in (0, 100], got {}'.format(percentile))
+        self.action = action
+        self.hedge_engine = hedge_engine
+        self.percentile = percentile
+        self.delay = delay
+        self.min_samples = min_samples
+        self._latencies = dict()
+        self._window = window
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._own_executors = executor is None
+        self._executors = (executor, executor) if executor is not None else None
+        HedgingPool.register(code=action.code, policy=self)
+
+    def observe(self, engine, latency):
+        """
+        Регистрация наблюдаемой задержки Движка
+        :param engine: Движок
+        :param latency: <float> секунды
+        """
+        with self._lock:
+            if engine not in self._latencies:
+                self._latencies[engine] = deque(maxlen=self._window)
+            self._latencies[engine].append(latency)
+
+    def get_delay(self, engine):
+        """
+        Задержка, после которой запускается хедж
+        :param engine: выбранный Движок
+        :return: <float> секунды
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(engine, ()))
+        if len(samples) < self.min_samples:
+            return self.delay
+        return utils.percentile(samples, self.percentile)
+
+    def choose_hedge_engine(self, engine, choices):
+        """
+        Выбор Движка для хеджа
+        :param engine: выбранный Движок
+        :param choices: <dict(engine=implementation, ...)> доступные Реализации
+        :return: Движок или None, если хеджировать не на чем
+        """
+        if self.hedge_engine is not None:
+            return self.hedge_engine if self.hedge_engine != engine and self.hedge_engine in choices else None
+        for key in choices:
+            if key != engine:
+                return key
+        return None
+
+    def evaluate(self, engine, hedge_engine, call, token=None):
+        """
+        Хеджированное выполнение
+
+        :param engine: выбранный Движок
+        :param hedge_engine: Движок для хеджа
+        :param call: <func(engine)> выполнение Действия на Движке
+        :param token: <CancellationToken> - ожидание прерывается при его срабатывании
+        :return: результат того вызова, который закончился первым
+        :raises: EvaluationCancelled
+        """
+        executor, hedge_executor = self._get_executors()
+        primary = self._submit(executor, engine, call)
+        deadline = default_timer() + self.get_delay(engine)
+        done = self._wait({primary}, token, deadline=deadline)
+        if done and primary.exception() is None:
+            return primary.result()
+        futures = [primary]
+        if not done:
+            futures.append(self._submit(hedge_executor, hedge_engine, call))
+        # первый успешный результат; если упали все - ошибка выбранного Движка
+        pending = set(futures)
+        while pending:
+            done = self._wait(pending, token)
+            pending -= done
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+        return primary.result()
+
+    @staticmethod
+    def _wait(futures, token, deadline=None):
+        """
+        Ожидание первого завершившегося вызова с проверкой токена
+
+        :param futures: <set(Future)>
+        :param token: <CancellationToken> | None
+        :param deadline: момент (по timeit.default_timer), до которого ждать (None - пока кто-то не завершится)
+        :return: <set(Future)> завершившиеся вызовы (пустое, если истек deadline)
+        """
+        while True:
+            remaining = None if deadline is None else max(0., deadline - default_timer())
+            done, _ = wait(futures, timeout=poll_interval(token, remaining), return_when=FIRST_COMPLETED)
+            if done or remaining == 0.:
+                return done
+            if token is not None and token.cancelled:
+                for future in futures:
+                    future.cancel()
+                token.check()
+
+    def _submit(self, executor, engine, call):
+        def timed():
+            start = default_timer()
+            result = call(engine)
+            self.observe(engine, default_timer() - start)
+            return result
+        return executor.submit(timed)
+
+    def _get_executors(self):
+        with self._lock:
+            if self._executors is None:
+                self._executors = tuple(
+                    ThreadPoolExecutor(max_workers=self.max_workers,
+                                       thread_name_prefix='fictilis-{}-{}'.format(kind, self.action.code))
+                    for kind in ('primary', 'hedge'))
+            return self._executors
+
+    def shutdown(self):
+        """
+        Остановка пулов потоков Политики (переданный снаружи executor не останавливается)
+        """
+        with self._lock:
+            executors, self._executors = self._executors, None
+        if executors is not None and self._own_executors:
+            for executor in executors:
+                executor.shutdown(wait=False)
+
+
+class HedgingPool:
+    """
+    Пул Политик хеджирования
+
+    В этом пуле хранятся Политики хеджирования, привязанные к кодам Действий
+    """
+    _pool = dict()
+
+    @staticmethod
+    def register(code, policy):
+        """
+        Регистрация Политики хеджирования
+
+        :param code: код Действия
+        :param policy: <HedgingPolicy>
+        """
+        if code in HedgingPool._pool:
+            raise AlreadyExistsError('Hedging policy for action {} already exists'.format(code))
+        HedgingPool._pool[code] = policy
+
+    @staticmethod
+    def find(code):
+        """
+        Получение Политики хеджирования по коду Действия
+
+        :param code: код Действия
+        :return: <HedgingPolicy> | None
+        """
+        return HedgingPool._pool.get(code)
+
+    @staticmethod
+    def _reset():
+        for policy in HedgingPool._pool.values():
+            policy.shutdown()
+        HedgingPool._pool = dict()
@@ -1,45 +1,414 @@
+import functools
+import heapq
+import sys
+import tracemalloc
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from timeit import default_timer
+
 from .algorithm import Algorithm
 from .action import ImplementationPool, Action
-from .errors import InvalidParams, InvalidDeclaration
+from .errors import InvalidParams, InvalidDeclaration, EvaluationCancelled
 from . import types
 from .algbuilder import Const
+from .batching import BatchLoaderPool
+from .cancellation import CancellationToken, poll_interval
+from .checkpoint import FileCheckpointStore, params_fingerprint
+from .control import BranchAction, LoopAction, CONDITION, unchanged
+from .explain import Profiler, Explanation
+from .hedging import HedgingPool
+from .mapreduce import MapAction, ReduceAction, split
+from .run import Run
+from .scheduling import ResourceClassPool
+from .singleflight import SingleFlightPool
+from .streaming import DEFAULT_BUFFER, is_stream
+from .utils import timeit
 
 
 class BaseInterpreter:
+    # <metrics.MetricsCollector> - сборщик метрик выполнения (None - метрики не собираются)
+    metrics = None
+    # размер буфера потоковых Выводов (types.Stream): на сколько элементов производитель опережает потребителя
+    stream_buffer = DEFAULT_BUFFER
+    # <workload.WorkloadRecorder> - запись вызовов для воспроизведения (None - не записываются)
+    recorder = None
 
     @classmethod
-    def evaluate(cls, action, context=None, params=None):
+    def evaluate(cls, action, context=None, params=None, checkpoint=None, run_id=None, resume_from=None,
+                 outputs=None, executor=None, deadline=None, profiler=None, token=None):
         """
         Выполнение Действия (или Алгоритма, как частный случай)
 
         :param action: Действие
         :param context: Контекст выполнения
         :param params: Параметры выполнения
+        :param checkpoint: <BaseCheckpointStore> хранилище контрольных точек
+                           (True - хранилище на локальном диске по умолчанию)
+        :param run_id: идентификатор запуска для контрольных точек (по умолчанию генерируется)
+        :param resume_from: идентификатор упавшего запуска - уже выполненные Шаги не перевычисляются
+        :param outputs: коды нужных Выводов - выполняются только Шаги, от которых они зависят
+                        (и Шаги Действий с побочными эффектами, см. Action.pure)
+        :param executor: <executor.BaseExecutor> где выполнять Реализации; concurrent-исполнитель
+                         (ThreadExecutor, distributed.DistributedExecutor) выполняет независимые Шаги одновременно
+        :param deadline: секунды на выполнение; по истечении (или при отмене context.cancellation)
+                         новые Шаги не запускаются, ожидания прерываются
+        :param profiler: <explain.Profiler> сбор времени выполнения Шагов (см. также explain)
+        :param token: <CancellationToken> токен отмены запуска вместо context.cancellation
+                      (обычно - его потомок, см. CancellationToken.child)
+        :raises: EvaluationCancelled (со списком выполненных Шагов)
         :return: Результаты выполнения Действия
         """
         # make copy of params
         params = dict(**params) if params else dict()
-        return cls._evaluate(action, context, params)
+        if outputs is not None:
+            outputs = cls._check_outputs(action, outputs)
+        run = cls._make_run(action, checkpoint, run_id, resume_from, context, params)
+        run.executor = executor
+        run.profiler = profiler
+        run.token = cls._make_token(context, deadline, token)
+        recorder = cls.recorder if cls.recorder is not None and cls.recorder.sample() else None
+        if recorder is not None and recorder.capture_steps:
+            run.recording = dict()
+        start = default_timer()
+        result = None
+        try:
+            if run.metrics is None:
+                result = cls._evaluate(action, context, params, run=run, outputs=outputs)
+                run.finish()
+            else:
+                run.metrics.in_flight.inc()
+                try:
+                    result = cls._evaluate(action, context, params, run=run, outputs=outputs)
+                    run.finish()
+                finally:
+                    run.metrics.in_flight.dec()
+        except EvaluationCancelled as e:
+            run.abort()
+            raise run.cancelled(e)
+        except BaseException:
+            run.abort()
+            raise
+        finally:
+            run.close_streams(keep=result.values() if result else ())
+        if recorder is not None:
+            recorder.record(action, context.get('engine') if context else None, params, result,
+                            default_timer() - start, steps=run.recording)
+        return result
+
+    @classmethod
+    def explain(cls, algorithm, context=None, params=None, out=sys.stdout):
+        """
+        EXPLAIN ANALYZE: выполнение Алгоритма с профилированием Шагов
+
+        Печатает граф Алгоритма, где для каждого Шага (включая Шаги вложенных Алгоритмов) указаны:
+        время выполнения, собственное время и время вложенных Шагов, приблизительный размер результатов,
+        прирост памяти по tracemalloc; а также критический путь по графу зависимостей Шагов
+
+        :param algorithm: Алгоритм
+        :param context: Контекст выполнения
+        :param params: Параметры выполнения
+        :param out: куда печатать (None - не печатать)
+        :return: <explain.Explanation> (результаты выполнения - Explanation.result)
+        """
+        params = dict(**params) if params else dict()
+        run = Run(metrics=cls.metrics, profiler=Profiler())
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            with timeit() as expired:
+                result = cls._evaluate(algorithm, context, params, run=run)
+                run.finish()
+        except BaseException:
+            run.abort()
+            raise
+        finally:
+            run.close_streams()
+            if started_tracing:
+                tracemalloc.stop()
+        explanation = Explanation(algorithm, result, run.profiler, total=expired())
+        if out is not None:
+            print(explanation, file=out)
+        return explanation
+
+    @classmethod
+    def _check_outputs(cls, action, outputs):
+        outputs = tuple(outputs)
+        unknown = set(outputs) - set(action.get_outlets_keys())
+        if unknown:
+            raise InvalidParams('Action `{}` does not have outlets: {}'.format(action.code, ', '.join(sorted(unknown))))
+        return outputs
+
+    @classmethod
+    def _make_token(cls, context, deadline, token=None):
+        parent = token if token is not None else getattr(context, 'cancellation', None)
+        if deadline is None:
+            return parent
+        return CancellationToken(deadline=default_timer() + deadline, parent=parent)
 
     @classmethod
-    def _evaluate(cls, action, context, params):
+    def _make_run(cls, action, checkpoint, run_id, resume_from, context=None, params=None):
+        if checkpoint is True or (checkpoint is None and resume_from is not None):
+            checkpoint = FileCheckpointStore()
+        if checkpoint is None:
+            return Run(run_id=run_id, metrics=cls.metrics)
+        fingerprint = params_fingerprint(action, params or dict(), context.get('engine') if context else None)
+        if resume_from is not None:
+            if run_id is not None and run_id != resume_from:
+                raise InvalidParams('Resumed run continues with its own id `{}`, got run_id `{}`'.format(
+                    resume_from, run_id))
+            run_id = resume_from
+            checkpoint.start(run_id, action.code, fingerprint)
+            return Run(run_id=run_id, checkpoint=checkpoint, completed=checkpoint.load(run_id), metrics=cls.metrics)
+        run_id = run_id or checkpoint.new_run_id()
+        checkpoint.start(run_id, action.code, fingerprint)
+        return Run(run_id=run_id, checkpoint=checkpoint, metrics=cls.metrics)
+
+    @classmethod
+    def _evaluate(cls, action, context, params, run=None, path=(), outputs=None):
+        if run is None:
+            run = Run(metrics=cls.metrics)
+            result = cls._evaluate(action, context, params, run=run, path=path, outputs=outputs)
+            run.finish()
+            return result
         cls._add_context_if_needed(action, context, params)
-        params = action.validate_inputs(params)
+        params = cls._validate(action, params, 'in', run)
+        flight = SingleFlightPool.find(action.code)
+        if flight is None:
+            return cls._evaluate_validated(action, context, params, run, path, outputs)
+        key = flight.key(context, params, outputs)
+        return flight.do(
+            key, lambda: cls._evaluate_validated(action, context, params, run, path, outputs), token=run.token)
+
+    @classmethod
+    def _evaluate_validated(cls, action, context, params, run, path, outputs):
         if isinstance(action, Algorithm):
-            result = cls._evaluate_algorithm(action, context, params)
+            if run.metrics is None:
+                result = cls._evaluate_algorithm(action, context, params, run=run, path=path, outputs=outputs)
+            else:
+                with run.metrics.timer(run.metrics.observe_algorithm, action.code):
+                    result = cls._evaluate_algorithm(action, context, params, run=run, path=path, outputs=outputs)
         else:
-            result = cls._evaluate_action(action, context, params)
-        result = action.validate_outputs(result)
+            result = cls._evaluate_action(action, context, params, run=run, path=path)
+            if outputs is not None:
+                result = {code: result[code] for code in outputs if code in result}
+        result = cls._validate(action, result, 'out', run, outlets=outputs)
         return result
 
     @classmethod
-    def _evaluate_action(cls, action, context, params):
-        implementation = cls._choose_implementation(action, context, params)
+    def _validate(cls, action, values, direction, run, outlets=None):
+        if direction == 'in':
+            validate = action.validate_inputs
+        else:
+            def validate(values):
+                return action.validate_outputs(values, outlets=outlets)
+        if run.metrics is None:
+            return validate(values)
+        start = default_timer()
+        try:
+            return validate(values)
+        finally:
+            run.metrics.observe_validation(action.code, direction, default_timer() - start)
+
+    @classmethod
+    def _evaluate_action(cls, action, context, params, run=None, path=()):
+        if isinstance(action, MapAction):
+            return cls._evaluate_map(action, context, params, run=run, path=path)
+        if isinstance(action, ReduceAction):
+            return cls._evaluate_reduce(action, context, params, run=run, path=path)
+        if isinstance(action, BranchAction):
+            return cls._evaluate_branch(action, context, params, run=run, path=path)
+        if isinstance(action, LoopAction):
+            return cls._evaluate_loop(action, context, params, run=run, path=path)
+        policy = HedgingPool.find(action.code)
+        if policy is None:
+            implementation = cls._choose_implementation(action, context, params)
+            return cls._evaluate_implementation(action, implementation, context, params, run=run, path=path)
+        return cls._evaluate_hedged(policy, action, context, params, run=run, path=path)
+
+    @classmethod
+    def _evaluate_implementation(cls, action, implementation, context, params, run=None, path=()):
         if isinstance(implementation, Action):
-            return cls._evaluate(action=implementation, context=context, params=params)
-        res = implementation.evaluate(params)
+            return cls._evaluate(action=implementation, context=context, params=params, run=run, path=path)
+        if run.metrics is None:
+            return cls._call_implementation(action, implementation, context, params, run=run)
+        with run.metrics.timer(run.metrics.observe_call, action.code, implementation.engine):
+            return cls._call_implementation(action, implementation, context, params, run=run)
+
+    @classmethod
+    def _call_implementation(cls, action, implementation, context, params, run):
+        if implementation.fusible:
+            res = run.fuser.defer(implementation.engine, context, implementation.evaluate(params))
+            return cls._result_to_dict(res=res, action=action)
+        # Реализация выполняется сама - накопленные скрипты должны быть выполнены до неё
+        run.fuser.flush()
+        loader = BatchLoaderPool.find(action.code, implementation.engine)
+        if loader is not None:
+            return cls._result_to_dict(res=loader.load(params, token=run.token), action=action)
+        if implementation.resources:
+            return cls._evaluate_with_resources(action, implementation, context, params, run)
+        if run.executor is None:
+            res = implementation.evaluate(params)
+        else:
+            res = run.executor.call(action, implementation, params, token=run.token)
+        return cls._result_to_dict(res=res, action=action)
+
+    @classmethod
+    def _evaluate_with_resources(cls, action, implementation, context, params, run):
+        if context is None:
+            raise InvalidParams(
+                'Implementation of `{action}` requires resources {resources}, but context is empty'.format(
+                    action=action.code, resources=', '.join(implementation.resources)))
+        with context.checkout(*implementation.resources, token=run.token) as call_context:
+            call_params = {
+                code: call_context if action.get_inlet(code).get_type() == types.ContextType else value
+                for code, value in params.items()}
+            res = implementation.evaluate(call_params)
         return cls._result_to_dict(res=res, action=action)
 
+    @classmethod
+    def _evaluate_hedged(cls, policy, action, context, params, run=None, path=()):
+        choices = ImplementationPool.list(code=action.code)
+        engine = cls._choose_engine(action, context, params)
+        hedge_engine = policy.choose_hedge_engine(engine, choices)
+
+        def call(e):
+            # у каждого вызова своя копия параметров: Реализации могут их изменять
+            return cls._evaluate_implementation(
+                action, choices[e], context, dict(params), run=run, path=path)
+
+        if hedge_engine is None:
+            return call(engine)
+        return policy.evaluate(
+            engine=engine, hedge_engine=hedge_engine, call=call, token=run.token)
+
+    @classmethod
+    def _evaluate_map(cls, action, context, params, run, path):
+        def evaluate_chunk(offset, chunk):
+            return [
+                cls._evaluate_element(action.action, context, dict(params, **{action.over: item}), run,
+                                      path + (offset + i, ))
+                for i, item in enumerate(chunk)]
+
+        chunks = split(params[action.over], action.chunk_size)
+        results = [r for chunk_results in cls._evaluate_chunks(evaluate_chunk, chunks, run) for r in chunk_results]
+        return {code: [r[code] for r in results] for code in action.get_outlets_keys()}
+
+    @classmethod
+    def _evaluate_reduce(cls, action, context, params, run, path):
+        def fold(level):
+            # путь элемента - (уровень дерева, позиция на уровне): не зависит от порядка выполнения частей,
+            # поэтому контрольные точки совпадают при возобновлении с concurrent-исполнителем
+            def fold_chunk(offset, chunk):
+                acc = chunk[0]
+                for position, item in enumerate(chunk[1:], offset + 1):
+                    element_params = dict(params, **{action.accumulator: acc, action.item: item})
+                    result = cls._evaluate_element(
+                        action.action, context, element_params, run, path + (level, position))
+                    acc = result[action.result]
+                return acc
+            return fold_chunk
+
+        # части сворачиваются независимо, затем их результаты объединяются попарно
+        values = cls._evaluate_chunks(fold(0), split([params[action.accumulator]] + list(params[action.item]),
+                                                     action.chunk_size), run)
+        level = 0
+        while len(values) > 1:
+            level += 1
+            values = cls._evaluate_chunks(fold(level), split(values, 2), run)
+        return {action.result: values[0]}
+
+    @classmethod
+    def _evaluate_branch(cls, action, context, params, run, path):
+        condition = params[CONDITION]
+        branch = action.choose(condition)
+        branch_params = {code: params[code] for code in branch.get_inlets_keys()}
+        # у веток разные пути: контрольные точки одной не подходят другой
+        return cls._evaluate(branch, context, branch_params, run=run, path=path + (0 if condition else 1, ))
+
+    @classmethod
+    def _evaluate_loop(cls, action, context, params, run, path):
+        body = action.body
+        values = {code: params[code] for code in body.get_inlets_keys()}
+        # результаты Шагов тела на прошлой итерации: (параметры, результаты)
+        memo = dict()
+        for iteration in range(action.max_iter):
+            # пути итерации: (номер итерации, 0) - тело, (номер итерации, 1) - условие
+            body_path = path + (iteration, 0)
+            if isinstance(body, Algorithm):
+                result = cls._evaluate_body(body, context, values, run, body_path, memo)
+            else:
+                result = cls._evaluate(body, context, values, run=run, path=body_path)
+            converged = all(unchanged(values[code], result[code]) for code in action.carried)
+            values.update((code, result[code]) for code in action.carried)
+            if converged:
+                break
+            if action.until is not None:
+                condition = cls._evaluate(action.until, context, action.condition_params(result), run=run,
+                                          path=path + (iteration, 1))
+                if list(condition.values())[0]:
+                    break
+        return result
+
+    @classmethod
+    def _evaluate_body(cls, body, context, params, run, path, memo):
+        """
+        Итерация Алгоритма-тела цикла: Шаги без побочных эффектов, параметры которых не изменились
+        с прошлой итерации, не выполняются - берутся их прошлые результаты
+        """
+        params = dict(params)
+        cls._add_context_if_needed(body, context, params)
+        params = cls._validate(body, params, 'in', run)
+        let_values = {body.get_inlet(code=code): value for code, value in params.items()}
+        for n in body.get_order():
+            step = body.steps[n]
+            step_params = cls._prepare_step_params(body, step, let_values, context)
+            previous = memo.get(n)
+            reused = previous is not None and step.action.pure and all(
+                unchanged(previous[0][code], value) for code, value in step_params.items())
+            if run.metrics is not None:
+                run.metrics.observe_cache('loop', reused)
+            if reused:
+                step_result = previous[1]
+            else:
+                step_result = cls._completed_step(step, run, path)
+                if step_result is None:
+                    step_result = cls._run_step(step, context, step_params, run, path)
+                memo[n] = (step_params, step_result)
+            for code, value in step_result.items():
+                let_values[step.get_outlet(code=code)] = value
+        return cls._validate(body, cls._prepare_alg_results(body, let_values), 'out', run)
+
+    @classmethod
+    def _evaluate_chunks(cls, function, chunks, run):
+        """
+        Выполнение function(offset, chunk) для всех частей коллекции
+        (с concurrent-исполнителем - одновременно)
+
+        :return: [<результат function>, ...] в порядке частей
+        """
+        offsets = [0]
+        for chunk in chunks[:-1]:
+            offsets.append(offsets[-1] + len(chunk))
+        calls = [functools.partial(function, offset, chunk) for offset, chunk in zip(offsets, chunks)]
+        if run.executor is None or not run.executor.concurrent or len(calls) < 2:
+            return [call() for call in calls]
+        futures = [run.executor.spawn(call) for call in calls]
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+
+    @classmethod
+    def _evaluate_element(cls, action, context, params, run, path):
+        run.check_cancelled()
+        resource_class = ResourceClassPool.find(action.resource_class) if action.resource_class else None
+        if resource_class is None:
+            return cls._evaluate(action, context, params, run=run, path=path)
+        # приоритет элемента - длина его собственного критического пути (для Алгоритма - Algorithm.cost)
+        with resource_class.slot(priority=action.cost, token=run.token):
+            return cls._evaluate(action, context, params, run=run, path=path)
+
     @classmethod
     def _result_to_dict(cls, res, action):
         action_outlets = action.get_outlets()
@@ -53,9 +422,10 @@ class BaseInterpreter:
         return {action.get_outlet(index=i).code: res[i] for i in range(len(action_outlets))}
 
     @classmethod
-    def _evaluate_algorithm(cls, algorithm, context, params):
+    def _evaluate_algorithm(cls, algorithm, context, params, run=None, path=(), outputs=None):
         let_values = dict()
-        
+        required = algorithm.required_steps(outputs) if outputs is not None else None
+
         def append_step_results(letable, results):
             for code, value in results.items():
                 let_values[letable.get_outlet(code=code)] = value
@@ -64,14 +434,122 @@ class BaseInterpreter:
         for code, value in params.items():
             let_values[algorithm.get_inlet(code=code)] = value
 
-        for step in algorithm:
-            step_params = cls._prepare_step_params(algorithm, step, let_values, context)
-            step_result = cls._evaluate(step.action, context, params=step_params)
-            append_step_results(step, step_result)
-        results = cls._prepare_alg_results(algorithm, let_values)
+        steps = [algorithm.steps[n] for n in algorithm.get_order() if required is None or n in required]
+        if run.executor is not None and run.executor.concurrent and len(steps) > 1:
+            cls._evaluate_steps_concurrently(algorithm, steps, let_values, context, run, path)
+        else:
+            index = algorithm.get_index()
+            numbers = set(step.number for step in steps)
+            remaining = {n: len(index.consumers[n] & numbers) for n in numbers}
+
+            def release(n):
+                # результаты, которые больше никому не нужны, не держим до конца Алгоритма
+                if remaining[n] == 0 and n not in index.outputs:
+                    for outlet in algorithm.steps[n].get_outlets().values():
+                        let_values.pop(outlet, None)
+
+            for step in steps:
+                step_result = cls._completed_step(step, run, path)
+                if step_result is None:
+                    step_params = cls._prepare_step_params(algorithm, step, let_values, context)
+                    step_result = cls._run_step(step, context, step_params, run, path)
+                    del step_params
+                append_step_results(step, step_result)
+                del step_result
+                for p in index.producers[step.number]:
+                    remaining[p] -= 1
+                    release(p)
+                release(step.number)
+        results = cls._prepare_alg_results(algorithm, let_values, outputs)
         del let_values
         return results
 
+    @classmethod
+    def _evaluate_steps_concurrently(cls, algorithm, steps, let_values, context, run, path):
+        """
+        Выполнение Шагов по готовности: Шаг запускается, как только закончились все Шаги,
+        которых он ждет (DependencyIndex.waits_for), независимые Шаги выполняются одновременно
+        """
+        index = algorithm.get_index()
+        numbers = set(step.number for step in steps)
+        waiting = {step.number: len(index.waits_for[step.number] & numbers) for step in steps}
+        # готовые Шаги запускаются в порядке убывания длины критического пути
+        ready = []
+        for step in steps:
+            if waiting[step.number] == 0:
+                heapq.heappush(ready, (-index.critical_length[step.number], step.number))
+        running = dict()
+        error = None
+        while ready or running:
+            while ready and error is None:
+                step = algorithm.steps[heapq.heappop(ready)[1]]
+                step_result = cls._completed_step(step, run, path)
+                if step_result is not None:
+                    future = Future()
+                    future.set_result(step_result)
+                else:
+                    step_params = cls._prepare_step_params(algorithm, step, let_values, context)
+                    future = run.executor.spawn(functools.partial(
+                        cls._run_step, step, context, step_params, run, path))
+                running[future] = step
+            if not running:
+                break
+            done, _ = wait(list(running), timeout=poll_interval(run.token), return_when=FIRST_COMPLETED)
+            if error is None:
+                # запущенные Шаги не ждем: они сами остановятся на следующей проверке
+                run.check_cancelled()
+            for future in done:
+                step = running.pop(future)
+                if future.exception() is not None:
+                    # новые Шаги не запускаем, дожидаемся уже запущенных
+                    error = error or future.exception()
+                    continue
+                for code, value in future.result().items():
+                    let_values[step.get_outlet(code=code)] = value
+                for n in sorted(index.unblocks[step.number] & numbers):
+                    waiting[n] -= 1
+                    if waiting[n] == 0:
+                        heapq.heappush(ready, (-index.critical_length[n], n))
+        if error is not None:
+            raise error
+
+    @classmethod
+    def _completed_step(cls, step, run, path):
+        step_result = run.get_completed(path + (step.number, ))
+        if run.completed and run.metrics is not None:
+            run.metrics.observe_cache('checkpoint', step_result is not None)
+        return step_result
+
+    @classmethod
+    def _run_step(cls, step, context, params, run, path):
+        run.check_cancelled()
+        step_path = path + (step.number, )
+        resource_class = ResourceClassPool.find(step.action.resource_class) if step.action.resource_class else None
+        if resource_class is None:
+            step_result = cls._evaluate_step(step, context, params, run=run, path=step_path)
+        else:
+            priority = step.algorithm.get_index().critical_length[step.number]
+            with resource_class.slot(priority=priority, token=run.token):
+                step_result = cls._evaluate_step(step, context, params, run=run, path=step_path)
+        run.record_step(step_path, step.action, params, step_result)
+        streams = [code for code, outlet in step.action.get_outlets().items() if is_stream(outlet)]
+        # поток не сохранить в контрольную точку
+        run.step_done(step_path, step_result, save=not streams)
+        # производитель потока работает одновременно с потребителем
+        if streams and not isinstance(step.action, Algorithm):
+            for code in streams:
+                step_result[code] = run.open_stream(step_result[code], size=cls.stream_buffer)
+        return step_result
+
+    @classmethod
+    def _evaluate_step(cls, step, context, params, run, path):
+        if run.profiler is None:
+            return cls._evaluate(step.action, context, params=params, run=run, path=path)
+        with run.profiler.measure(path, step) as record:
+            result = cls._evaluate(step.action, context, params=params, run=run, path=path)
+            record.set_outputs(result)
+        return result
+
     @classmethod
     def _prepare_step_params(cls, algorithm, step, let_values, context):
         def get_value(stepinlet):
@@ -86,9 +564,15 @@ class BaseInterpreter:
             stepinlet.inlet.code: get_value(stepinlet) for stepinlet in step.get_inlets().values()}
 
     @classmethod
-    def _prepare_alg_results(cls, algorithm, let_values):
-        return {
-            outlet.code: let_values[algorithm.binds[outlet]] for outlet in algorithm.get_outlets().values()}
+    def _prepare_alg_results(cls, algorithm, let_values, outputs=None):
+        def get_value(outlet):
+            from_let = algorithm.binds[outlet]
+            if isinstance(from_let, Const):
+                return from_let.value
+            return let_values[from_let]
+        outlets = algorithm.get_outlets()
+        codes = outputs if outputs is not None else outlets.keys()
+        return {code: get_value(outlets[code]) for code in codes}
 
     @classmethod
     def _add_context_if_needed(cls, action, context, params):
@@ -99,6 +583,10 @@ class BaseInterpreter:
 
     @classmethod
     def _choose_implementation(cls, action, context, params):
+        return ImplementationPool.get(code=action.code, engine=cls._choose_engine(action, context, params))
+
+    @classmethod
+    def _choose_engine(cls, action, context, params):
         choices = ImplementationPool.list(code=action.code)
         if len(choices) == 0:
             raise InvalidParams('Strategies for action {code} does not exist'.format(code=action.code))
@@ -109,7 +597,7 @@ class BaseInterpreter:
                     'For engine `{engine}` not declared Implementation for action `{action}`'.format(
                         engine=context.get('engine'), action=action.code
                     ))
-            return choices[context.get('engine')]
+            return context.get('engine')
         # first choice
         for key in choices:
-            return choices[key]
+            return key
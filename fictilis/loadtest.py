@@ -0,0 +1,286 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer
+
+from . import utils
+from .action import ActionPool
+from .distributed import resolve_setup
+from .errors import InvalidParams, WorkerLost
+from .explain import Profiler
+from .interpreter import BaseInterpreter
+
+# сообщение процесса-вызывающего о готовности (Действия загружены)
+_READY = 'ready'
+
+THREADS = 'threads'
+PROCESSES = 'processes'
+ASYNCIO = 'asyncio'
+
+
+class _Sample:
+    """
+    Замеры одного вызывающего
+    """
+    def __init__(self):
+        self.latencies = []
+        self.errors = []
+        self.steps = dict()
+
+    def call(self, invoke, number, scheduled, profile):
+        profiler = Profiler() if profile else None
+        try:
+            invoke(number, profiler)
+        except Exception as e:
+            self.errors.append(repr(e))
+        else:
+            self.latencies.append(default_timer() - scheduled)
+        if profiler is not None:
+            self.add_profile(profiler)
+
+    def add_profile(self, profiler):
+        for path, record in profiler.steps.items():
+            key = ('.'.join(str(n) for n in path), record.step.action.code)
+            self.steps.setdefault(key, []).append(record.wall)
+
+
+def _drive(invoke, interval, duration, profile):
+    """
+    Вызывающий в замкнутом цикле: следующий вызов - только после окончания предыдущего,
+    но не чаще, чем раз в interval секунд
+
+    Задержка считается от запланированного момента вызова: если вызывающий не успевает за частотой,
+    ожидание "своей очереди" входит в задержку
+    """
+    sample = _Sample()
+    stop_at = default_timer() + duration
+    scheduled = default_timer()
+    number = 0
+    while True:
+        now = default_timer()
+        if interval and scheduled > now:
+            time.sleep(scheduled - now)
+            now = default_timer()
+        if now >= stop_at:
+            return sample
+        sample.call(invoke, number, scheduled if interval else now, profile)
+        scheduled += interval
+        number += 1
+
+
+async def _drive_async(loop, pool, invoke, interval, duration, profile):
+    sample = _Sample()
+    stop_at = default_timer() + duration
+    scheduled = default_timer()
+    number = 0
+    while True:
+        now = default_timer()
+        if interval and scheduled > now:
+            await asyncio.sleep(scheduled - now)
+            now = default_timer()
+        if now >= stop_at:
+            return sample
+        await loop.run_in_executor(pool, sample.call, invoke, number, scheduled if interval else now, profile)
+        scheduled += interval
+        number += 1
+
+
+def _make_invoke(interpreter, algorithm, params, context, evaluate_kwargs):
+    def invoke(number, profiler):
+        call_params = params(number) if callable(params) else params
+        return interpreter.evaluate(
+            algorithm, context=context, params=call_params, profiler=profiler, **evaluate_kwargs)
+    return invoke
+
+
+def _process_main(code, params, context, evaluate_kwargs, interval, duration, profile, setup, results, go):
+    setup = resolve_setup(setup)
+    if setup is not None:
+        setup()
+    invoke = _make_invoke(BaseInterpreter, ActionPool.get(code), params, context, evaluate_kwargs)
+    # нагрузка начинается одновременно во всех процессах - после их запуска
+    results.put(_READY)
+    go.wait()
+    sample = _drive(invoke, interval, duration, profile)
+    results.put((sample.latencies, sample.errors, sample.steps))
+
+
+class LoadReport:
+    """
+    Результат нагрузочного теста
+
+        :param latencies: [<float>, ...] задержки успешных вызовов (секунды)
+        :param errors: [<str>, ...] ошибки
+        :param elapsed: длительность теста (секунды)
+        :param steps: <dict((путь, код Действия)=[<float>, ...], ...)> время Шагов (если собиралось)
+    """
+    def __init__(self, latencies, errors, elapsed, steps=None, concurrency=None, mode=None):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.steps = {key: sorted(values) for key, values in (steps or dict()).items()}
+        self.concurrency = concurrency
+        self.mode = mode
+
+    @property
+    def calls(self):
+        return len(self.latencies) + len(self.errors)
+
+    @property
+    def throughput(self):
+        """
+        :return: <float> успешных вызовов в секунду
+        """
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.
+
+    @property
+    def error_rate(self):
+        return len(self.errors) / float(self.calls) if self.calls else 0.
+
+    def percentile(self, percentile):
+        """
+        :param percentile: перцентиль (0..100]
+        :return: <float> секунды или None
+        """
+        return utils.percentile(self.latencies, percentile)
+
+    @property
+    def max(self):
+        return self.latencies[-1] if self.latencies else None
+
+    def __str__(self):
+        def ms(value):
+            return '-' if value is None else '{:.3f}ms'.format(value * 1000)
+
+        lines = [
+            'Load: {} x {} for {:.1f}s: {} calls, {:.1f} calls/s, errors {:.2%}'.format(
+                self.concurrency, self.mode, self.elapsed, self.calls, self.throughput, self.error_rate),
+            '  latency: p50={} p95={} p99={} max={}'.format(
+                ms(self.percentile(50)), ms(self.percentile(95)), ms(self.percentile(99)), ms(self.max))]
+        if self.steps:
+            lines.append('  steps:')
+            for (path, code), values in sorted(self.steps.items()):
+                lines.append('    {} {}: p50={} p99={} ({} calls)'.format(
+                    path, code, ms(utils.percentile(values, 50)), ms(utils.percentile(values, 99)), len(values)))
+        for error in sorted(set(self.errors))[:10]:
+            lines.append('  error: {}'.format(error))
+        return '\n'.join(lines)
+
+
+def load_test(algorithm, params, concurrency=4, rate=None, duration=10., mode=THREADS, interpreter=None,
+              context=None, steps=False, setup=None, mp_context=None, **evaluate_kwargs):
+    """
+    Нагрузочный тест: concurrency вызывающих в замкнутом цикле выполняют Алгоритм в течение duration секунд
+
+    :param algorithm: Алгоритм (или Действие)
+    :param params: <dict> параметры или <func(номер вызова)> -> <dict>
+    :param concurrency: количество одновременных вызывающих
+    :param rate: целевая частота вызовов в секунду (на всех; None - без ограничения)
+    :param duration: секунды
+    :param mode: THREADS, PROCESSES (в каждом процессе - один вызывающий) или ASYNCIO
+                 (задачи asyncio, вызовы - в пуле из concurrency потоков)
+    :param interpreter: Интерпретатор (по умолчанию - BaseInterpreter; в режиме PROCESSES - всегда он)
+    :param context: Контекст (в режиме PROCESSES должен сериализоваться)
+    :param steps: собирать ли время каждого Шага
+    :param setup: для режима PROCESSES - см. distributed.worker_main
+                  (с fork-контекстом multiprocessing Действия наследуются и так)
+    :param mp_context: контекст multiprocessing (или его имя, например 'spawn') для режима PROCESSES
+    :param evaluate_kwargs: прочие аргументы evaluate (например: executor=, deadline=)
+    :return: <LoadReport>
+    """
+    interpreter = interpreter or BaseInterpreter
+    if concurrency < 1:
+        raise InvalidParams('Concurrency must be positive, got {}'.format(concurrency))
+    interval = concurrency / float(rate) if rate else 0.
+    started = default_timer()
+    if mode == THREADS:
+        samples = _run_threads(interpreter, algorithm, params, context, evaluate_kwargs, concurrency,
+                               interval, duration, steps)
+    elif mode == ASYNCIO:
+        samples = _run_asyncio(interpreter, algorithm, params, context, evaluate_kwargs, concurrency,
+                               interval, duration, steps)
+    elif mode == PROCESSES:
+        # время запуска процессов не входит в длительность теста
+        samples, started = _run_processes(algorithm, params, context, evaluate_kwargs, concurrency,
+                                          interval, duration, steps, setup, mp_context)
+    else:
+        raise InvalidParams('Unknown load test mode `{}`'.format(mode))
+    elapsed = default_timer() - started
+    latencies, errors, step_times = [], [], dict()
+    for sample in samples:
+        latencies.extend(sample.latencies)
+        errors.extend(sample.errors)
+        for key, values in sample.steps.items():
+            step_times.setdefault(key, []).extend(values)
+    return LoadReport(latencies, errors, elapsed, step_times, concurrency=concurrency, mode=mode)
+
+
+def _run_threads(interpreter, algorithm, params, context, evaluate_kwargs, concurrency, interval, duration, steps):
+    invoke = _make_invoke(interpreter, algorithm, params, context, evaluate_kwargs)
+    samples = [None] * concurrency
+
+    def caller(i):
+        samples[i] = _drive(invoke, interval, duration, steps)
+    threads = [threading.Thread(target=caller, args=(i, ), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def _run_asyncio(interpreter, algorithm, params, context, evaluate_kwargs, concurrency, interval, duration, steps):
+    invoke = _make_invoke(interpreter, algorithm, params, context, evaluate_kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(concurrency) as pool:
+            return await asyncio.gather(*[
+                _drive_async(loop, pool, invoke, interval, duration, steps) for _ in range(concurrency)])
+    return asyncio.run(main())
+
+
+def _run_processes(algorithm, params, context, evaluate_kwargs, concurrency, interval, duration, steps, setup,
+                   mp_context):
+    """
+    :return: [<_Sample>, ...], момент начала нагрузки (все процессы готовы)
+    """
+    if isinstance(mp_context, str):
+        mp_context = multiprocessing.get_context(mp_context)
+    mp_context = mp_context or multiprocessing.get_context()
+    results = mp_context.Queue()
+    go = mp_context.Event()
+    processes = [
+        mp_context.Process(target=_process_main, daemon=True, args=(
+            algorithm.code, params, context, evaluate_kwargs, interval, duration, steps, setup, results, go))
+        for _ in range(concurrency)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        _receive(results, processes)
+    go.set()
+    started = default_timer()
+    samples = []
+    for _ in processes:
+        sample = _Sample()
+        sample.latencies, sample.errors, sample.steps = _receive(results, processes)
+        samples.append(sample)
+    for process in processes:
+        process.join()
+    return samples, started
+
+
+def _receive(results, processes):
+    while True:
+        try:
+            return results.get(timeout=0.1)
+        except queue.Empty:
+            # упавший процесс не пришлет сообщение - не ждем его вечно
+            failed = [process for process in processes if process.exitcode not in (None, 0)]
+            if failed:
+                for process in processes:
+                    process.terminate()
+                raise WorkerLost('Load test process exited with code {}'.format(failed[0].exitcode))
@@ -0,0 +1,166 @@
+import math
+
+from . import types
+from .action import Action, ActionPool
+from .errors import InvalidDeclaration, InvalidParams, NotExistsError
+from .parameter import Parameter
+
+# на сколько частей по умолчанию делится коллекция
+DEFAULT_CHUNKS = 16
+
+
+def split(items, chunk_size=None):
+    """
+    Разбиение коллекции на части
+
+    :param items: [<value>, ...]
+    :param chunk_size: размер части (None - коллекция делится на DEFAULT_CHUNKS частей)
+    :return: [[<value>, ...], ...]
+    """
+    if not items:
+        return []
+    size = chunk_size or max(1, math.ceil(len(items) / float(DEFAULT_CHUNKS)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _value_inlets(action):
+    return [code for code in action.get_inlets_keys() if action.get_inlet(code).get_type() != types.ContextType]
+
+
+def _list_of(let):
+    return Parameter(name=let.code, type_=types.ListOf(let.get_type()))
+
+
+def _same(let):
+    return Parameter(name=let.code, type_=let.get_type())
+
+
+def _get_or_create(cls, code, *args):
+    try:
+        action = ActionPool.get(code)
+    except NotExistsError:
+        return cls(code, *args)
+    if not isinstance(action, cls):
+        raise InvalidDeclaration('Action with code {} already exists and it is not {}'.format(code, cls.__name__))
+    return action
+
+
+class MapAction(Action):
+    """
+    Применение Действия (или Алгоритма) action к каждому элементу коллекции
+
+    Ввод over Действия становится списком, его Выводы - списками результатов (в порядке элементов);
+    остальные Вводы передаются в каждый вызов без изменений.
+    Интерпретатор выполняет элементы частями по chunk_size (см. split),
+    с concurrent-исполнителем - части выполняются одновременно
+
+        :param code: код Действия
+        :param action: применяемое Действие
+        :param over: код Ввода action, по которому идет перебор
+        :param chunk_size: размер части (None - по умолчанию)
+    """
+    def __init__(self, code, action, over, chunk_size=None):
+        self.action = action
+        self.over = over
+        self.chunk_size = chunk_size
+        in_params = [
+            _list_of(action.get_inlet(c)) if c == over else _same(action.get_inlet(c))
+            for c in action.get_inlets_keys()]
+        out_params = [_list_of(action.get_outlet(c)) for c in action.get_outlets_keys()]
+        super(MapAction, self).__init__(
+            code=code, in_params=in_params, out_params=out_params, pure=action.pure, cost=action.cost)
+
+    @classmethod
+    def of(cls, action, over, chunk_size=None):
+        """
+        Действие-перебор (для одинаковых аргументов - одно и то же)
+        :return: <MapAction>
+        """
+        if over not in _value_inlets(action):
+            raise InvalidDeclaration('Action `{}` does not have inlet `{}` to map over'.format(action.code, over))
+        code = 'Map[{}.{}{}]'.format(
+            action.code, over, ', chunk_size={}'.format(chunk_size) if chunk_size else '')
+        return _get_or_create(cls, code, action, over, chunk_size)
+
+
+class ReduceAction(Action):
+    """
+    Свертка коллекции Действием (или Алгоритмом) action
+
+    action принимает два значения (первый Ввод - накопленное, второй - очередной элемент) и возвращает одно;
+    операция должна быть ассоциативной: Интерпретатор сворачивает части коллекции
+    (с concurrent-исполнителем - одновременно), а затем объединяет результаты частей попарно, деревом.
+    Ввод-элемент становится списком, Ввод-накопленное - начальным значением (initial)
+
+        :param code: код Действия
+        :param action: сворачивающее Действие
+        :param chunk_size: размер части (None - по умолчанию)
+    """
+    def __init__(self, code, action, chunk_size=None):
+        self.action = action
+        self.chunk_size = chunk_size
+        self.accumulator, self.item = _value_inlets(action)
+        in_params = [
+            _list_of(action.get_inlet(c)) if c == self.item else _same(action.get_inlet(c))
+            for c in action.get_inlets_keys()]
+        out_params = [_same(action.get_outlet(c)) for c in action.get_outlets_keys()]
+        super(ReduceAction, self).__init__(
+            code=code, in_params=in_params, out_params=out_params, pure=action.pure, cost=action.cost)
+
+    @property
+    def result(self):
+        return self.get_outlets_keys()[0]
+
+    @classmethod
+    def of(cls, action, chunk_size=None):
+        """
+        Действие-свертка (для одинаковых аргументов - одно и то же)
+        :return: <ReduceAction>
+        """
+        if len(_value_inlets(action)) != 2 or len(action.get_outlets()) != 1:
+            raise InvalidDeclaration(
+                'Action `{}` can not be used in Reduce: it must have two inlets and one outlet'.format(action.code))
+        code = 'Reduce[{}{}]'.format(action.code, ', chunk_size={}'.format(chunk_size) if chunk_size else '')
+        return _get_or_create(cls, code, action, chunk_size)
+
+
+def Map(action, collection, chunk_size=None, **kwargs):
+    """
+    Перебор коллекции в MagicAlgorithmBuilder:
+
+        ```
+        def builder(numbers, power):
+            return Map(Power, numbers, power=power)   # [Power(n, power) for n in numbers]
+        ```
+
+    :param action: Действие или Алгоритм
+    :param collection: Шаг, Вывод или Ввод со списком
+    :param chunk_size: размер части (см. MapAction)
+    :param kwargs: значения остальных Вводов action (одинаковые для всех элементов)
+    :return: <Step> - его Выводы - списки результатов
+    """
+    remaining = [code for code in _value_inlets(action) if code not in kwargs]
+    if len(remaining) != 1:
+        raise InvalidParams('Map over `{}`: exactly one inlet must stay unbound, got {}'.format(
+            action.code, ', '.join(remaining) or 'none'))
+    over = remaining[0]
+    return MapAction.of(action, over, chunk_size)(**dict(kwargs, **{over: collection}))
+
+
+def Reduce(action, collection, initial, chunk_size=None):
+    """
+    Свертка коллекции в MagicAlgorithmBuilder:
+
+        ```
+        def builder(numbers):
+            return Reduce(SumA, numbers, initial=0)
+        ```
+
+    :param action: Действие или Алгоритм (ассоциативная операция, см. ReduceAction)
+    :param collection: Шаг, Вывод или Ввод со списком
+    :param initial: начальное значение
+    :param chunk_size: размер части
+    :return: <Step>
+    """
+    reduce_action = ReduceAction.of(action, chunk_size)
+    return reduce_action(**{reduce_action.accumulator: initial, reduce_action.item: collection})
@@ -0,0 +1,127 @@
+from .errors import InvalidDeclaration
+
+
+def step_sizes(algorithm, sizes=None):
+    """
+    Размеры результатов Шагов
+
+    :param algorithm: Алгоритм
+    :param sizes: <dict(step.number=<int>, ...)> измеренные размеры (например: Explanation.output_sizes());
+                  для остальных Шагов - сумма size_hint Выводов (неизвестные - 0)
+    :return: <dict(step.number=<int>, ...)> байты
+    """
+    sizes = sizes or dict()
+    result = dict()
+    for step in algorithm.steps:
+        if step.number in sizes:
+            result[step.number] = sizes[step.number]
+        else:
+            result[step.number] = sum(
+                outlet.parameter.get_size_hint() or 0 for outlet in step.action.get_outlets().values())
+    return result
+
+
+def peak_memory(algorithm, order, sizes):
+    """
+    Пиковый объем одновременно живущих результатов Шагов при выполнении в порядке order
+
+    Результат Шага живет от выполнения Шага до выполнения его последнего потребителя
+    (результаты, идущие в Выводы Алгоритма, - до конца)
+
+    :param algorithm: Алгоритм
+    :param order: [step.number, ...]
+    :param sizes: см. step_sizes
+    :return: <int> байты
+    """
+    index = algorithm.get_index()
+    remaining = {n: len(index.consumers[n]) for n in order}
+    live = peak = 0
+    for n in order:
+        live += sizes[n]
+        peak = max(peak, live)
+        for p in index.producers[n]:
+            remaining[p] -= 1
+            if remaining[p] == 0 and p not in index.outputs:
+                live -= sizes[p]
+        if remaining[n] == 0 and n not in index.outputs:
+            live -= sizes[n]
+    return peak
+
+
+class MemoryPlan:
+    """
+    Порядок выполнения Шагов, уменьшающий пиковый объем живых результатов
+
+        :param order: [step.number, ...]
+        :param peak: пик для order (байты)
+        :param registration_peak: пик для порядка регистрации Шагов
+    """
+    def __init__(self, order, peak, registration_peak):
+        self.order = order
+        self.peak = peak
+        self.registration_peak = registration_peak
+
+    def __repr__(self):
+        return 'MemoryPlan(order={}, peak={}, registration_peak={})'.format(
+            self.order, self.peak, self.registration_peak)
+
+
+def plan_order(algorithm, sizes=None):
+    """
+    Выбор топологического порядка Шагов с наименьшим (жадно) пиком живых результатов
+
+    На каждом шаге из готовых Шагов (DependencyIndex.waits_for - с учетом порядка побочных эффектов)
+    выбирается тот, после которого живых данных прибавится меньше всего:
+    размер его результатов минус размер входов, для которых он - последний потребитель
+
+    :param algorithm: Алгоритм
+    :param sizes: см. step_sizes
+    :return: <MemoryPlan>
+    """
+    index = algorithm.get_index()
+    sizes = step_sizes(algorithm, sizes)
+    numbers = [step.number for step in algorithm.steps]
+    waiting = {n: len(index.waits_for[n]) for n in numbers}
+    remaining = {n: len(index.consumers[n]) for n in numbers}
+    ready = set(n for n in numbers if waiting[n] == 0)
+
+    def growth(n):
+        freed = sum(sizes[p] for p in index.producers[n] if remaining[p] == 1 and p not in index.outputs)
+        if not index.consumers[n] and n not in index.outputs:
+            freed += sizes[n]
+        return sizes[n] - freed, -freed, n
+
+    order = []
+    while ready:
+        n = min(ready, key=growth)
+        ready.remove(n)
+        order.append(n)
+        for p in index.producers[n]:
+            remaining[p] -= 1
+        for u in index.unblocks[n]:
+            waiting[u] -= 1
+            if waiting[u] == 0:
+                ready.add(u)
+    if len(order) != len(numbers):
+        raise InvalidDeclaration('Algorithm `{}` has cyclic dependencies between steps'.format(algorithm.code))
+    registration = numbers if _is_valid(index, numbers) else index.order
+    return MemoryPlan(order, peak_memory(algorithm, order, sizes), peak_memory(algorithm, registration, sizes))
+
+
+def _is_valid(index, order):
+    done = set()
+    for n in order:
+        if not index.waits_for[n] <= done:
+            return False
+        done.add(n)
+    return True
+
+
+def check_order(algorithm, order):
+    """
+    :raises: InvalidDeclaration, если order - не допустимый порядок выполнения Шагов
+    """
+    index = algorithm.get_index()
+    if sorted(order) != sorted(step.number for step in algorithm.steps) or not _is_valid(index, order):
+        raise InvalidDeclaration('Order {} of steps of algorithm `{}` breaks dependencies between steps'.format(
+            list(order), algorithm.code))
@@ -0,0 +1,201 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from timeit import default_timer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (.0005, .001, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10., 30., 60.)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels_to_str(names, values, extra=None):
+    pairs = ['{}="{}"'.format(n, _escape(v)) for n, v in zip(names, values)]
+    if extra:
+        pairs.append('{}="{}"'.format(extra[0], _escape(extra[1])))
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Метрика - семейство значений, различающихся набором меток
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = dict()
+        self._lock = threading.Lock()
+
+    def render(self):
+        """
+        :return: [<str>, ...] строки в текстовом формате Prometheus
+        """
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.type)]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda i: tuple(str(v) for v in i[0]))
+        for labels, value in items:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return ['{}{} {}'.format(self.name, _labels_to_str(self.labelnames, labels), _number(value))]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'), )
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0., 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append('{}_bucket{} {}'.format(
+                self.name, _labels_to_str(self.labelnames, labels, ('le', _number(bound))), cumulative))
+        labels_str = _labels_to_str(self.labelnames, labels)
+        lines.append('{}_sum{} {}'.format(self.name, labels_str, _number(total)))
+        lines.append('{}_count{} {}'.format(self.name, labels_str, count))
+        return lines
+
+
+class MetricsCollector:
+    """
+    Сборщик метрик выполнения
+
+    Подключается к Интерпретатору (BaseInterpreter.metrics = MetricsCollector()),
+    отдает накопленное в текстовом формате Prometheus (MetricsCollector.render)
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.calls = Counter(
+            'fictilis_action_calls_total', 'Implementation calls', ('action', 'engine'))
+        self.errors = Counter(
+            'fictilis_action_errors_total', 'Implementation calls finished with an error', ('action', 'engine'))
+        self.duration = Histogram(
+            'fictilis_action_duration_seconds', 'Implementation call latency', ('action', 'engine'), buckets)
+        self.algorithm_calls = Counter(
+            'fictilis_algorithm_calls_total', 'Algorithm evaluations', ('algorithm', ))
+        self.algorithm_errors = Counter(
+            'fictilis_algorithm_errors_total', 'Algorithm evaluations finished with an error', ('algorithm', ))
+        self.algorithm_duration = Histogram(
+            'fictilis_algorithm_duration_seconds', 'Algorithm evaluation latency', ('algorithm', ), buckets)
+        self.validation_duration = Histogram(
+            'fictilis_validation_duration_seconds', 'Time spent validating parameters',
+            ('action', 'direction'), buckets)
+        self.in_flight = Gauge(
+            'fictilis_evaluations_in_flight', 'Top-level evaluations in progress')
+        self.cache_requests = Counter(
+            'fictilis_cache_requests_total', 'Cache lookups by result', ('cache', 'result'))
+        self.metrics = [
+            self.calls, self.errors, self.duration,
+            self.algorithm_calls, self.algorithm_errors, self.algorithm_duration,
+            self.validation_duration, self.in_flight, self.cache_requests]
+
+    def observe_call(self, action, engine, duration, error=False):
+        labels = (action, engine)
+        self.calls.inc(labels)
+        if error:
+            self.errors.inc(labels)
+        self.duration.observe(duration, labels)
+
+    def observe_algorithm(self, algorithm, duration, error=False):
+        labels = (algorithm, )
+        self.algorithm_calls.inc(labels)
+        if error:
+            self.algorithm_errors.inc(labels)
+        self.algorithm_duration.observe(duration, labels)
+
+    def observe_validation(self, action, direction, duration):
+        self.validation_duration.observe(duration, (action, direction))
+
+    def observe_cache(self, cache, hit):
+        self.cache_requests.inc((cache, 'hit' if hit else 'miss'))
+
+    @contextmanager
+    def timer(self, observe, *labels):
+        """
+        Менеджер контекста: замер длительности блока
+
+        :param observe: <func(*labels, duration, error)> например, MetricsCollector.observe_call
+        :param labels: метки
+        """
+        start = default_timer()
+        try:
+            yield
+        except BaseException:
+            observe(*labels, duration=default_timer() - start, error=True)
+            raise
+        observe(*labels, duration=default_timer() - start)
+
+    def cache_hit_ratio(self, cache):
+        """
+        :param cache: название кэша
+        :return: <float> доля попаданий или None, если обращений не было
+        """
+        hits = self.cache_requests.get((cache, 'hit'))
+        total = hits + self.cache_requests.get((cache, 'miss'))
+        return hits / float(total) if total else None
+
+    def render(self):
+        """
+        :return: <str> метрики в текстовом формате Prometheus
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def exposition(collector):
+    """
+    Ответ для HTTP-обработчика
+
+    :param collector: <MetricsCollector>
+    :return: (<str> тело ответа, <str> Content-Type)
+    """
+    return collector.render(), CONTENT_TYPE
@@ -7,10 +7,20 @@ class Parameter:
     Переменная
 
     Имеет Название и Тип
+
+    size_hint - ожидаемый размер значения в байтах (для планирования памяти, см. memory.plan_order);
+    по умолчанию берется из Типа
     """
-    def __init__(self, name, type_=types.Any):
+    def __init__(self, name, type_=types.Any, size_hint=None):
         self.type = type_
         self.name = name
+        self.size_hint = size_hint
+
+    def get_size_hint(self):
+        """
+        :return: <int> ожидаемый размер значения в байтах или None
+        """
+        return self.size_hint if self.size_hint is not None else self.type.size_hint
 
     def __repr__(self):
         return 'Var(name={}, type={})'.format(self.name, self.type.code)
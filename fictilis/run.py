@@ -0,0 +1,127 @@
+import warnings
+
+from .fusion import ScriptFuser
+from .streaming import BufferedStream
+from .workload import plain_values
+
+
+class Run:
+    """
+    Запуск - состояние одного вызова Интерпретатора
+
+    Передается через все уровни выполнения (включая вложенные Алгоритмы)
+    и хранит то, что относится к запуску в целом, а не к отдельному Шагу
+
+        :param run_id: идентификатор запуска
+        :param checkpoint: <BaseCheckpointStore> хранилище контрольных точек (или None)
+        :param completed: <dict(path=results, ...)> результаты ранее выполненных Шагов
+        :param metrics: <MetricsCollector> сборщик метрик (или None)
+        :param profiler: <explain.Profiler> сборщик профилей Шагов (или None)
+        :param executor: <executor.BaseExecutor> исполнитель (None - Реализации вызываются в текущем потоке)
+        :param token: <cancellation.CancellationToken> токен отмены (или None)
+        :param recording: <dict> куда записывать параметры и результаты Шагов (см. workload.WorkloadRecorder)
+    """
+    def __init__(self, run_id=None, checkpoint=None, completed=None, metrics=None, profiler=None,
+                 executor=None, token=None, recording=None):
+        self.run_id = run_id
+        self.checkpoint = checkpoint
+        self.completed = completed or dict()
+        self.fuser = ScriptFuser()
+        self.metrics = metrics
+        self.profiler = profiler
+        self.executor = executor
+        self.token = token
+        self.recording = recording
+        # пути Шагов, выполненных в этом запуске
+        self.done = []
+        # буферизованные потоки, созданные Шагами запуска
+        self.streams = []
+
+    def get_completed(self, path):
+        """
+        Результаты Шага, сохраненные предыдущим запуском
+        :param path: <tuple> путь Шага
+        :return: <dict> | None
+        """
+        return self.completed.get(path)
+
+    def check_cancelled(self):
+        """
+        :raises: EvaluationCancelled, если запуск отменен или истек его deadline
+        """
+        if self.token is not None:
+            self.token.check()
+
+    def cancelled(self, error):
+        """
+        Дополнение ошибки отмены списком выполненных Шагов
+        :param error: <EvaluationCancelled>
+        :return: <EvaluationCancelled>
+        """
+        error.completed = sorted(self.done)
+        return error
+
+    def record_step(self, path, action, params, results):
+        """
+        Запись параметров и результатов Шага (если запуск записывается)
+        :param path: <tuple> путь Шага
+        :param action: Действие Шага
+        """
+        if self.recording is not None:
+            self.recording[path] = (
+                plain_values(params, action.get_inlets()), plain_values(results, action.get_outlets()))
+
+    def step_done(self, path, results, save=True):
+        """
+        Шаг выполнен - сохраняем контрольную точку
+        :param path: <tuple> путь Шага
+        :param results: <dict> результаты Шага
+        :param save: сохранять ли контрольную точку (результаты-потоки не сохраняются)
+        """
+        self.done.append(path)
+        if save and self.checkpoint is not None:
+            # результаты отложенных скриптов еще не существуют в БД - сохранять их рано
+            self.fuser.flush()
+            self.checkpoint.save(self.run_id, path, results)
+
+    def open_stream(self, iterable, size):
+        """
+        Буферизованный поток-результат Шага: закрывается запуском (см. close_streams)
+        :param iterable: исходный поток
+        :param size: размер буфера
+        :return: <BufferedStream>
+        """
+        stream = BufferedStream(iterable, size=size)
+        self.streams.append(stream)
+        return stream
+
+    def close_streams(self, keep=()):
+        """
+        Остановка производителей потоков, созданных Шагами, - когда запуск завершен или упал
+        :param keep: результаты запуска: потоки среди них отданы вызывающему и не закрываются
+        """
+        kept = {id(v) for v in keep} | {id(getattr(v, '_iterator', None)) for v in keep}
+        for stream in self.streams:
+            if id(stream) not in kept:
+                stream.close()
+        del self.streams[:]
+
+    def finish(self):
+        """
+        Успешное завершение запуска
+        """
+        self.fuser.flush()
+        if self.checkpoint is not None:
+            self.checkpoint.finish(self.run_id)
+
+    def abort(self):
+        """
+        Завершение упавшего (или отмененного) запуска
+
+        Отложенные скрипты выполненных Шагов выполняются - как выполнились бы без слияния;
+        ошибка их выполнения не подменяет ошибку запуска (только предупреждение)
+        """
+        try:
+            self.fuser.flush()
+        except Exception as e:
+            warnings.warn('Deferred scripts of run `{run_id}` failed: {e}'.format(run_id=self.run_id, e=e))
@@ -0,0 +1,102 @@
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+
+from .cancellation import poll_interval
+from .errors import AlreadyExistsError, InvalidParams, EvaluationCancelled
+
+
+class ResourceClass:
+    """
+    Класс ресурсов - ограничение количества одновременно выполняющихся Шагов,
+    Действия которых относятся к этому классу (Action(..., resource_class=code))
+
+    Освободившийся слот достается ожидающему Шагу с наибольшим приоритетом
+    (длиной критического пути от Шага до конца Алгоритма)
+
+        :param code: код класса (например: 'db', 'cpu', 'api')
+        :param limit: максимальное количество одновременно выполняющихся Шагов
+    """
+    def __init__(self, code, limit):
+        if limit < 1:
+            raise InvalidParams('Limit of resource class `{}` must be positive, got {}'.format(code, limit))
+        self.code = code
+        self.limit = limit
+        self.in_use = 0
+        self._waiters = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        ResourceClassPool.register(code=code, resource_class=self)
+
+    def acquire(self, priority=0, token=None):
+        """
+        Занять слот (ждет, пока освободится слот и не останется ожидающих с большим приоритетом)
+        :param priority: приоритет
+        :param token: <CancellationToken> - ожидание прерывается при его срабатывании
+        :raises: EvaluationCancelled
+        """
+        with self._cond:
+            ticket = (-priority, next(self._order))
+            heapq.heappush(self._waiters, ticket)
+            while self.in_use >= self.limit or self._waiters[0] != ticket:
+                if token is not None and token.cancelled:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    raise EvaluationCancelled(token.reason)
+                self._cond.wait(poll_interval(token))
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            # следующий ожидающий может тоже получить слот
+            self._cond.notify_all()
+
+    def release(self):
+        """
+        Освободить слот
+        """
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=0, token=None):
+        """
+        Менеджер контекста: слот на время блока
+        """
+        self.acquire(priority, token=token)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class ResourceClassPool:
+    """
+    Пул классов ресурсов
+
+    Для Действий с классом ресурсов, не зарегистрированным в пуле, ограничений нет
+    """
+    _pool = dict()
+
+    @staticmethod
+    def register(code, resource_class):
+        """
+        :param code: код класса ресурсов
+        :param resource_class: <ResourceClass>
+        """
+        if code in ResourceClassPool._pool:
+            raise AlreadyExistsError('Resource class {} already exists'.format(code))
+        ResourceClassPool._pool[code] = resource_class
+
+    @staticmethod
+    def find(code):
+        """
+        :param code: код класса ресурсов
+        :return: <ResourceClass> | None
+        """
+        return ResourceClassPool._pool.get(code)
+
+    @staticmethod
+    def _reset():
+        ResourceClassPool._pool = dict()
@@ -0,0 +1,297 @@
+import itertools
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from timeit import default_timer
+
+from .cancellation import CancellationToken, poll_interval
+from .context import Context
+from .errors import EvaluationCancelled, InvalidParams, RequestRejected
+from .executor import BaseExecutor
+from .interpreter import BaseInterpreter
+
+REJECT = 'reject'
+SHED = 'shed'
+DEFAULT_TENANT = 'default'
+
+
+class FairShare:
+    """
+    Слоты выполнения Реализаций, поровну разделяемые между арендаторами
+
+    Освободившийся слот достается арендатору, занимающему меньше всего слотов (с учетом веса),
+    среди его ожидающих - с наибольшим приоритетом, затем - первому пришедшему.
+    Поэтому арендатор с большим Алгоритмом не может занять все слоты, пока ждут другие
+
+        :param slots: количество одновременно выполняющихся вызовов Реализаций
+        :param weights: <dict(tenant=<float>, ...)> доли арендаторов (по умолчанию - 1)
+    """
+    def __init__(self, slots, weights=None):
+        if slots < 1:
+            raise InvalidParams('Number of slots must be positive, got {}'.format(slots))
+        self.slots = slots
+        self.weights = dict(weights or ())
+        self.in_use = 0
+        self.by_tenant = dict()
+        self._waiters = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def _share(self, tenant):
+        return self.by_tenant.get(tenant, 0) / float(self.weights.get(tenant, 1.))
+
+    def _next(self):
+        return min(self._waiters, key=lambda w: (self._share(w[0]), -w[1], w[2]))
+
+    def acquire(self, tenant, priority=0, token=None):
+        """
+        Занять слот
+
+        :param tenant: арендатор
+        :param priority: приоритет внутри арендатора
+        :param token: <CancellationToken> - ожидание прерывается при его срабатывании
+        :raises: EvaluationCancelled
+        """
+        with self._cond:
+            ticket = (tenant, priority, next(self._order))
+            self._waiters.append(ticket)
+            while self.in_use >= self.slots or self._next() != ticket:
+                if token is not None and token.cancelled:
+                    self._waiters.remove(ticket)
+                    self._cond.notify_all()
+                    raise EvaluationCancelled(token.reason)
+                self._cond.wait(poll_interval(token))
+            self._waiters.remove(ticket)
+            self.in_use += 1
+            self.by_tenant[tenant] = self.by_tenant.get(tenant, 0) + 1
+            self._cond.notify_all()
+
+    def release(self, tenant):
+        with self._cond:
+            self.in_use -= 1
+            self.by_tenant[tenant] -= 1
+            if not self.by_tenant[tenant]:
+                del self.by_tenant[tenant]
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tenant, priority=0, token=None):
+        self.acquire(tenant, priority, token=token)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+
+class TenantExecutor(BaseExecutor):
+    """
+    Исполнитель одного запроса: вызовы Реализаций - в слотах FairShare от имени арендатора запроса
+    """
+    concurrent = True
+
+    def __init__(self, share, tenant, priority=0, token=None):
+        self.share = share
+        self.tenant = tenant
+        self.priority = priority
+        self.token = token
+
+    def call(self, action, implementation, params, token=None):
+        with self.share.slot(self.tenant, self.priority, token=token or self.token):
+            return implementation.evaluate(params)
+
+
+class ServiceRequest:
+    """
+    Запрос в очереди сервиса
+
+        :param future: <Future> результаты выполнения
+        :param token: <CancellationToken> отмена запроса (в том числе уже выполняющегося)
+    """
+    def __init__(self, number, action, params, context, tenant, priority, deadline, evaluate_kwargs):
+        self.number = number
+        self.action = action
+        self.params = params
+        self.context = context
+        self.tenant = tenant
+        self.priority = priority
+        self.evaluate_kwargs = evaluate_kwargs
+        self.submitted = default_timer()
+        self.token = CancellationToken(
+            deadline=None if deadline is None else self.submitted + deadline,
+            parent=getattr(context, 'cancellation', None))
+        self.future = Future()
+
+    def __repr__(self):
+        return 'ServiceRequest(number={}, action={}, tenant={}, priority={})'.format(
+            self.number, self.action.code, self.tenant, self.priority)
+
+
+class EvaluationService:
+    """
+    Долгоживущий сервис выполнения Действий поверх Интерпретатора
+
+    - очередь запросов ограничена queue_size; при заполненной очереди новый запрос отклоняется (REJECT)
+      или вытесняет менее приоритетный запрос из очереди (SHED) - в обоих случаях RequestRejected;
+    - следующим выполняется запрос арендатора, у которого меньше всего выполняющихся запросов,
+      среди его запросов - с наибольшим приоритетом;
+    - вызовы Реализаций всех запросов делят slots слотов поровну между арендаторами (FairShare),
+      так что небольшие запросы не ждут, пока большой Алгоритм займет весь пул.
+
+    Пример:
+
+        ```
+        with EvaluationService(workers=8, slots=16, queue_size=100) as service:
+            future = service.submit(Report, params=dict(...), tenant='billing', priority=1, deadline=5)
+            result = future.result()
+        ```
+
+        :param workers: количество одновременно выполняющихся запросов
+        :param slots: количество одновременно выполняющихся вызовов Реализаций
+        :param queue_size: максимальное количество ожидающих запросов
+        :param policy: REJECT или SHED
+        :param weights: см. FairShare
+        :param interpreter: Интерпретатор (по умолчанию - BaseInterpreter)
+        :param context: Контекст по умолчанию (копируется для каждого запроса)
+    """
+    def __init__(self, workers=4, slots=8, queue_size=64, policy=REJECT, weights=None, interpreter=None,
+                 context=None):
+        if workers < 1:
+            raise InvalidParams('Number of workers must be positive, got {}'.format(workers))
+        if policy not in (REJECT, SHED):
+            raise InvalidParams('Unknown admission policy `{}`'.format(policy))
+        self.interpreter = interpreter or BaseInterpreter
+        self.queue_size = queue_size
+        self.policy = policy
+        self.context = context
+        self.share = FairShare(slots, weights)
+        self.queued = []
+        self.running = dict()
+        self.rejected = 0
+        self._numbers = itertools.count()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True, name='fictilis-service-{}'.format(i))
+            for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, action, params=None, tenant=DEFAULT_TENANT, priority=0, deadline=None, context=None,
+               **evaluate_kwargs):
+        """
+        Постановка запроса в очередь
+
+        :param action: Действие
+        :param params: Параметры выполнения
+        :param tenant: арендатор
+        :param priority: приоритет (больше - раньше; учитывается внутри арендатора и при вытеснении)
+        :param deadline: секунды с момента постановки в очередь (включая ожидание в очереди)
+        :param context: Контекст (по умолчанию - Контекст сервиса)
+        :param evaluate_kwargs: прочие аргументы evaluate (executor и token задает сервис)
+        :raises: RequestRejected
+        :return: <Future> результаты выполнения (future.request - <ServiceRequest>)
+        """
+        for name in ('executor', 'token'):
+            if name in evaluate_kwargs:
+                raise InvalidParams('{} of service requests is defined by the service'.format(name.capitalize()))
+        request = ServiceRequest(
+            next(self._numbers), action, params, self._make_context(context), tenant, priority, deadline,
+            evaluate_kwargs)
+        request.future.request = request
+        with self._cond:
+            if self._closing:
+                raise RequestRejected('Service is shut down')
+            if len(self.queued) >= self.queue_size:
+                victim = self._victim() if self.policy == SHED else None
+                if victim is None or victim.priority >= priority:
+                    self.rejected += 1
+                    raise RequestRejected('Queue of service is full ({} requests)'.format(self.queue_size))
+                self.queued.remove(victim)
+                self.rejected += 1
+                victim.future.set_exception(RequestRejected(
+                    '{} was shed in favour of a request with priority {}'.format(victim, priority)))
+            self.queued.append(request)
+            self._cond.notify()
+        return request.future
+
+    def _make_context(self, context):
+        base = context if context is not None else self.context
+        return base.copy() if base is not None else Context()
+
+    def _victim(self):
+        # наименьший приоритет, затем - арендатор с самой длинной очередью, затем - последний пришедший
+        if not self.queued:
+            return None
+        lengths = dict()
+        for request in self.queued:
+            lengths[request.tenant] = lengths.get(request.tenant, 0) + 1
+        return min(self.queued, key=lambda r: (r.priority, -lengths[r.tenant], -r.number))
+
+    def _next(self):
+        return min(self.queued, key=lambda r: (self.running.get(r.tenant, 0), -r.priority, r.number))
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self.queued and not self._closing:
+                    self._cond.wait()
+                if not self.queued:
+                    return
+                request = self._next()
+                self.queued.remove(request)
+                self.running[request.tenant] = self.running.get(request.tenant, 0) + 1
+            try:
+                self._evaluate(request)
+            finally:
+                with self._cond:
+                    self.running[request.tenant] -= 1
+                    if not self.running[request.tenant]:
+                        del self.running[request.tenant]
+
+    def _evaluate(self, request):
+        if not request.future.set_running_or_notify_cancel():
+            return
+        if request.token.cancelled:
+            request.future.set_exception(EvaluationCancelled(request.token.reason))
+            return
+        executor = TenantExecutor(self.share, request.tenant, request.priority, token=request.token)
+        try:
+            result = self.interpreter.evaluate(
+                request.action, context=request.context, params=request.params, executor=executor,
+                token=request.token, **request.evaluate_kwargs)
+        except BaseException as e:
+            request.future.set_exception(e)
+        else:
+            request.future.set_result(result)
+
+    def stats(self):
+        """
+        :return: <dict(queued=, running=<dict(tenant=<int>, ...)>, slots=<dict(tenant=<int>, ...)>, rejected=)>
+        """
+        with self._cond:
+            return dict(queued=len(self.queued), running=dict(self.running),
+                        slots=dict(self.share.by_tenant), rejected=self.rejected)
+
+    def shutdown(self, wait=True, cancel_queued=False):
+        """
+        Остановка сервиса: новые запросы не принимаются
+
+        :param wait: дождаться выполнения запросов
+        :param cancel_queued: отменить запросы, ожидающие в очереди
+        """
+        with self._cond:
+            self._closing = True
+            if cancel_queued:
+                for request in self.queued:
+                    request.future.cancel()
+                self.queued = []
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,187 @@
+import threading
+import weakref
+from multiprocessing import shared_memory
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy - необязательная зависимость
+    numpy = None
+
+from .types import ValidatedDict, ValidatedList
+
+BYTES = 'bytes'
+NDARRAY = 'ndarray'
+
+
+class SharedHandle:
+    """
+    Ссылка на значение в блоке разделяемой памяти - то, что передается между процессами вместо самого значения
+
+        :param name: имя блока
+        :param size: размер значения в байтах
+        :param kind: BYTES или NDARRAY
+        :param shape: форма массива (для NDARRAY)
+        :param dtype: тип элементов массива (для NDARRAY)
+    """
+    __slots__ = ('name', 'size', 'kind', 'shape', 'dtype')
+
+    def __init__(self, name, size, kind, shape=None, dtype=None):
+        self.name = name
+        self.size = size
+        self.kind = kind
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.name, self.size, self.kind, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.size, self.kind, self.shape, self.dtype = state
+
+    def __repr__(self):
+        return 'SharedHandle(name={}, size={}, kind={})'.format(self.name, self.size, self.kind)
+
+
+# блоки, буфер которых еще использовался при закрытии: закрываются при следующих вызовах _close
+_deferred = []
+_deferred_lock = threading.Lock()
+
+
+def _close(block, unlink):
+    if unlink:
+        # имя удаляется сразу: отображение остается доступным, пока блок не закрыт
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+    with _deferred_lock:
+        blocks = _deferred[:] + [block]
+        del _deferred[:]
+        for b in blocks:
+            try:
+                b.close()
+            except BufferError:
+                _deferred.append(b)
+
+
+def _map_items(value, function):
+    """
+    Применение function к элементам контейнера (dict, list, tuple)
+
+    Контейнер пересобирается, только если какой-то элемент заменен, и с сохранением типа
+    (namedtuple, OrderedDict, ...); отвалидированные контейнеры пересобираются обычными -
+    их метка относится к прежним элементам
+
+    :return: value или новый контейнер
+    """
+    if isinstance(value, dict):
+        items = [(k, v, function(v)) for k, v in value.items()]
+        if all(v is new for _, v, new in items):
+            return value
+        return _rebuild(value, dict, [(k, new) for k, _, new in items])
+    items = [function(v) for v in value]
+    if all(v is new for v, new in zip(value, items)):
+        return value
+    if isinstance(value, tuple) and hasattr(value, '_make'):
+        return type(value)._make(items)
+    return _rebuild(value, tuple if isinstance(value, tuple) else list, items)
+
+
+def _rebuild(value, base, items):
+    if type(value) in (ValidatedList, ValidatedDict):
+        return base(items)
+    try:
+        return type(value)(items)
+    except TypeError:
+        # конструктор с другой сигнатурой (например, defaultdict)
+        return base(items)
+
+
+class SharedMemoryTransport:
+    """
+    Передача больших значений между процессами через multiprocessing.shared_memory
+
+    Значения с протоколом буфера (bytes, bytearray, memoryview, массивы numpy) размером от threshold байт
+    копируются в блок разделяемой памяти один раз; через брокер идет только SharedHandle.
+    Массив numpy на принимающей стороне - представление блока без копирования; блок закрывается
+    (а у владельца - удаляется), когда массив собран сборщиком мусора. Остальные буферы
+    принимаются как bytes (одно копирование, без сериализации).
+
+    Контейнеры (dict, list, tuple) обходятся рекурсивно; контейнер без больших значений передается как есть.
+
+    Время жизни блоков: параметры задачи принадлежат исполнителю и удаляются, когда задача завершена
+    (в том числе после повторных попыток); результаты передаются исполнителю во владение.
+    Процессы-обработчики multiprocessing разделяют трекер ресурсов родителя, поэтому блоки,
+    брошенные упавшим обработчиком, удаляются не позже завершения родительского процесса.
+
+        :param threshold: минимальный размер значения (байты) для передачи через разделяемую память
+    """
+    def __init__(self, threshold=1024 * 1024):
+        self.threshold = threshold
+
+    def pack(self, value, blocks):
+        """
+        Замена больших значений ссылками на блоки
+
+        :param value: значение
+        :param blocks: [<SharedMemory>, ...] - сюда добавляются созданные блоки
+        :return: значение, в котором большие буферы заменены на SharedHandle
+        """
+        if isinstance(value, (dict, list, tuple)):
+            return _map_items(value, lambda v: self.pack(v, blocks))
+        if numpy is not None and isinstance(value, numpy.ndarray) and value.dtype != object:
+            if value.nbytes < self.threshold:
+                return value
+            block = self._create(value.nbytes, blocks)
+            numpy.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+            return SharedHandle(block.name, value.nbytes, NDARRAY, value.shape, value.dtype.str)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            view = memoryview(value).cast('B')
+            if view.nbytes < self.threshold:
+                return value
+            block = self._create(view.nbytes, blocks)
+            block.buf[:view.nbytes] = view
+            return SharedHandle(block.name, view.nbytes, BYTES)
+        return value
+
+    def _create(self, size, blocks):
+        block = shared_memory.SharedMemory(create=True, size=size)
+        blocks.append(block)
+        return block
+
+    def unpack(self, value, owner):
+        """
+        Замена ссылок на блоки значениями
+
+        :param value: значение (после pack)
+        :param owner: <bool> принимающий процесс становится владельцем блоков и удаляет их,
+                      когда значения больше не используются
+        :return: значение
+        """
+        if isinstance(value, SharedHandle):
+            return self._attach(value, owner)
+        if isinstance(value, (dict, list, tuple)):
+            return _map_items(value, lambda v: self.unpack(v, owner))
+        return value
+
+    def _attach(self, handle, owner):
+        block = shared_memory.SharedMemory(name=handle.name)
+        if handle.kind == NDARRAY and numpy is not None:
+            array = numpy.ndarray(handle.shape, dtype=numpy.dtype(handle.dtype), buffer=block.buf)
+            weakref.finalize(array, _close, block, owner)
+            return array
+        data = bytes(block.buf[:handle.size])
+        _close(block, owner)
+        return data
+
+    @staticmethod
+    def release(blocks, unlink=True):
+        """
+        Закрытие блоков, созданных pack
+
+        :param blocks: [<SharedMemory>, ...]
+        :param unlink: удалить блоки (False - блоки переданы другому процессу, он их и удалит)
+        """
+        for block in blocks:
+            _close(block, unlink)
+        del blocks[:]
@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from . import types
+from .cancellation import poll_interval
+from .errors import AlreadyExistsError, EvaluationCancelled
+
+
+def freeze(value):
+    """
+    Хешируемый "отпечаток" значения: контейнеры приводятся к кортежам
+
+    Значения, которые нельзя ни захешировать, ни разобрать, различаются по id -
+    такие вызовы просто не объединяются
+
+    :param value: значение
+    :return: хешируемое значение
+    """
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(((freeze(k), freeze(v)) for k, v in value.items()), key=repr)))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(freeze(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ('set', frozenset(freeze(v) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+    return (type(value).__name__, value)
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов Действия (или Алгоритма)
+
+    Пока выполняется вызов с некоторым отпечатком входов (Контекст, Движок, параметры),
+    остальные вызовы с тем же отпечатком не выполняются, а ждут его результата.
+
+        :param action: Действие или Алгоритм
+        :param key: <func(params)> отпечаток параметров (по умолчанию - freeze всех параметров, кроме Контекста)
+        :param context_key: <func(context)> отпечаток Контекста (по умолчанию - сам Контекст: вызовы
+                            из разных Контекстов не объединяются; например, lambda c: c.get('tenant'))
+    """
+    def __init__(self, action, key=None, context_key=None):
+        self.action = action
+        self._key = key
+        self._context_key = context_key
+        self._flights = dict()
+        self._lock = threading.Lock()
+        SingleFlightPool.register(code=action.code, flight=self)
+
+    def key(self, context, params, outputs=None):
+        """
+        Отпечаток вызова
+        :param context: Контекст или None
+        :param params: <dict> отвалидированные параметры
+        :param outputs: коды запрошенных Выводов
+        :return: хешируемое значение
+        """
+        engine = context.get('engine') if context else None
+        if context is None:
+            context_key = None
+        elif self._context_key is not None:
+            context_key = freeze(self._context_key(context))
+        else:
+            context_key = id(context)
+        if self._key is not None:
+            return context_key, engine, outputs, self._key(params)
+        inlets = self.action.get_inlets()
+        values = {
+            code: value for code, value in params.items()
+            if inlets[code].get_type() != types.ContextType}
+        return context_key, engine, outputs, freeze(values)
+
+    def do(self, key, call, token=None):
+        """
+        Выполнение вызова, либо ожидание результата уже идущего вызова
+
+        Отмена не разделяется: если отменили ведущий вызов (например, истек его deadline),
+        один из ожидающих выполняет вызов сам; каждый ожидающий прерывается только своим токеном
+
+        :param key: отпечаток вызова
+        :param call: <func()> вызов
+        :param token: <CancellationToken> токен отмены этого вызова
+        :raises: EvaluationCancelled
+        :return: результат вызова
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+            if leader:
+                break
+            try:
+                result = self._wait(flight, token)
+            except EvaluationCancelled:
+                if token is not None and token.cancelled:
+                    raise
+                # отменили ведущего, а не нас - вызов выполняется заново
+                continue
+            # копия - чтобы ожидающие не разделяли один изменяемый словарь результатов
+            return dict(result)
+        try:
+            result = call()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return result
+
+    @staticmethod
+    def _wait(flight, token):
+        while True:
+            try:
+                return flight.result(timeout=poll_interval(token))
+            except FutureTimeout:
+                if token is not None:
+                    token.check()
+
+    def in_flight(self):
+        """
+        :return: <int> количество выполняющихся сейчас уникальных вызовов
+        """
+        return len(self._flights)
+
+
+class SingleFlightPool:
+    """
+    Пул объединителей вызовов
+
+    В этом пуле хранятся SingleFlight, привязанные к кодам Действий
+    """
+    _pool = dict()
+
+    @staticmethod
+    def register(code, flight):
+        """
+        :param code: код Действия
+        :param flight: <SingleFlight>
+        """
+        if code in SingleFlightPool._pool:
+            raise AlreadyExistsError('Single-flight for action {} already exists'.format(code))
+        SingleFlightPool._pool[code] = flight
+
+    @staticmethod
+    def find(code):
+        """
+        :param code: код Действия
+        :return: <SingleFlight> | None
+        """
+        return SingleFlightPool._pool.get(code)
+
+    @staticmethod
+    def _reset():
+        SingleFlightPool._pool = dict()
@@ -0,0 +1,88 @@
+import queue
+import threading
+
+from .types import Stream
+
+# сколько элементов потока может опережать потребителя
+DEFAULT_BUFFER = 64
+
+_DONE = object()
+
+
+class BufferedStream:
+    """
+    Поток, который читается в отдельном потоке выполнения в ограниченный буфер
+
+    Производитель работает одновременно с потребителем, но опережает его не более чем на size элементов.
+    Ошибка производителя возникает у потребителя при чтении
+
+        :param iterable: исходный поток
+        :param size: размер буфера
+    """
+    def __init__(self, iterable, size=DEFAULT_BUFFER):
+        # Тип, которым отвалидированы элементы (см. types.Stream)
+        self.validated_as = getattr(iterable, 'validated_as', None)
+        self._buffer = queue.Queue(maxsize=size)
+        self._closed = threading.Event()
+        self._finished = False
+        # поток выполнения не ссылается на сам BufferedStream: брошенный поток собирается сборщиком мусора
+        threading.Thread(target=_pump, args=(iterable, self._buffer, self._closed),
+                         daemon=True, name='fictilis-stream').start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        item, error = self._buffer.get()
+        if item is _DONE:
+            self._finished = True
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self):
+        """
+        Потребитель больше не читает поток - производитель останавливается
+        """
+        self._finished = True
+        self._closed.set()
+
+    def __del__(self):
+        self._closed.set()
+
+
+def _pump(source, buffer, closed):
+    try:
+        for item in source:
+            if not _put(buffer, closed, (item, None)):
+                return
+    except BaseException as e:
+        _put(buffer, closed, (_DONE, e))
+    else:
+        _put(buffer, closed, (_DONE, None))
+    finally:
+        close = getattr(source, 'close', None)
+        if close is not None:
+            close()
+
+
+def _put(buffer, closed, entry):
+    # потребитель мог бросить поток - не ждем его вечно
+    while not closed.is_set():
+        try:
+            buffer.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def is_stream(let):
+    """
+    :param let: Ввод/Вывод
+    :return: <bool> имеет ли он потоковый Тип
+    """
+    return isinstance(let.get_type(), Stream)
@@ -1,3 +1,5 @@
+import weakref
+
 from .errors import UnexpectedError
 from .context import Context
 
@@ -8,10 +10,13 @@ class Type:
 
     Имеет валидатор:
         функция, которая принимает значение (value) и в кидает ValueError, TypeError в случае проблем
+
+    size_hint - ожидаемый размер значения в байтах (None - неизвестен)
     """
-    def __init__(self, code, validator):
+    def __init__(self, code, validator, size_hint=None):
         self.code = code
         self.validator = validator
+        self.size_hint = size_hint
 
     def validate(self, value):
         """
@@ -35,6 +40,21 @@ Numeric = Type(code='Numeric', validator=lambda v: v if isinstance(v, (int, floa
 String = Type(code='String', validator=lambda s: s if isinstance(s, (str)) else '')
 
 
+def __boolean_validator(v):
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, str):
+        lowered = v.strip().lower()
+        if lowered in ('true', 'false'):
+            return lowered == 'true'
+    elif isinstance(v, (int, float)) and v in (0, 1):
+        return bool(v)
+    raise ValueError('Boolean expected (bool, 0/1 or "true"/"false"), got {!r}'.format(v))
+
+
+Boolean = Type(code='Boolean', validator=__boolean_validator)
+
+
 def __context_validator(v):
     if not isinstance(v, Context):
         raise TypeError
@@ -42,3 +62,303 @@ def __context_validator(v):
 
 
 ContextType = Type(code='Context', validator=__context_validator)
+
+
+class ValidatedList(list):
+    """
+    Список, прошедший валидацию составным Типом
+
+    Помнит Тип, которым отвалидирован (validated_as): повторная валидация тем же Типом - O(1).
+    Любое изменение списка сбрасывает метку - и у него, и у содержащих его отвалидированных контейнеров
+    """
+    __slots__ = ('validated_as', '_parents', '__weakref__')
+
+    def _changed(self):
+        _invalidate(self)
+
+    def __reduce_ex__(self, protocol):
+        # метка имеет смысл только в текущем процессе: копия - обычный список
+        return list, (list(self), )
+
+
+class ValidatedDict(dict):
+    """
+    Словарь, прошедший валидацию составным Типом (см. ValidatedList)
+    """
+    __slots__ = ('validated_as', '_parents', '__weakref__')
+
+    def _changed(self):
+        _invalidate(self)
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self), )
+
+
+def _invalidate_on_change(cls, names):
+    base = cls.__mro__[1]
+
+    def invalidating(name):
+        method = getattr(base, name)
+
+        def wrapper(self, *args, **kwargs):
+            self._changed()
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = name
+        return wrapper
+
+    for name in names:
+        setattr(cls, name, invalidating(name))
+
+
+_invalidate_on_change(ValidatedList, (
+    'append', 'extend', 'insert', '__setitem__', '__delitem__', '__iadd__', '__imul__',
+    'remove', 'pop', 'clear', 'sort', 'reverse'))
+_invalidate_on_change(ValidatedDict, (
+    '__setitem__', '__delitem__', '__ior__', 'update', 'setdefault', 'pop', 'popitem', 'clear'))
+
+
+def _invalidate(value):
+    value.validated_as = None
+    parents = getattr(value, '_parents', None)
+    if parents:
+        value._parents = []
+        for ref in parents:
+            parent = ref()
+            if parent is not None and parent.validated_as is not None:
+                _invalidate(parent)
+
+
+def _tag(value, type_, nested=False):
+    """
+    :param nested: элементы могут быть отвалидированными контейнерами - они запоминают родителя,
+                   чтобы их изменение сбрасывало и его метку
+    """
+    value.validated_as = type_
+    if nested:
+        parent = weakref.ref(value)
+        for child in (value.values() if isinstance(value, dict) else value):
+            if type(child) is ValidatedList or type(child) is ValidatedDict:
+                parents = [r for r in getattr(child, '_parents', ()) if r() is not None]
+                parents.append(parent)
+                child._parents = parents
+    return value
+
+
+class CompositeType(Type):
+    """
+    Составной Тип
+
+    Валидатор "компилируется" при создании Типа: валидаторы вложенных Типов вызываются
+    напрямую, без промежуточных проверок. Экземпляры кэшируются по структуре, пока они используются:
+    ListOf(Numeric) is ListOf(Numeric)
+    """
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, *args, **kwargs):
+        key = (cls, ) + cls._key(*args, **kwargs)
+        instance = CompositeType._instances.get(key)
+        if instance is None:
+            instance = super(CompositeType, cls).__new__(cls)
+            instance._initialized = False
+            CompositeType._instances[key] = instance
+        return instance
+
+    def __init__(self, code):
+        if self._initialized:
+            return
+        super(CompositeType, self).__init__(code=code, validator=self._compile())
+        self._initialized = True
+
+    @classmethod
+    def _key(cls, *args, **kwargs):
+        raise NotImplementedError
+
+    def _compile(self):
+        raise NotImplementedError
+
+
+class ListOf(CompositeType):
+    """
+    Список значений Типа item_type (принимает list и tuple)
+    """
+    @classmethod
+    def _key(cls, item_type):
+        return (id(item_type), )
+
+    def __init__(self, item_type):
+        self.item_type = item_type
+        super(ListOf, self).__init__(code='List[{}]'.format(item_type.code))
+
+    def _compile(self):
+        check_item = self.item_type.validator
+        nested = isinstance(self.item_type, CompositeType)
+
+        def validator(value):
+            if type(value) is ValidatedList and value.validated_as is self:
+                return value
+            if not isinstance(value, (list, tuple)):
+                raise TypeError('{} expected, got {}'.format(self.code, type(value).__name__))
+            return _tag(ValidatedList([check_item(v) for v in value]), self, nested)
+        return validator
+
+
+class DictOf(CompositeType):
+    """
+    Словарь с ключами Типа key_type и значениями Типа value_type
+    """
+    @classmethod
+    def _key(cls, key_type, value_type):
+        return id(key_type), id(value_type)
+
+    def __init__(self, key_type, value_type):
+        self.key_type = key_type
+        self.value_type = value_type
+        super(DictOf, self).__init__(code='Dict[{}, {}]'.format(key_type.code, value_type.code))
+
+    def _compile(self):
+        check_key = self.key_type.validator
+        check_value = self.value_type.validator
+        nested = isinstance(self.value_type, CompositeType)
+
+        def validator(value):
+            if type(value) is ValidatedDict and value.validated_as is self:
+                return value
+            if not isinstance(value, dict):
+                raise TypeError('{} expected, got {}'.format(self.code, type(value).__name__))
+            return _tag(ValidatedDict((check_key(k), check_value(v)) for k, v in value.items()), self, nested)
+        return validator
+
+
+class Optional(CompositeType):
+    """
+    Значение Типа type_ или None (поле Record с таким Типом может отсутствовать)
+    """
+    @classmethod
+    def _key(cls, type_):
+        return (id(type_), )
+
+    def __init__(self, type_):
+        self.type = type_
+        super(Optional, self).__init__(code='Optional[{}]'.format(type_.code))
+
+    def _compile(self):
+        check = self.type.validator
+
+        def validator(value):
+            return None if value is None else check(value)
+        return validator
+
+
+class Union(CompositeType):
+    """
+    Значение одного из Типов (проверяются по порядку, берется первый подошедший)
+    """
+    @classmethod
+    def _key(cls, *types):
+        return tuple(id(t) for t in types)
+
+    def __init__(self, *types):
+        self.types = types
+        super(Union, self).__init__(code='Union[{}]'.format(', '.join(t.code for t in types)))
+
+    def _compile(self):
+        checks = tuple(t.validator for t in self.types)
+        members = self.types
+
+        def validator(value):
+            if getattr(value, 'validated_as', None) in members:
+                return value
+            for check in checks:
+                try:
+                    return check(value)
+                except (TypeError, ValueError):
+                    continue
+            raise TypeError('{} expected, got {}'.format(self.code, repr(value)))
+        return validator
+
+
+class Record(CompositeType):
+    """
+    Запись - словарь с фиксированным набором полей
+
+        :param code: код Типа
+        :param fields: <dict(name=<Type>, ...)> поля; поля с Типом Optional(...) могут отсутствовать
+    """
+    @classmethod
+    def _key(cls, code, fields):
+        return (code, ) + tuple(sorted((name, id(t)) for name, t in fields.items()))
+
+    def __init__(self, code, fields):
+        self.fields = dict(fields)
+        super(Record, self).__init__(code=code)
+
+    def _compile(self):
+        fields = tuple((name, t.validator, isinstance(t, Optional)) for name, t in sorted(self.fields.items()))
+        names = frozenset(self.fields)
+        nested = any(isinstance(t, CompositeType) for t in self.fields.values())
+
+        def validator(value):
+            if type(value) is ValidatedDict and value.validated_as is self:
+                return value
+            if not isinstance(value, dict):
+                raise TypeError('{} expected, got {}'.format(self.code, type(value).__name__))
+            unexpected = value.keys() - names
+            if unexpected:
+                raise ValueError('{}: unexpected fields {}'.format(self.code, ', '.join(sorted(map(str, unexpected)))))
+            result = ValidatedDict()
+            for name, check, optional in fields:
+                if name in value:
+                    dict.__setitem__(result, name, check(value[name]))
+                elif not optional:
+                    raise ValueError('{}: field `{}` is required'.format(self.code, name))
+            return _tag(result, self, nested)
+        return validator
+
+
+class StreamValue:
+    """
+    Поток, прошедший валидацию Типом Stream: элементы проверяются по мере чтения
+    """
+    __slots__ = ('validated_as', '_iterator', '_check')
+
+    def __init__(self, iterable, check, type_):
+        self._iterator = iter(iterable)
+        self._check = check
+        self.validated_as = type_
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._check(next(self._iterator))
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+class Stream(CompositeType):
+    """
+    Поток значений Типа item_type: итератор или генератор, который читается по мере получения элементов
+
+    Поток читается один раз, поэтому Вывод такого Типа может быть привязан только к одному Вводу
+    """
+    @classmethod
+    def _key(cls, item_type):
+        return (id(item_type), )
+
+    def __init__(self, item_type):
+        self.item_type = item_type
+        super(Stream, self).__init__(code='Stream[{}]'.format(item_type.code))
+
+    def _compile(self):
+        check_item = self.item_type.validator
+
+        def validator(value):
+            if getattr(value, 'validated_as', None) is self:
+                return value
+            if isinstance(value, (str, bytes, dict)) or not hasattr(value, '__iter__'):
+                raise TypeError('{} expected, got {}'.format(self.code, type(value).__name__))
+            return StreamValue(value, check_item, self)
+        return validator
@@ -15,3 +15,16 @@ def timeit():
 
     yield expired
 
+
+def percentile(samples, percentile):
+    """
+    Перцентиль выборки (ближайшее значение, без интерполяции)
+
+    :param samples: [<float>, ...] отсортированная выборка
+    :param percentile: перцентиль (0..100]
+    :return: <float> или None для пустой выборки
+    """
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(len(samples) * percentile / 100.0))
+    return samples[index]
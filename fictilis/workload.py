@@ -0,0 +1,224 @@
+import gzip
+import math
+import pickle
+import random
+import threading
+from timeit import default_timer
+
+from . import types
+from . import utils
+from .action import ActionPool
+from .context import Context
+from .errors import InvalidParams
+
+
+def plain_values(values, lets):
+    """
+    Значения без Контекста и потоков (они не записываются)
+
+    :param values: <dict(code=value, ...)>
+    :param lets: <dict(code=<BaseLet>, ...)> Вводы или Выводы
+    :return: <dict>
+    """
+    result = dict()
+    for code, value in values.items():
+        let_type = lets[code].get_type()
+        if let_type == types.ContextType or isinstance(let_type, types.Stream):
+            continue
+        result[code] = value
+    return result
+
+
+class WorkloadRecorder:
+    """
+    Запись нагрузки: вызовы Интерпретатора верхнего уровня (код Действия, Движок, параметры, результаты, время)
+
+    Подключается к Интерпретатору (BaseInterpreter.recorder = WorkloadRecorder(...)).
+    Записи - сжатый поток pickle (см. read_workload), воспроизведение - replay
+
+        :param path: файл записи
+        :param sample_rate: доля записываемых вызовов (0..1]
+        :param max_records: максимальное количество записей (None - без ограничения)
+        :param max_bytes: максимальный объем записей до сжатия (None - без ограничения)
+        :param capture_steps: записывать ли параметры и результаты каждого Шага
+    """
+    def __init__(self, path, sample_rate=1., max_records=None, max_bytes=None, capture_steps=False):
+        if not 0 < sample_rate <= 1:
+            raise InvalidParams('Sample rate must be in (0, 1], got {}'.format(sample_rate))
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.capture_steps = capture_steps
+        self.records = 0
+        self.bytes = 0
+        self.full = False
+        self._file = None
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """
+        :return: <bool> записывать ли очередной вызов
+        """
+        return not self.full and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def record(self, action, engine, params, result, duration, steps=None):
+        """
+        Запись вызова
+
+        :param action: Действие
+        :param engine: Движок из Контекста (или None)
+        :param params: <dict> параметры
+        :param result: <dict> результаты
+        :param duration: <float> секунды
+        :param steps: <dict(path=(params, results), ...)> параметры и результаты Шагов
+        """
+        entry = dict(
+            action=action.code, engine=engine,
+            params=plain_values(params, action.get_inlets()),
+            result=plain_values(result, action.get_outlets()),
+            duration=duration, steps=steps)
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # несериализуемые значения - вызов пропускается
+            return
+        with self._lock:
+            if self.full:
+                return
+            if self.max_bytes is not None and self.bytes + len(data) > self.max_bytes:
+                self.full = True
+                return
+            if self._file is None:
+                self._file = gzip.open(self.path, 'wb')
+            self._file.write(data)
+            self.records += 1
+            self.bytes += len(data)
+            if self.max_records is not None and self.records >= self.max_records:
+                self.full = True
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_workload(path):
+    """
+    Чтение записанной нагрузки
+
+    :param path: файл записи
+    :return: генератор записей <dict(action=, engine=, params=, result=, duration=, steps=)>
+    """
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def same(left, right, rel_tol=1e-9):
+    """
+    Сравнение результатов (числа с плавающей точкой - с допуском)
+    """
+    if isinstance(left, float) or isinstance(right, float):
+        try:
+            return math.isclose(left, right, rel_tol=rel_tol)
+        except TypeError:
+            return False
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(same(left[k], right[k], rel_tol) for k in left)
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        return len(left) == len(right) and all(same(a, b, rel_tol) for a, b in zip(left, right))
+    return left == right
+
+
+class ReplayReport:
+    """
+    Результат воспроизведения нагрузки
+    """
+    def __init__(self, latencies, recorded, errors, mismatches, total):
+        self.latencies = sorted(latencies)
+        self.recorded = sorted(recorded)
+        self.errors = errors
+        self.mismatches = mismatches
+        self.total = total
+
+    @property
+    def calls(self):
+        return len(self.latencies) + len(self.errors)
+
+    @property
+    def throughput(self):
+        """
+        :return: <float> вызовов в секунду
+        """
+        return self.calls / self.total if self.total else 0.
+
+    def percentile(self, percentile, recorded=False):
+        """
+        :param percentile: перцентиль (0..100]
+        :param recorded: по записанным (а не воспроизведенным) задержкам
+        :return: <float> секунды или None
+        """
+        return utils.percentile(self.recorded if recorded else self.latencies, percentile)
+
+    def __str__(self):
+        def ms(value):
+            return '-' if value is None else '{:.3f}ms'.format(value * 1000)
+
+        lines = ['Replay: {} calls in {:.3f}s ({:.1f} calls/s), {} errors, {} mismatches'.format(
+            self.calls, self.total, self.throughput, len(self.errors), len(self.mismatches))]
+        for p in (50, 90, 99):
+            lines.append('  p{}: {} (recorded {})'.format(p, ms(self.percentile(p)), ms(self.percentile(p, True))))
+        for number, code, e in self.errors[:10]:
+            lines.append('  error in #{} {}: {!r}'.format(number, code, e))
+        for number, code, expected, actual in self.mismatches[:10]:
+            lines.append('  mismatch in #{} {}: recorded {!r}, got {!r}'.format(number, code, expected, actual))
+        return '\n'.join(lines)
+
+
+def replay(path, interpreter=None, engine=None, context=None, compare=True, **evaluate_kwargs):
+    """
+    Воспроизведение записанной нагрузки
+
+    :param path: файл записи (см. WorkloadRecorder)
+    :param interpreter: Интерпретатор (по умолчанию - BaseInterpreter)
+    :param engine: Движок, на котором воспроизводить (None - записанный)
+    :param context: Контекст (копируется; Движок подставляется в копию)
+    :param compare: сравнивать ли результаты с записанными
+    :param evaluate_kwargs: прочие аргументы Interpreter.evaluate (например: executor=)
+    :return: <ReplayReport>
+    """
+    if interpreter is None:
+        # Интерпретатор сам зависит от этого модуля (через Run)
+        from .interpreter import BaseInterpreter as interpreter
+    latencies, recorded, errors, mismatches = [], [], [], []
+    started = default_timer()
+    for number, entry in enumerate(read_workload(path)):
+        action = ActionPool.get(entry['action'])
+        call_context = context.copy() if context is not None else Context()
+        call_engine = engine or entry['engine']
+        if call_engine is not None:
+            call_context['engine'] = call_engine
+        recorded.append(entry['duration'])
+        start = default_timer()
+        try:
+            result = interpreter.evaluate(action, context=call_context, params=entry['params'], **evaluate_kwargs)
+        except Exception as e:
+            errors.append((number, action.code, e))
+            continue
+        latencies.append(default_timer() - start)
+        if compare:
+            result = plain_values(result, action.get_outlets())
+            if not same(entry['result'], result):
+                mismatches.append((number, action.code, entry['result'], result))
+    return ReplayReport(latencies, recorded, errors, mismatches, default_timer() - started)
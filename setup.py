@@ -30,5 +30,9 @@ setup(
     ],
     keywords='algorithm,abstraction',
     install_requires=[],
+    extras_require={
+        # столбцовый Движок (fictilis.columnar)
+        'numpy': ['numpy'],
+    },
     packages=find_packages(exclude=['contrib', 'docs', 'tests']),
 )
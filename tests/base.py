@@ -1,8 +1,20 @@
 from fictilis.action import ActionPool, ImplementationPool
 from fictilis.algorithm import AlgorithmPool
+from fictilis.hedging import HedgingPool
+from fictilis.fusion import ScriptRunnerPool
+from fictilis.singleflight import SingleFlightPool
+from fictilis.scheduling import ResourceClassPool
+from fictilis.batching import BatchLoaderPool
+from fictilis.artifacts import ArtifactPool
 
 
 def clear():
     ActionPool._reset()
     ImplementationPool._reset()
     AlgorithmPool._reset()
+    HedgingPool._reset()
+    ScriptRunnerPool._reset()
+    SingleFlightPool._reset()
+    ResourceClassPool._reset()
+    BatchLoaderPool._reset()
+    ArtifactPool._reset()
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.batching import BatchLoader
+from fictilis.context import Context
+from fictilis.errors import EvaluationCancelled
+from fictilis.executor import ThreadExecutor
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_batch_loader():
+    clear()
+    key = Parameter(name='key', type_=types.Numeric)
+    value = Parameter(name='value', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    queries = []
+    table = {i: i * 10 for i in range(100)}
+
+    def bulk_lookup(calls):
+        queries.append(sorted(c['key'] for c in calls))
+        return [table[c['key']] for c in calls]
+
+    Lookup = Action('Lookup', [key], [value], pure=True)
+    SumA = Action('Sum', [a, b], [value], pure=True)
+    lookup = Implementation(action=Lookup, engine='python', function=lambda key: table[key])
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+    BatchLoader(lookup, bulk_lookup, window=0.05)
+
+    def builder(key):
+        return SumA(SumA(Lookup(key), Lookup(1)), SumA(Lookup(2), Lookup(1)))
+    Alg = MagicAlgorithmBuilder.build('Alg', [key], [value], builder=builder)
+
+    with ThreadExecutor() as executor:
+        assert BaseInterpreter.evaluate(Alg, params=dict(key=5), executor=executor)['value'] == 50 + 10 + 20 + 10
+    # четыре поиска - один пакетный запрос, одинаковые ключи объединены
+    assert queries == [[1, 2, 5]]
+
+    del queries[:]
+    results = dict()
+
+    def run(k):
+        results[k] = BaseInterpreter.evaluate(Lookup, params=dict(key=k))['value']
+    threads = [threading.Thread(target=run, args=(k, )) for k in range(10, 20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {k: k * 10 for k in range(10, 20)}
+    assert sum(len(q) for q in queries) == 10
+    assert len(queries) < 10
+    clear()
+
+
+def test_batch_loader_contexts():
+    clear()
+    context = Parameter(name='context', type_=types.ContextType)
+    key = Parameter(name='key', type_=types.Numeric)
+    value = Parameter(name='value', type_=types.Numeric)
+
+    batches = []
+
+    def bulk_lookup(calls):
+        batches.append(len(calls))
+        # ресурс взят на время пакета
+        return [c['context']['conn'][c['key']] for c in calls]
+
+    Lookup = Action('Lookup', [context, key], [value], pure=True)
+    lookup = Implementation(action=Lookup, engine='python', function=lambda context, key: context['conn'][key],
+                            resources=['conn'])
+    BatchLoader(lookup, bulk_lookup, window=0.05)
+
+    contexts = dict()
+    for scale in (10, 100):
+        contexts[scale] = Context(engine='python')
+        contexts[scale].register_resource('conn', lambda scale=scale: {k: k * scale for k in range(10)}, max_size=1)
+
+    results = dict()
+
+    def run(ctx, scale):
+        results[scale] = BaseInterpreter.evaluate(Lookup, context=ctx, params=dict(key=3))['value']
+    threads = [threading.Thread(target=run, args=(ctx, scale)) for scale, ctx in contexts.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # одинаковые параметры из разных Контекстов не объединены
+    assert results == {10: 30, 100: 300}
+    # пакет разбит по Контекстам: в каждом вызове loader - вызовы одного Контекста
+    assert batches == [1, 1]
+    for ctx in contexts.values():
+        assert 'conn' not in ctx
+    clear()
+
+
+def test_batch_wait_is_cancellable():
+    clear()
+    key = Parameter(name='key', type_=types.Numeric)
+    value = Parameter(name='value', type_=types.Numeric)
+
+    def slow_lookup(calls):
+        time.sleep(0.5)
+        return [c['key'] for c in calls]
+
+    Lookup = Action('Lookup', [key], [value], pure=True)
+    lookup = Implementation(action=Lookup, engine='python', function=lambda key: key)
+    BatchLoader(lookup, slow_lookup, window=0.05)
+
+    leader = threading.Thread(target=BaseInterpreter.evaluate, args=(Lookup, ), kwargs=dict(params=dict(key=1)))
+    leader.start()
+    time.sleep(0.01)
+    # ожидающий результата пакета прерывается своим deadline, не дожидаясь loader
+    start = time.time()
+    with pytest.raises(EvaluationCancelled):
+        BaseInterpreter.evaluate(Lookup, params=dict(key=2), deadline=0.1)
+    assert time.time() - start < 0.3
+    leader.join()
+    clear()
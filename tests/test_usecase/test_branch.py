@@ -0,0 +1,62 @@
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import AlgorithmBuilder, MagicAlgorithmBuilder
+from fictilis.control import Branch, BranchAction
+from fictilis.errors import InvalidDeclaration
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_branch():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    flag = Parameter(name='flag', type_=types.Boolean)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    calls = []
+
+    def call(name, function):
+        def wrapper(**kwargs):
+            calls.append(name)
+            return function(**kwargs)
+        return wrapper
+
+    Less = Action('Less', [a, b], [flag], pure=True)
+    SubA = Action('Sub', [a, b], [res], pure=True)
+    Negate = Action('Negate', [a], [res], pure=True)
+    Implementation(action=Less, engine='python', function=call('Less', lambda a, b: a < b))
+    Implementation(action=SubA, engine='python', function=call('Sub', lambda a, b: a - b))
+    Implementation(action=Negate, engine='python', function=call('Negate', lambda a: -a))
+
+    Kept = MagicAlgorithmBuilder.build('Kept', [a], [res], builder=lambda a: SubA(a, 0))
+    Negated = MagicAlgorithmBuilder.build('Negated', [a], [res], builder=lambda a: Negate(SubA(a, 0)))
+
+    Abs = MagicAlgorithmBuilder.build(
+        'Abs', [a, b], [res], builder=lambda a, b: Branch(Less(a, b), Negated, Kept, a=SubA(a, b)))
+    assert Abs.pure
+
+    assert BaseInterpreter.evaluate(Abs, params=dict(a=1, b=5))['res'] == 4
+    assert calls == ['Less', 'Sub', 'Sub', 'Negate']
+    del calls[:]
+    assert BaseInterpreter.evaluate(Abs, params=dict(a=5, b=1))['res'] == 4
+    assert calls == ['Less', 'Sub', 'Sub']
+
+    def build_abs(bind, register, a, b):
+        less = register(Less)
+        branch = register(BranchAction.of(Negated, Kept))
+        bind(a, less.get_inlet('a'))
+        bind(b, less.get_inlet('b'))
+        bind(less.get_outlet('flag'), branch.get_inlet('condition'))
+        bind(a, branch.get_inlet('a'))
+        return branch
+    Plain = AlgorithmBuilder.build('Plain', [a, b], [res], builder=build_abs)
+    assert BaseInterpreter.evaluate(Plain, params=dict(a=-3, b=0))['res'] == 3
+
+    with pytest.raises(InvalidDeclaration):
+        BranchAction.of(Negated, Less)
+    clear()
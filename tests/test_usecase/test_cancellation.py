@@ -0,0 +1,84 @@
+import copy
+import pickle
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.context import Context
+from fictilis.errors import EvaluationCancelled
+from fictilis.executor import ThreadExecutor
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis.scheduling import ResourceClass
+from fictilis import types
+
+from ..base import clear
+
+
+def test_deadline_and_cancellation():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    calls = []
+
+    def slow(a):
+        calls.append(a)
+        time.sleep(0.05)
+        return a + 1
+
+    Slow = Action('Slow', [a], [res])
+    Locked = Action('Locked', [a], [res], resource_class='single')
+    Implementation(action=Slow, engine='python', function=slow)
+    Implementation(action=Locked, engine='python', function=slow)
+
+    Chain = MagicAlgorithmBuilder.build('Chain', [a], [res], builder=lambda a: Slow(Slow(Slow(Slow(Slow(a))))))
+    assert BaseInterpreter.evaluate(Chain, params=dict(a=0), deadline=5)['res'] == 5
+
+    del calls[:]
+    with pytest.raises(EvaluationCancelled) as e:
+        BaseInterpreter.evaluate(Chain, params=dict(a=0), deadline=0.12)
+    assert e.value.reason == 'deadline exceeded'
+    assert e.value.completed == [(0, ), (1, ), (2, )]
+    assert len(calls) == 3
+    assert 'completed steps: 0, 1, 2' in str(e.value)
+
+    # отмена через Контекст прерывает ожидание слота класса ресурсов
+    single = ResourceClass('single', limit=1)
+    single.acquire()
+    context = Context()
+    threading.Timer(0.2, context.cancellation.cancel).start()
+    Waiting = MagicAlgorithmBuilder.build('Waiting', [a], [res], builder=lambda a: Locked(Slow(a)))
+    started = time.time()
+    with ThreadExecutor() as executor, pytest.raises(EvaluationCancelled) as e:
+        BaseInterpreter.evaluate(Waiting, context=context, params=dict(a=0), executor=executor)
+    assert time.time() - started < 1
+    assert e.value.reason == 'cancelled'
+    assert e.value.completed == [(0, )]
+    single.release()
+    assert single.in_use == 0
+    clear()
+
+
+def test_context_copies():
+    context = Context(a=1)
+    context.register_resource('conn', lambda: object())
+
+    restored = pickle.loads(pickle.dumps(context))
+    assert restored == {'a': 1} and type(restored) is Context
+    copied = copy.deepcopy(context)
+    assert copied == {'a': 1}
+    # копии данных не разделяют токен с исходным Контекстом
+    shallow = copy.copy(context)
+    shallow.cancellation.cancel()
+    assert not context.cancellation.cancelled
+    assert not copied.cancellation.cancelled
+
+    shared = context.copy()
+    assert type(shared) is Context and shared == {'a': 1}
+    assert shared.get_pool('conn') is context.get_pool('conn')
+    shared.cancellation.cancel()
+    assert context.cancellation.cancelled
@@ -0,0 +1,60 @@
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.checkpoint import FileCheckpointStore
+from fictilis.context import Context
+from fictilis.errors import InvalidParams
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_resume_from_checkpoint(tmpdir):
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    Inc = Action('Inc', [a], [res])
+    Fragile = Action('Fragile', [a], [res])
+
+    calls = []
+    broken = {'fail': True}
+
+    def inc(a):
+        calls.append(a)
+        return a + 1
+
+    def fragile(a):
+        if broken['fail']:
+            raise RuntimeError('step failed')
+        return a * 10
+
+    engine = 'python'
+    Implementation(action=Inc, engine=engine, function=inc)
+    Implementation(action=Fragile, engine=engine, function=fragile)
+
+    Long = MagicAlgorithmBuilder.build('Long', [a], [res], builder=lambda a: Fragile(Inc(Inc(a))))
+
+    store = FileCheckpointStore(directory=str(tmpdir))
+    with pytest.raises(RuntimeError):
+        BaseInterpreter.evaluate(Long, params=dict(a=1), checkpoint=store, run_id='nightly')
+    assert calls == [1, 2]
+    assert store.list_runs() == ['nightly']
+
+    broken['fail'] = False
+    # контрольные точки относятся к параметрам упавшего запуска
+    with pytest.raises(InvalidParams):
+        BaseInterpreter.evaluate(Long, params=dict(a=100), checkpoint=store, resume_from='nightly')
+    with pytest.raises(InvalidParams):
+        BaseInterpreter.evaluate(Long, context=Context(engine='python'), params=dict(a=1), checkpoint=store,
+                                 resume_from='nightly')
+    result = BaseInterpreter.evaluate(Long, params=dict(a=1), checkpoint=store, resume_from='nightly')
+    assert result == {'res': 30}
+    # оба Inc взяты из контрольных точек
+    assert calls == [1, 2]
+    # успешный запуск удаляет свои контрольные точки
+    assert store.list_runs() == []
+    clear()
@@ -0,0 +1,90 @@
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.columnar import compile_algorithm
+from fictilis.errors import InvalidDeclaration
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+numpy = pytest.importorskip('numpy')
+
+
+def test_columnar_engine():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+    c = Parameter(name='c', type_=types.Numeric)
+    d = Parameter(name='d', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+
+    calc_c = Action('calc_c', in_params=[a, b], out_params=[res], pure=True)
+    calc_d = Action('calc_d', in_params=[a, c], out_params=[res], pure=True)
+    prepare_result = Action('prepare_result', in_params=[a, b, c, d], out_params=[res], pure=True)
+    log = Action('log', in_params=[a], out_params=[res])
+
+    def builder(a, b):
+        c = calc_c(a, b)
+        d = calc_d(a, c)
+        return prepare_result(a, b, c, d)
+    calc = MagicAlgorithmBuilder.build('calc', [a, b], [res], builder=builder)
+    scaled = MagicAlgorithmBuilder.build('scaled', [a], [res], builder=lambda a: calc(a, 1))
+
+    for engine in ('python', 'numpy'):
+        Implementation(action=calc_c, engine=engine, function=lambda a, b: a + b)
+        Implementation(action=calc_d, engine=engine, function=lambda a, c: a * c)
+        Implementation(action=prepare_result, engine=engine, function=lambda a, b, c, d: c ** a + d ** b)
+
+    kernel = compile_algorithm(calc)
+    assert kernel.passes == 3
+    rows = 1000000
+    a_column = numpy.arange(rows) % 5
+    b_column = numpy.arange(rows) % 3
+    result = kernel(a=a_column, b=b_column)['res']
+    assert result.shape == (rows, )
+    for i in (0, 7, 12345, rows - 1):
+        expected = BaseInterpreter.evaluate(calc, params=dict(a=int(a_column[i]), b=int(b_column[i])))['res']
+        assert result[i] == expected
+
+    kernel = compile_algorithm(scaled)
+    assert kernel.passes == 3
+    assert list(kernel(a=[2, 3])['res']) == [15., 4. ** 3 + 12.]
+
+    # Шаги с побочными эффектами не компилируются
+    Implementation(action=log, engine='numpy', function=lambda a: a)
+    logged = MagicAlgorithmBuilder.build('logged', [a, b], [res], builder=lambda a, b: log(calc(a, b)))
+    with pytest.raises(InvalidDeclaration):
+        compile_algorithm(logged)
+    clear()
+
+
+def test_elementwise_steps_are_inlined():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+
+    Mul = Action('Mul', [a, b], [res], pure=True)
+    Add = Action('Add', [a, b], [res], pure=True)
+    Sub = Action('Sub', [a, b], [res], pure=True)
+    Implementation(action=Mul, engine='numpy', function=numpy.multiply)
+    Implementation(action=Add, engine='numpy', function=numpy.add)
+    Implementation(action=Sub, engine='numpy', function=numpy.subtract)
+
+    def builder(a, b):
+        product = Mul(a, b)
+        return Sub(Add(product, b), product)
+    Calc = MagicAlgorithmBuilder.build('Calc', [a, b], [res], builder=builder)
+
+    kernel = compile_algorithm(Calc)
+    assert (kernel.passes, kernel.inlined) == (3, 3)
+    # у произведения два потребителя - оно вычисляется один раз; сумма встроена в разность
+    assignments = [line for line in kernel.source.splitlines() if ' = ' in line]
+    assert len(assignments) == 3
+    a_column = numpy.arange(10.)
+    b_column = numpy.arange(10.) % 3
+    assert list(kernel(a=a_column, b=b_column)['res']) == list(b_column)
+    clear()
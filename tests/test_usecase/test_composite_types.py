@@ -0,0 +1,109 @@
+import gc
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.errors import InvalidParams, InvalidType
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_composite_types():
+    assert types.ListOf(types.Numeric) is types.ListOf(types.Numeric)
+
+    Point = types.Record('Point', {'x': types.Numeric, 'label': types.Optional(types.String)})
+    assert Point.validate({'x': '1'}) == {'x': 1.0}
+    assert Point.validate({'x': 1, 'label': None}) == {'x': 1, 'label': None}
+    with pytest.raises(ValueError):
+        Point.validate({'label': 'a'})
+    with pytest.raises(ValueError):
+        Point.validate({'x': 1, 'y': 2})
+
+    NumberOrList = types.Union(types.Numeric, types.ListOf(types.Numeric))
+    assert NumberOrList.validate('2') == 2.0
+    assert NumberOrList.validate(('1', 2)) == [1.0, 2]
+    with pytest.raises(TypeError):
+        NumberOrList.validate(None)
+
+    Counts = types.DictOf(types.String, types.ListOf(types.Numeric))
+    value = Counts.validate({'a': [1, '2']})
+    assert value == {'a': [1, 2.0]}
+    assert Counts.validate(value) is value
+    value['b'] = 'broken'
+    with pytest.raises(TypeError):
+        Counts.validate(value)
+
+
+def test_validated_once_through_steps():
+    clear()
+    checked = []
+
+    def counting(v):
+        checked.append(v)
+        return v
+
+    Item = types.Type(code='Item', validator=counting)
+    items = Parameter(name='items', type_=types.ListOf(Item))
+    points = Parameter(name='points', type_=types.ListOf(types.Record('Point', {'x': types.Numeric})))
+
+    Same = Action('Same', [items], [items])
+    Bad = Action('Bad', [points], [points])
+    Implementation(action=Same, engine='python', function=lambda items: items)
+    Implementation(action=Bad, engine='python', function=lambda points: points + [{'y': 1}])
+
+    Chain = MagicAlgorithmBuilder.build('Chain', [items], [items], builder=lambda items: Same(Same(Same(items))))
+
+    result = BaseInterpreter.evaluate(Chain, params=dict(items=list(range(100))))
+    assert result['items'] == list(range(100))
+    # большая структура проходит 8 границ, но валидируется один раз
+    assert len(checked) == 100
+
+    with pytest.raises(InvalidType):
+        BaseInterpreter.evaluate(Bad, params=dict(points=[{'x': 1}]))
+    clear()
+
+
+def test_nested_mutation_resets_tag():
+    Matrix = types.ListOf(types.ListOf(types.Numeric))
+    value = Matrix.validate([[1, 2], [3]])
+    assert Matrix.validate(value) is value
+    value[0].append('abc')
+    with pytest.raises(ValueError):
+        Matrix.validate(value)
+
+    Points = types.ListOf(types.Record('Point', {'x': types.Numeric}))
+    points = Points.validate([{'x': 1}])
+    nested = types.DictOf(types.String, Points).validate({'a': points})
+    points[0]['x'] = object()
+    with pytest.raises(TypeError):
+        Points.validate(points)
+    # метка сбрасывается по всей цепочке контейнеров
+    with pytest.raises(TypeError):
+        types.DictOf(types.String, Points).validate(nested)
+
+
+def test_boolean_and_type_cache():
+    clear()
+    assert [types.Boolean.validate(v) for v in (True, False, 1, 0, 'true', 'False', ' TRUE ')] == [
+        True, False, True, False, True, False, True]
+    for value in ('yes', '', 2, None, [True]):
+        with pytest.raises(ValueError):
+            types.Boolean.validate(value)
+
+    flag = Parameter(name='flag', type_=types.Boolean)
+    Not = Action('Not', [flag], [flag])
+    Implementation(action=Not, engine='python', function=lambda flag: not flag)
+    assert BaseInterpreter.evaluate(Not, params=dict(flag='false')) == {'flag': True}
+    with pytest.raises(InvalidParams):
+        BaseInterpreter.evaluate(Not, params=dict(flag='no'))
+
+    # кэш составных Типов не удерживает неиспользуемые Типы
+    code = 'Temporary'
+    types.Record(code, {'x': types.Numeric})
+    gc.collect()
+    assert not any(key[1] == code for key in types.CompositeType._instances.keys())
+    clear()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import threading
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis.context import Context
+from fictilis import types
+
+from ..base import clear
+
+
+def test_pooled_connections(tmpdir):
+    clear()
+    context = Parameter(name='context', type_=types.ContextType)
+    number = Parameter(name='number', type_=types.Numeric)
+
+    Count = Action('Count', [context], [number])
+
+    in_use = set()
+    max_in_use = []
+    lock = threading.Lock()
+
+    def count(context):
+        conn = context['conn']
+        with lock:
+            assert id(conn) not in in_use
+            in_use.add(id(conn))
+            max_in_use.append(len(in_use))
+        try:
+            return conn.execute('SELECT COUNT(*) FROM T').fetchall()[0][0]
+        finally:
+            with lock:
+                in_use.discard(id(conn))
+
+    Implementation(action=Count, engine='sql', function=count, resources=['conn'])
+    CountAlg = MagicAlgorithmBuilder.build('CountAlg', [context], [number], builder=lambda context: Count(context))
+
+    db = os.path.join(str(tmpdir), 'db.sqlite')
+    setup = sqlite3.connect(db)
+    setup.execute('CREATE TABLE T (COL INT)')
+    setup.execute('INSERT INTO T VALUES (1), (2), (3)')
+    setup.commit()
+    setup.close()
+
+    created = []
+
+    def connect():
+        created.append(1)
+        return sqlite3.connect(db, check_same_thread=False)
+
+    ctx = Context()
+    ctx.register_resource('conn', connect, min_size=1, max_size=2, close=lambda c: c.close())
+    assert len(created) == 1
+
+    results = []
+
+    def worker():
+        for _ in range(10):
+            results.append(BaseInterpreter.evaluate(CountAlg, context=ctx, params=dict())['number'])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [3] * 40
+    assert len(created) <= 2
+    assert max(max_in_use) <= 2
+    # ресурс не "протекает" в исходный Контекст
+    assert 'conn' not in ctx
+    ctx.close_resources()
+    clear()
@@ -0,0 +1,52 @@
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.errors import InvalidParams
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_evaluate_subset_of_outputs():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+    x = Parameter(name='x', type_=types.Numeric)
+    y = Parameter(name='y', type_=types.Numeric)
+
+    calls = []
+
+    def track(name, value):
+        calls.append(name)
+        return value
+
+    Double = Action('Double', [a], [res], pure=True)
+    Square = Action('Square', [a], [res], pure=True)
+    Audit = Action('Audit', [a], [])
+
+    Implementation(action=Double, engine='python', function=lambda a: track('Double', a * 2))
+    Implementation(action=Square, engine='python', function=lambda a: track('Square', a * a))
+    Implementation(action=Audit, engine='python', function=lambda a: track('Audit', None))
+
+    def builder(a):
+        Audit(a)
+        return Double(a), Square(a)
+
+    Alg = MagicAlgorithmBuilder.build('Alg', [a], [x, y], builder=builder)
+    assert not Alg.pure
+
+    assert BaseInterpreter.evaluate(Alg, params=dict(a=3), outputs=['y']) == {'y': 9}
+    # Double не нужен и не имеет побочных эффектов, Audit - имеет
+    assert calls == ['Audit', 'Square']
+
+    del calls[:]
+    assert BaseInterpreter.evaluate(Alg, params=dict(a=3)) == {'x': 6, 'y': 9}
+    assert calls == ['Audit', 'Double', 'Square']
+
+    assert BaseInterpreter.evaluate(Double, params=dict(a=3), outputs=['res']) == {'res': 6}
+    with pytest.raises(InvalidParams):
+        BaseInterpreter.evaluate(Alg, params=dict(a=3), outputs=['z'])
+    clear()
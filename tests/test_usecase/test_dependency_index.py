@@ -0,0 +1,54 @@
+import pytest
+
+from fictilis.action import Action
+from fictilis.algbuilder import AlgorithmBuilder, MagicAlgorithmBuilder
+from fictilis.errors import InvalidDeclaration
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_dependency_index():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    x = Parameter(name='x', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    Neg = Action('Neg', [a], [res])
+    SumA = Action('Sum', [a, b], [res])
+
+    def builder(a, b):
+        n0 = Neg(a)            # 0
+        n1 = Neg(b)            # 1
+        s2 = SumA(n0, n1)      # 2
+        n3 = Neg(s2)           # 3
+        n4 = Neg(b)            # 4
+        return n3, n4
+
+    Alg = MagicAlgorithmBuilder.build('Alg', [a, b], [res, x], builder=builder)
+    index = Alg.index
+    assert index is not None
+
+    assert index.consumers[0] == {2}
+    assert index.producers[2] == {0, 1}
+    assert index.levels == [[0, 1, 4], [2], [3]]
+    assert index.level_of[3] == 2
+    assert index.descendants[1] == {2, 3}
+    assert index.ancestors[3] == {0, 1, 2}
+    assert index.inlet_consumers['b'] == {1, 4}
+    assert index.outlet_dependencies['res'] == {0, 1, 2, 3}
+    assert index.outlet_dependencies['x'] == {4}
+    assert index.closure([2, 4]) == {0, 1, 2, 4}
+
+    def cyclic(bind, register, a):
+        first = register(Neg)
+        second = register(Neg)
+        bind(fromlet=second.get_outlet('res'), tolet=first.get_inlet('a'))
+        bind(fromlet=first.get_outlet('res'), tolet=second.get_inlet('a'))
+        return second.get_outlet('res')
+
+    with pytest.raises(InvalidDeclaration):
+        AlgorithmBuilder.build('Cyclic', [a], [res], builder=cyclic)
+    clear()
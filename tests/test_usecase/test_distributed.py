@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, ActionPool, Implementation, ImplementationPool
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.cancellation import CancellationToken
+from fictilis.distributed import LocalCluster, DistributedExecutor, QueueBroker, worker_main, HEARTBEAT
+from fictilis.errors import EvaluationCancelled
+from fictilis.executor import ThreadExecutor
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+MARKER = dict(path=None)
+
+
+def crash_once(a):
+    # первый вызов "роняет" процесс-обработчик
+    if not os.path.exists(MARKER['path']):
+        open(MARKER['path'], 'w').close()
+        os._exit(1)
+    return a * 10
+
+
+def register():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    Slow = Action('Slow', [a], [res], pure=True)
+    Fragile = Action('Fragile', [a], [res], pure=True)
+    SumA = Action('Sum', [a, b], [res], pure=True)
+
+    def slow(a):
+        time.sleep(0.2)
+        return a
+
+    Implementation(action=Slow, engine='python', function=slow)
+    Implementation(action=Fragile, engine='python', function=crash_once)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    Wide = MagicAlgorithmBuilder.build(
+        'Wide', [a], [res], builder=lambda a: SumA(SumA(Slow(a), Slow(a)), SumA(Slow(a), Slow(a))))
+    Crashy = MagicAlgorithmBuilder.build('Crashy', [a], [res], builder=lambda a: SumA(Fragile(a), Slow(a)))
+    return Wide, Crashy
+
+
+def test_thread_executor():
+    Wide, _ = register()
+    start = time.time()
+    with ThreadExecutor(max_workers=4) as executor:
+        assert BaseInterpreter.evaluate(Wide, params=dict(a=1), executor=executor) == {'res': 4}
+    # четыре независимых Slow выполняются одновременно
+    assert time.time() - start < 0.6
+    clear()
+
+
+def test_local_cluster(tmpdir):
+    Wide, Crashy = register()
+    MARKER['path'] = os.path.join(str(tmpdir), 'crashed')
+    with LocalCluster(workers=2, setup=register, heartbeat=0.05, heartbeat_timeout=0.5) as cluster:
+        assert BaseInterpreter.evaluate(Wide, params=dict(a=1), executor=cluster.executor) == {'res': 4}
+        # обработчик упал посреди задачи - задача отправлена повторно
+        assert BaseInterpreter.evaluate(Crashy, params=dict(a=1), executor=cluster.executor) == {'res': 11}
+        assert os.path.exists(MARKER['path'])
+    clear()
+
+
+def test_task_lost_before_started():
+    Wide, _ = register()
+    broker = QueueBroker()
+    executor = DistributedExecutor(broker, heartbeat_timeout=0.3)
+    broker.send_event((HEARTBEAT, 'doomed', None, None))
+    futures = [executor.submit('Sum', 'python', dict(a=i, b=2)) for i in range(3)]
+    # обработчик взял задачу и упал, не успев сообщить STARTED
+    assert broker.receive_task(timeout=1).params == dict(a=0, b=2)
+    time.sleep(0.5)
+    # обработчик потерян, но ждущие в очереди задачи не отправлены повторно
+    queued = [broker.receive_task(timeout=1) for _ in range(2)]
+    assert [t.attempt for t in queued] == [1, 1]
+    with pytest.raises(queue.Empty):
+        broker.receive_task(timeout=0.1)
+    for task in queued:
+        broker.send_task(task)
+    worker = threading.Thread(target=worker_main, args=(broker, 'healthy', None, 0.05), daemon=True)
+    worker.start()
+    # начата задача, отправленная позже первой, - значит, первую взял упавший обработчик
+    assert [f.result(timeout=5) for f in futures] == [2, 3, 4]
+
+    # ожидание результата прерывается токеном
+    token = CancellationToken()
+    timer = threading.Timer(0.1, token.cancel)
+    timer.start()
+    Slow = ActionPool.get('Slow')
+    with pytest.raises(EvaluationCancelled):
+        executor.call(Slow, ImplementationPool.get(code='Slow', engine='python'), dict(a=1), token=token)
+    broker.send_task(None)
+    worker.join(timeout=5)
+    executor.shutdown()
+    clear()
+
+
+def test_spawned_threads_are_bounded():
+    Wide, _ = register()
+    with ThreadExecutor(max_workers=4) as executor:
+        executor.max_spawned = 1
+        before = threading.active_count()
+        assert BaseInterpreter.evaluate(Wide, params=dict(a=1), executor=executor) == {'res': 4}
+        assert threading.active_count() <= before + 1
+    clear()
@@ -0,0 +1,47 @@
+import io
+import time
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_explain_analyze():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    Fast = Action('Fast', [a], [res])
+    Slow = Action('Slow', [a], [res])
+    SumA = Action('Sum', [a, b], [res])
+
+    def slow(a):
+        time.sleep(0.02)
+        return a
+
+    Implementation(action=Fast, engine='python', function=lambda a: a)
+    Implementation(action=Slow, engine='python', function=slow)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    SlowTwice = MagicAlgorithmBuilder.build('SlowTwice', [a], [res], builder=lambda a: Slow(Slow(a)))
+    Alg = MagicAlgorithmBuilder.build('Alg', [a], [res], builder=lambda a: SumA(Fast(a), SlowTwice(a)))
+
+    out = io.StringIO()
+    explanation = BaseInterpreter.explain(Alg, params=dict(a=1), out=out)
+    assert explanation.result == {'res': 2}
+    assert [step.action.code for step in explanation.critical_path] == ['SlowTwice', 'Sum']
+
+    nested = explanation.steps[(1, )]
+    assert nested.nested >= 0.04
+    assert nested.self_time < nested.wall
+    assert set(explanation.steps) == {(0, ), (1, ), (1, 0), (1, 1), (2, )}
+
+    text = out.getvalue()
+    assert text.startswith('Algorithm: Alg')
+    assert 'critical path (*): SlowTwice -> Sum' in text
+    clear()
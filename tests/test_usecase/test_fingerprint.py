@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from fictilis.action import Action, ActionPool, Implementation, ImplementationPool
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.artifacts import ArtifactPool
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def register():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    SumA = Action('Sum', [a, b], [res], pure=True)
+    MultiA = Action('Multi', [a, b], [res], pure=True)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+    Implementation(action=MultiA, engine='python', function=lambda a, b: a * b)
+
+    numbers = iter(range(1000))
+
+    def build(factor, inner=None, swap=False):
+        number = next(numbers)
+        inner = inner or MagicAlgorithmBuilder.build(
+            'Square{}'.format(number), [a], [res], builder=lambda a: MultiA(a, a))
+        if swap:
+            return MagicAlgorithmBuilder.build(
+                'Request{}'.format(number), [a, b], [res], builder=lambda a, b: MultiA(SumA(b, inner(a)), factor))
+        return MagicAlgorithmBuilder.build(
+            'Request{}'.format(number), [a, b], [res], builder=lambda a, b: MultiA(SumA(inner(a), b), factor))
+    return build, a, res
+
+
+def test_fingerprint():
+    build, _, _ = register()
+    first, second = build(2), build(2)
+    assert first.code != second.code
+    # вложенные Алгоритмы тоже новые, но устроены одинаково
+    assert first.steps[0].action is not second.steps[0].action
+    assert first.fingerprint() == second.fingerprint()
+    assert first.get_index() is second.get_index()
+    assert ArtifactPool.hits >= 2
+    assert BaseInterpreter.evaluate(first, params=dict(a=3, b=1)) == {'res': 20}
+    assert BaseInterpreter.evaluate(second, params=dict(a=3, b=1)) == {'res': 20}
+
+    # другая константа и другие связи - другой отпечаток
+    assert build(3).fingerprint() != first.fingerprint()
+    assert build(2, swap=True).fingerprint() != first.fingerprint()
+
+    assert first.plan_memory() is second.plan_memory()
+
+    # от cost и size_hint зависят индекс и план памяти - они входят в отпечаток
+    ActionPool.get('Sum').cost = 10
+    assert build(2).fingerprint() != first.fingerprint()
+    clear()
+
+
+def test_unpicklable_constant():
+    _, a, res = register()
+    Multi = ActionPool.get('Multi')
+    lock = threading.Lock()
+    first = MagicAlgorithmBuilder.build('First', [a], [res], builder=lambda a: Multi(a, lock))
+    second = MagicAlgorithmBuilder.build('Second', [a], [res], builder=lambda a: Multi(a, lock))
+    # значение константы не сравнить - у Алгоритма нет отпечатка, его артефакты не кэшируются
+    assert first.fingerprint() is None
+    assert first.get_index() is not second.get_index()
+    Outer = MagicAlgorithmBuilder.build('Outer', [a], [res], builder=lambda a: first(a))
+    assert Outer.fingerprint() is None
+    clear()
+
+
+def test_columnar_kernel_is_shared():
+    numpy = pytest.importorskip('numpy')
+    from fictilis.columnar import compile_algorithm
+
+    build, _, _ = register()
+    for code, function in (('Sum', lambda a, b: a + b), ('Multi', lambda a, b: a * b)):
+        Implementation(action=ActionPool.get(code), engine='numpy', function=function)
+    first, second = build(2), build(2)
+    kernel = compile_algorithm(first)
+    shared = compile_algorithm(second)
+    assert shared.algorithm is second and shared.function is kernel.function
+    assert list(shared(a=[1, 2], b=[0, 1])['res']) == list(numpy.array([2., 10.]))
+
+    # ядро вызывает функции Реализаций - с другими Реализациями оно компилируется заново
+    ImplementationPool._reset()
+    for code, function in (('Sum', lambda a, b: a - b), ('Multi', lambda a, b: a * b)):
+        Implementation(action=ActionPool.get(code), engine='numpy', function=function)
+    other = compile_algorithm(first)
+    assert other.function is not kernel.function
+    assert list(other(a=[1, 2], b=[0, 1])['res']) == list(numpy.array([2., 6.]))
+    clear()
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.errors import EvaluationCancelled
+from fictilis.hedging import HedgingPolicy
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis.context import Context
+from fictilis import types
+
+from ..base import clear
+
+
+def test_hedged_execution():
+    clear()
+    res = Parameter(name='res', type_=types.Any)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    Lookup = Action('Lookup', [a], [res])
+
+    def slow(a):
+        time.sleep(0.5)
+        return 'compute'
+
+    Implementation(action=Lookup, engine='compute', function=slow)
+    Implementation(action=Lookup, engine='cache', function=lambda a: 'cache')
+
+    # без политики - обычный вызов выбранного Движка
+    assert BaseInterpreter.evaluate(Lookup, context=Context(engine='cache'), params=dict(a=1)) == {'res': 'cache'}
+
+    policy = HedgingPolicy(Lookup, delay=0.02)
+    start = time.time()
+    result = BaseInterpreter.evaluate(Lookup, context=Context(engine='compute'), params=dict(a=1))
+    assert result == {'res': 'cache'}
+    assert time.time() - start < 0.4
+
+    # быстрый выбранный Движок не хеджируется
+    assert BaseInterpreter.evaluate(Lookup, context=Context(engine='cache'), params=dict(a=1)) == {'res': 'cache'}
+    assert policy.get_delay('cache') == policy.delay
+    clear()
+
+
+def test_hedges_do_not_queue_behind_primaries():
+    clear()
+    res = Parameter(name='res', type_=types.Any)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    Lookup = Action('Lookup', [a], [res])
+
+    def slow(a):
+        time.sleep(0.5)
+        return 'compute'
+
+    Implementation(action=Lookup, engine='compute', function=slow)
+    Implementation(action=Lookup, engine='cache', function=lambda a: 'cache')
+    HedgingPolicy(Lookup, delay=0.02, max_workers=2)
+
+    results = []
+
+    def call():
+        results.append(BaseInterpreter.evaluate(Lookup, context=Context(engine='compute'), params=dict(a=1)))
+
+    start = time.time()
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # основные вызовы заняли свой пул, хеджи выполняются в отдельном
+    assert results == [{'res': 'cache'}] * 4
+    assert time.time() - start < 0.4
+    clear()
+
+
+def test_hedged_wait_is_cancellable():
+    clear()
+    res = Parameter(name='res', type_=types.Any)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    Lookup = Action('Lookup', [a], [res])
+
+    def slow(a):
+        time.sleep(0.5)
+        return 'slow'
+
+    Implementation(action=Lookup, engine='compute', function=slow)
+    Implementation(action=Lookup, engine='replica', function=slow)
+    policy = HedgingPolicy(Lookup, delay=0.02)
+
+    # оба Движка медленные - ожидание прерывается deadline'ом запуска
+    start = time.time()
+    with pytest.raises(EvaluationCancelled):
+        BaseInterpreter.evaluate(Lookup, context=Context(engine='compute'), params=dict(a=1), deadline=0.1)
+    assert time.time() - start < 0.3
+
+    # сброс пула останавливает потоки Политики
+    executors = policy._get_executors()
+    clear()
+    assert all(executor._shutdown for executor in executors)
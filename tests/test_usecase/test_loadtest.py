@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.context import Context
+from fictilis.errors import WorkerLost
+from fictilis.loadtest import load_test, ASYNCIO, PROCESSES
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def register():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+
+    def wait(a):
+        time.sleep(0.01)
+        if a % 10 == 9:
+            raise ValueError('bad row')
+        return a
+
+    Wait = Action('Wait', [a], [res])
+    Plus = Action('Plus', [a], [res])
+    Implementation(action=Wait, engine='python', function=wait)
+    Implementation(action=Plus, engine='python', function=lambda a: a + 1)
+    return MagicAlgorithmBuilder.build('Alg', [a], [res], builder=lambda a: Plus(Wait(a)))
+
+
+def test_load_test():
+    Alg = register()
+
+    report = load_test(Alg, params=lambda i: dict(a=i), concurrency=4, duration=0.3, steps=True)
+    # 4 вызывающих по ~10ms
+    assert report.throughput > 4 / 0.01 * 0.3
+    assert 0.05 < report.error_rate < 0.2
+    assert report.percentile(50) >= 0.01
+    assert report.max >= report.percentile(99) >= report.percentile(50)
+    assert ('0', 'Wait') in report.steps and ('1', 'Plus') in report.steps
+    assert 'errors' in str(report) and 'bad row' in str(report)
+
+    report = load_test(Alg, params=dict(a=1), concurrency=2, rate=40, duration=0.5, mode=ASYNCIO)
+    assert 12 <= report.calls <= 24
+    assert report.error_rate == 0
+
+    report = load_test(Alg, params=dict(a=1), concurrency=2, duration=0.3, mode=PROCESSES)
+    assert report.calls > 10 and report.error_rate == 0
+
+    # упавший процесс не подвешивает тест
+    start = time.time()
+    with pytest.raises(WorkerLost):
+        load_test(Alg, params=dict(a=1), concurrency=2, duration=0.3, mode=PROCESSES, setup=broken_setup)
+    assert time.time() - start < 5
+
+    # spawn: процессы загружают Действия через setup, Контекст передается сериализованным;
+    # время запуска процессов не входит в длительность
+    report = load_test(Alg, params=dict(a=1), concurrency=2, duration=0.3, mode=PROCESSES,
+                       context=Context(engine='python'), setup=register, mp_context='spawn')
+    assert report.calls > 10 and report.error_rate == 0
+    assert report.elapsed < 0.3 + 0.2
+    clear()
+
+
+def broken_setup():
+    raise RuntimeError('setup failed')
@@ -0,0 +1,129 @@
+import io
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import AlgorithmBuilder, MagicAlgorithmBuilder
+from fictilis.checkpoint import FileCheckpointStore
+from fictilis.control import Loop, LoopAction
+from fictilis.errors import InvalidDeclaration
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_loop():
+    clear()
+    x = Parameter(name='x', type_=types.Numeric)
+    target = Parameter(name='target', type_=types.Numeric)
+    err = Parameter(name='err', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+    flag = Parameter(name='flag', type_=types.Boolean)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    calls = []
+
+    def call(name, function):
+        def wrapper(**kwargs):
+            calls.append(name)
+            return function(**kwargs)
+        return wrapper
+
+    Prepare = Action('Prepare', [a], [res], pure=True)
+    Newton = Action('Newton', [a, b], [res], pure=True)
+    Error = Action('Error', [a, b], [res], pure=True)
+    Small = Action('Small', [err], [flag], pure=True)
+    Step = Action('Step', [a], [res], pure=True)
+    Implementation(action=Prepare, engine='python', function=call('Prepare', lambda a: float(a)))
+    Implementation(action=Newton, engine='python', function=call('Newton', lambda a, b: (a + b / a) / 2))
+    Implementation(action=Error, engine='python', function=call('Error', lambda a, b: abs(a * a - b)))
+    Implementation(action=Small, engine='python', function=call('Small', lambda err: err < 1e-9))
+    Implementation(action=Step, engine='python', function=call('Step', lambda a: min(a + 1, 3)))
+
+    def newton_step(x, target):
+        prepared = Prepare(target)
+        new_x = Newton(x, prepared)
+        return new_x, Error(new_x, prepared)
+    Body = MagicAlgorithmBuilder.build('SqrtStep', [x, target], [x, err], builder=newton_step)
+
+    Sqrt = MagicAlgorithmBuilder.build('Sqrt', [target], [res], builder=lambda target: Loop(
+        Body, until=Small, max_iter=50, x=1, target=target).get_outlet('x'))
+    result = BaseInterpreter.evaluate(Sqrt, params=dict(target=2))
+    assert abs(result['res'] - 2 ** 0.5) < 1e-9
+    iterations = calls.count('Newton')
+    assert 2 < iterations < 10
+    # Шаг, зависящий только от неизменного Ввода, выполнен один раз
+    assert calls.count('Prepare') == 1
+    assert calls.count('Small') == iterations
+
+    # неподвижная точка: переносимое значение перестало меняться
+    Counter = MagicAlgorithmBuilder.build('Counter', [a], [a], builder=lambda a: Step(a))
+    del calls[:]
+
+    def build_count(bind, register, a):
+        loop = register(LoopAction.of(Counter, max_iter=10))
+        bind(a, loop.get_inlet('a'))
+        return loop
+    Count = AlgorithmBuilder.build('Count', [a], [res], builder=build_count)
+    assert BaseInterpreter.evaluate(Count, params=dict(a=0))['res'] == 3
+    # 0 -> 1 -> 2 -> 3, затем 3 -> 3
+    assert calls == ['Step'] * 4
+    del calls[:]
+    Bounded = LoopAction.of(Counter, max_iter=2)
+    assert BaseInterpreter.evaluate(Bounded, params=dict(a=0))['a'] == 2
+
+    with pytest.raises(InvalidDeclaration):
+        LoopAction.of(Prepare)
+    with pytest.raises(InvalidDeclaration):
+        LoopAction.of(Body, until=Newton)
+    clear()
+
+
+def test_loop_with_algorithm_condition(tmpdir):
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+    flag = Parameter(name='flag', type_=types.Boolean)
+
+    calls = []
+    broken = {'fail': True}
+
+    def inc(a):
+        calls.append(a)
+        return a + 1
+
+    def fragile(a):
+        if broken['fail'] and a == 3:
+            raise RuntimeError('step failed')
+        return a
+
+    Inc = Action('Inc', [a], [res])
+    Fragile = Action('Fragile', [a], [res])
+    Enough = Action('Enough', [a], [flag])
+    Implementation(action=Inc, engine='python', function=inc)
+    Implementation(action=Fragile, engine='python', function=fragile)
+    Implementation(action=Enough, engine='python', function=lambda a: a >= 5)
+
+    Body = MagicAlgorithmBuilder.build('Body', [a], [a], builder=lambda a: Fragile(Inc(a)))
+    Done = MagicAlgorithmBuilder.build('Done', [a], [flag], builder=lambda a: Enough(a))
+    Count = MagicAlgorithmBuilder.build('Count', [a], [res], builder=lambda a: Loop(
+        Body, until=Done, max_iter=10, a=a).get_outlet('a'))
+
+    store = FileCheckpointStore(directory=str(tmpdir))
+    with pytest.raises(RuntimeError):
+        BaseInterpreter.evaluate(Count, params=dict(a=0), checkpoint=store, run_id='nightly')
+    assert calls == [0, 1, 2]
+    broken['fail'] = False
+    result = BaseInterpreter.evaluate(Count, params=dict(a=0), checkpoint=store, resume_from='nightly')
+    assert result == {'res': 5}
+    # итерации до сбоя (и их условия) взяты из контрольных точек
+    assert calls == [0, 1, 2, 3, 4]
+
+    out = io.StringIO()
+    explanation = BaseInterpreter.explain(Count, params=dict(a=0), out=out)
+    assert explanation.result == {'res': 5}
+    assert 'Enough' in str(explanation)
+    clear()
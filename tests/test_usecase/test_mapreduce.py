@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.checkpoint import FileCheckpointStore
+from fictilis.errors import InvalidParams
+from fictilis.executor import ThreadExecutor
+from fictilis.interpreter import BaseInterpreter
+from fictilis.mapreduce import Map, Reduce, split
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_map_reduce():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+    numbers = Parameter(name='numbers', type_=types.ListOf(types.Numeric))
+    squares = Parameter(name='squares', type_=types.ListOf(types.Numeric))
+
+    threads = set()
+
+    def multi(a, b):
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        return a * b
+
+    MultiA = Action('Multi', [a, b], [res], pure=True)
+    SumA = Action('Sum', [a, b], [res], pure=True)
+    Implementation(action=MultiA, engine='python', function=multi)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    Square = MagicAlgorithmBuilder.build('Square', [a], [res], builder=lambda a: MultiA(a, a))
+    Squares = MagicAlgorithmBuilder.build('Squares', [numbers], [squares], builder=lambda numbers: Map(Square, numbers))
+    Scaled = MagicAlgorithmBuilder.build(
+        'Scaled', [numbers, b], [squares], builder=lambda numbers, b: Map(MultiA, numbers, chunk_size=3, b=b))
+    SumOfSquares = MagicAlgorithmBuilder.build(
+        'SumOfSquares', [numbers], [res],
+        builder=lambda numbers: Reduce(SumA, Map(Square, numbers), initial=100, chunk_size=4))
+
+    values = list(range(20))
+    assert BaseInterpreter.evaluate(Squares, params=dict(numbers=values))['squares'] == [v * v for v in values]
+    assert BaseInterpreter.evaluate(Scaled, params=dict(numbers=values, b=2))['squares'] == [v * 2 for v in values]
+    assert BaseInterpreter.evaluate(SumOfSquares, params=dict(numbers=values))['res'] == 100 + sum(v * v for v in values)
+    assert BaseInterpreter.evaluate(SumOfSquares, params=dict(numbers=[]))['res'] == 100
+    assert len(threads) == 1
+
+    with ThreadExecutor(max_workers=8) as executor:
+        started = time.time()
+        result = BaseInterpreter.evaluate(SumOfSquares, params=dict(numbers=values), executor=executor)
+        elapsed = time.time() - started
+    assert result['res'] == 100 + sum(v * v for v in values)
+    # части выполняются одновременно
+    assert len(threads) > 1
+    assert elapsed < 20 * 0.01
+
+    assert split(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(InvalidParams):
+        MagicAlgorithmBuilder.build('Bad', [numbers], [squares], builder=lambda numbers: Map(MultiA, numbers))
+    clear()
+
+
+def test_resume_concurrent_reduce(tmpdir):
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+    numbers = Parameter(name='numbers', type_=types.ListOf(types.Numeric))
+
+    calls = []
+    broken = {'fail': True}
+
+    def add(a, b):
+        # части завершаются в разном порядке
+        time.sleep(0.001 * (b % 5))
+        calls.append((a, b))
+        return a + b
+
+    def check(a, b):
+        if broken['fail'] and b == 13:
+            raise RuntimeError('step failed')
+        return a
+
+    SumA = Action('Sum', [a, b], [res])
+    CheckA = Action('Check', [a, b], [res])
+    Implementation(action=SumA, engine='python', function=add)
+    Implementation(action=CheckA, engine='python', function=check)
+
+    Combine = MagicAlgorithmBuilder.build('Combine', [a, b], [res], builder=lambda a, b: CheckA(SumA(a, b), b))
+    Total = MagicAlgorithmBuilder.build(
+        'Total', [numbers], [res], builder=lambda numbers: Reduce(Combine, numbers, initial=100, chunk_size=4))
+
+    values = list(range(16))
+    store = FileCheckpointStore(directory=str(tmpdir))
+    with ThreadExecutor(max_workers=8) as executor:
+        with pytest.raises(RuntimeError):
+            BaseInterpreter.evaluate(Total, params=dict(numbers=values), executor=executor,
+                                     checkpoint=store, run_id='nightly')
+        done = set(calls)
+        del calls[:]
+        broken['fail'] = False
+        result = BaseInterpreter.evaluate(Total, params=dict(numbers=values), executor=executor,
+                                          checkpoint=store, resume_from='nightly')
+    assert result == {'res': 100 + sum(values)}
+    # свертки, завершенные до сбоя, взяты из контрольных точек
+    assert (3, 4) in done and (3, 4) not in calls
+    assert not {(a, b) for a, b in calls if b < 11} & done
+    clear()
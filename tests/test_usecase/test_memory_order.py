@@ -0,0 +1,75 @@
+import tracemalloc
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.errors import InvalidDeclaration
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+MB = 1024 * 1024
+
+
+def _peak(algorithm, params):
+    tracemalloc.start()
+    try:
+        result = BaseInterpreter.evaluate(algorithm, params=params)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_memory_aware_order():
+    clear()
+    n = Parameter(name='n', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+    blob = Parameter(name='blob', size_hint=10 * MB)
+
+    Load = Action('Load', [n], [blob], pure=True)
+    Measure = Action('Measure', [blob], [res], pure=True)
+    SumA = Action('Sum', [Parameter('a'), Parameter('b')], [res], pure=True)
+    Implementation(action=Load, engine='python', function=lambda n: bytearray(int(n) * MB))
+    Implementation(action=Measure, engine='python', function=lambda blob: len(blob))
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    def builder(n):
+        first, second = Load(n), Load(n)
+        return SumA(Measure(first), Measure(second))
+    Alg = MagicAlgorithmBuilder.build('Alg', [n], [res], builder=builder)
+
+    result, registration_peak = _peak(Alg, dict(n=10))
+    assert result['res'] == 20 * MB
+
+    plan = Alg.plan_memory()
+    assert plan.order == [0, 2, 1, 3, 4]
+    assert plan.peak < plan.registration_peak
+    result, planned_peak = _peak(Alg, dict(n=10))
+    assert result['res'] == 20 * MB
+    assert planned_peak < registration_peak * 0.75
+
+    # измеренные размеры важнее подсказок
+    explanation = BaseInterpreter.explain(Alg, params=dict(n=1), out=None)
+    sizes = explanation.output_sizes()
+    assert sizes[0] >= MB
+    assert Alg.plan_memory(sizes).order == [0, 2, 1, 3, 4]
+
+    with pytest.raises(InvalidDeclaration):
+        Alg.set_order([2, 0, 1, 3, 4])
+    Alg.set_order(None)
+    assert Alg.get_order() == [0, 1, 2, 3, 4]
+
+    # порядок побочных эффектов сохраняется
+    Write = Action('Write', [blob], [res])
+    Implementation(action=Write, engine='python', function=lambda blob: len(blob))
+
+    def effects(n):
+        first, second = Load(n), Load(n)
+        return SumA(Write(first), Write(second))
+    Effects = MagicAlgorithmBuilder.build('Effects', [n], [res], builder=effects)
+    order = Effects.plan_memory().order
+    assert order.index(2) < order.index(3)
+    clear()
@@ -0,0 +1,46 @@
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.interpreter import BaseInterpreter
+from fictilis.metrics import MetricsCollector, exposition
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_metrics_collector():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    SumA = Action('Sum', [a, b], [res])
+    DivisionA = Action('Division', [a, b], [res])
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+    Implementation(action=DivisionA, engine='python', function=lambda a, b: a / b)
+    Mean = MagicAlgorithmBuilder.build('Mean', [a, b], [res], builder=lambda a, b: DivisionA(SumA(a, b), 2))
+
+    collector = MetricsCollector()
+    BaseInterpreter.metrics = collector
+    try:
+        assert BaseInterpreter.evaluate(Mean, params=dict(a=1, b=3)) == {'res': 2}
+        with pytest.raises(ZeroDivisionError):
+            BaseInterpreter.evaluate(DivisionA, params=dict(a=1, b=0))
+    finally:
+        BaseInterpreter.metrics = None
+
+    assert collector.calls.get(('Sum', 'python')) == 1
+    assert collector.calls.get(('Division', 'python')) == 2
+    assert collector.errors.get(('Division', 'python')) == 1
+    assert collector.algorithm_calls.get(('Mean', )) == 1
+    assert collector.in_flight.get() == 0
+
+    body, content_type = exposition(collector)
+    assert content_type.startswith('text/plain')
+    assert 'fictilis_action_calls_total{action="Division",engine="python"} 2' in body
+    assert 'fictilis_action_duration_seconds_bucket{action="Sum",engine="python",le="+Inf"} 1' in body
+    assert 'fictilis_validation_duration_seconds_count{action="Mean",direction="in"} 1' in body
+    assert '# TYPE fictilis_evaluations_in_flight gauge' in body
+    clear()
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.errors import EvaluationCancelled
+from fictilis.executor import ThreadExecutor
+from fictilis.interpreter import BaseInterpreter
+from fictilis.mapreduce import Map
+from fictilis.parameter import Parameter
+from fictilis.scheduling import ResourceClass
+from fictilis import types
+
+from ..base import clear
+
+
+def test_resource_class_limits():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    Query = Action('Query', [a], [res], pure=True, resource_class='db')
+    Heavy = Action('Heavy', [a], [res], pure=True, resource_class='cpu', cost=10)
+    SumA = Action('Sum', [a, b], [res], pure=True)
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def query(a):
+        with lock:
+            active.append(a)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(a)
+        return a
+
+    Implementation(action=Query, engine='python', function=query)
+    Implementation(action=Heavy, engine='python', function=lambda a: a)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    def builder(a):
+        return SumA(SumA(SumA(Query(a), Query(a)), SumA(Query(a), Query(a))), Heavy(Query(a)))
+
+    Alg = MagicAlgorithmBuilder.build('Alg', [a], [res], builder=builder)
+    index = Alg.index
+    # Query, после которого идет дорогой Heavy, - в приоритете
+    assert index.critical_length[7] > index.critical_length[0]
+    assert Alg.cost == index.critical_length[7]
+
+    ResourceClass('db', limit=2)
+    with ThreadExecutor(max_workers=8) as executor:
+        assert BaseInterpreter.evaluate(Alg, params=dict(a=1), executor=executor) == {'res': 5}
+    assert len(peak) == 5
+    assert max(peak) == 2
+    clear()
+
+
+def test_resource_class_priority():
+    clear()
+    limited = ResourceClass('api', limit=1)
+    order = []
+    limited.acquire()
+
+    def waiter(priority):
+        with limited.slot(priority=priority):
+            order.append(priority)
+
+    threads = [threading.Thread(target=waiter, args=(p, )) for p in (1, 5, 3)]
+    for t in threads:
+        t.start()
+    while len(limited._waiters) < 3:
+        time.sleep(0.001)
+    limited.release()
+    for t in threads:
+        t.join()
+    assert order == [5, 3, 1]
+    clear()
+
+
+def test_cancel_waiting_for_resource_class():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+    numbers = Parameter(name='numbers', type_=types.ListOf(types.Numeric))
+
+    Query = Action('Query', [a], [res], pure=True, resource_class='db')
+    Implementation(action=Query, engine='python', function=lambda a: a)
+    Queries = MagicAlgorithmBuilder.build('Queries', [numbers], [numbers], builder=lambda numbers: Map(Query, numbers))
+
+    db = ResourceClass('db', limit=1)
+    # класс занят - элементы Map ждут слот
+    db.acquire()
+    try:
+        start = time.time()
+        with pytest.raises(EvaluationCancelled):
+            BaseInterpreter.evaluate(Queries, params=dict(numbers=[1, 2, 3]), deadline=0.1)
+        assert time.time() - start < 1
+        assert not db._waiters
+    finally:
+        db.release()
+    clear()
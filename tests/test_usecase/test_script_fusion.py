@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.fusion import Script, ScriptRunnerPool
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+from fictilis.context import Context
+
+from ..base import clear
+
+
+def test_fused_sql_steps():
+    clear()
+    conn = sqlite3.connect(':memory:')
+
+    class Table:
+        def __init__(self, name):
+            self.name = name
+
+    def table_validator(value):
+        if not isinstance(value, Table):
+            raise TypeError
+        return value
+
+    TableType = types.Type(code='Table', validator=table_validator)
+
+    context = Parameter(name='context', type_=types.ContextType)
+    table = Parameter(name='table', type_=TableType)
+    number = Parameter(name='number', type_=types.Numeric)
+    column = Parameter(name='column', type_=types.Any)
+    name = Parameter(name='name', type_=types.Any)
+
+    Create = Action('Create', [context, name], [table])
+    Drop = Action('Drop', [context, table], [])
+    CalcSum = Action('CalcSum', [context, table, column], [number])
+    MergeTables = Action('MergeTables', [context, table, Parameter('table2', TableType)], [table])
+
+    engine = 'sql'
+    round_trips = []
+
+    def runner(context, texts):
+        round_trips.append(len(texts))
+        context['conn'].executescript('BEGIN;\n{}\nCOMMIT;'.format('\n'.join(texts)))
+
+    ScriptRunnerPool.register(engine=engine, runner=runner)
+
+    Implementation(action=Create, engine=engine, fusible=True, function=lambda context, name: Script(
+        'CREATE TEMPORARY TABLE {t} (COL INT); INSERT INTO {t} VALUES (1),(2),(3),(4),(5);'.format(t=name),
+        result=Table(name)))
+    Implementation(action=Drop, engine=engine, fusible=True, function=lambda context, table: Script(
+        'DROP TABLE IF EXISTS {};'.format(table.name)))
+    Implementation(action=MergeTables, engine=engine, fusible=True, function=lambda context, table, table2: Script(
+        'CREATE TEMPORARY TABLE some_table AS SELECT T1.COL AS COL1, T2.COL AS COL2 FROM {} T1 JOIN {} T2;'.format(
+            table.name, table2.name),
+        result=Table('some_table')))
+    Implementation(action=CalcSum, engine=engine, function=lambda context, table, column: context['conn'].execute(
+        'SELECT SUM({}) FROM {};'.format(column, table.name)).fetchall()[0][0])
+
+    def some_alg_with_table_builder(context):
+        table1 = Create(context, 'tmp_table1')
+        table2 = Create(context, 'tmp_table2')
+        merged_table = MergeTables(context, table1, table2)
+        Drop(context, table1)
+        Drop(context, table2)
+        summa = CalcSum(context, merged_table, 'COL2')
+        Drop(context, merged_table)
+        return summa
+
+    SomeAlgWithTables = MagicAlgorithmBuilder.build(
+        'SomeAlgWithTables', in_params=[context], out_params=[number], builder=some_alg_with_table_builder)
+
+    result = BaseInterpreter.evaluate(SomeAlgWithTables, context=Context(conn=conn), params=dict())
+    assert result['number'] == 75.0
+    # 5 скриптов до CalcSum - одним вызовом, последний Drop - при завершении запуска
+    assert round_trips == [5, 1]
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_temp_master WHERE type='table'").fetchall()[0][0] == 0
+    clear()
+
+
+def test_deferred_scripts_on_failure():
+    clear()
+    conn = sqlite3.connect(':memory:')
+    context = Parameter(name='context', type_=types.ContextType)
+    name = Parameter(name='name', type_=types.Any)
+
+    Create = Action('Create', [context, name], [name])
+    Broken = Action('Broken', [context, name], [name])
+
+    engine = 'sql'
+    ScriptRunnerPool.register(engine=engine, runner=lambda context, texts: context['conn'].executescript(
+        '\n'.join(texts)))
+
+    def broken(context, name):
+        raise RuntimeError('can not build script')
+
+    Implementation(action=Create, engine=engine, fusible=True, function=lambda context, name: Script(
+        'CREATE TEMPORARY TABLE {} (COL INT);'.format(name), result=name))
+    Implementation(action=Broken, engine=engine, fusible=True, function=broken)
+
+    Alg = MagicAlgorithmBuilder.build(
+        'Alg', in_params=[context], out_params=[name], builder=lambda context: Broken(context, Create(context, 'tmp')))
+
+    with pytest.raises(RuntimeError):
+        BaseInterpreter.evaluate(Alg, context=Context(conn=conn), params=dict())
+    # скрипт выполненного Шага не потерян: выполнен, как выполнился бы без слияния
+    assert conn.execute("SELECT name FROM sqlite_temp_master WHERE type='table'").fetchall() == [('tmp', )]
+
+    # ошибка отложенного скрипта не подменяет ошибку запуска
+    with pytest.warns(UserWarning):
+        with pytest.raises(RuntimeError):
+            BaseInterpreter.evaluate(Alg, context=Context(conn=conn), params=dict())
+    clear()
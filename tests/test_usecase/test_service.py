@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.context import Context
+from fictilis.errors import RequestRejected, EvaluationCancelled, InvalidParams
+from fictilis.parameter import Parameter
+from fictilis.service import EvaluationService, FairShare, SHED
+from fictilis import types
+
+from ..base import clear
+
+GATE = threading.Event()
+
+
+def register():
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    Slow = Action('Slow', [a], [res], pure=True)
+    Blocked = Action('Blocked', [a], [res], pure=True)
+    Quick = Action('Quick', [a], [res], pure=True)
+    SumA = Action('Sum', [a, b], [res], pure=True)
+
+    def slow(a):
+        time.sleep(0.2)
+        return a
+
+    def blocked(a):
+        GATE.wait(5)
+        return a
+
+    Implementation(action=Slow, engine='python', function=slow)
+    Implementation(action=Blocked, engine='python', function=blocked)
+    Implementation(action=Quick, engine='python', function=lambda a: a + 1)
+    Implementation(action=SumA, engine='python', function=lambda a, b: a + b)
+
+    Wide = MagicAlgorithmBuilder.build(
+        'Wide', [a], [res], builder=lambda a: SumA(SumA(Slow(a), Slow(a)), SumA(Slow(a), Slow(a))))
+    return Wide, Blocked, Quick
+
+
+def test_admission():
+    _, Blocked, Quick = register()
+    GATE.clear()
+    service = EvaluationService(workers=1, slots=1, queue_size=2)
+    running = service.submit(Blocked, params=dict(a=1))
+    time.sleep(0.1)
+    queued = [service.submit(Quick, params=dict(a=i)) for i in range(2)]
+    with pytest.raises(RequestRejected):
+        service.submit(Quick, params=dict(a=10))
+    assert service.stats()['rejected'] == 1
+    GATE.set()
+    assert running.result(timeout=5) == {'res': 1}
+    assert [f.result(timeout=5) for f in queued] == [{'res': 1}, {'res': 2}]
+    service.shutdown()
+    with pytest.raises(RequestRejected):
+        service.submit(Quick, params=dict(a=1))
+    clear()
+
+
+def test_shedding_and_deadline():
+    _, Blocked, Quick = register()
+    GATE.clear()
+    service = EvaluationService(workers=1, slots=1, queue_size=2, policy=SHED)
+    running = service.submit(Blocked, params=dict(a=1))
+    time.sleep(0.1)
+    low = service.submit(Quick, params=dict(a=1), priority=0)
+    expiring = service.submit(Quick, params=dict(a=2), priority=1, deadline=0.05)
+    high = service.submit(Quick, params=dict(a=3), priority=5)
+    # вытеснен запрос с наименьшим приоритетом
+    with pytest.raises(RequestRejected):
+        low.result(timeout=1)
+    with pytest.raises(RequestRejected):
+        service.submit(Quick, params=dict(a=4), priority=0)
+    time.sleep(0.1)
+    GATE.set()
+    assert running.result(timeout=5) == {'res': 1}
+    assert high.result(timeout=5) == {'res': 4}
+    # deadline истек, пока запрос ждал в очереди
+    with pytest.raises(EvaluationCancelled):
+        expiring.result(timeout=5)
+    service.shutdown()
+    clear()
+
+
+def test_fair_share():
+    share = FairShare(slots=2)
+    share.acquire('batch')
+    share.acquire('batch')
+    order = []
+
+    def wait(tenant, priority):
+        share.acquire(tenant, priority)
+        order.append((tenant, priority))
+
+    threads = []
+    for tenant, priority in (('batch', 0), ('batch', 1), ('small', 0)):
+        threads.append(threading.Thread(target=wait, args=(tenant, priority), daemon=True))
+        threads[-1].start()
+        time.sleep(0.05)
+    share.release('batch')
+    time.sleep(0.05)
+    share.release('batch')
+    time.sleep(0.05)
+    share.release('small')
+    for thread in threads:
+        thread.join(timeout=1)
+    # пришедший последним арендатор получает слот первым, у batch - сначала более приоритетный
+    assert order == [('small', 0), ('batch', 1), ('batch', 0)]
+
+
+def test_small_requests_are_not_starved():
+    Wide, _, Quick = register()
+    with EvaluationService(workers=4, slots=2) as service:
+        batch = [service.submit(Wide, params=dict(a=1), tenant='batch') for _ in range(3)]
+        time.sleep(0.05)
+        start = time.time()
+        assert service.submit(Quick, params=dict(a=1), tenant='small').result(timeout=5) == {'res': 2}
+        # ждет только освобождения одного слота, а не все Шаги batch
+        assert time.time() - start < 0.5
+        assert [f.result(timeout=10) for f in batch] == [{'res': 4}] * 3
+    clear()
+
+
+def test_request_token_does_not_replace_context_token():
+    Wide, _, _ = register()
+    service = EvaluationService(workers=1, slots=1)
+    context = Context(engine='python')
+    future = service.submit(Wide, params=dict(a=1), context=context, deadline=0.1)
+    # deadline запроса прерывает уже выполняющийся запуск
+    with pytest.raises(EvaluationCancelled):
+        future.result(timeout=5)
+    # а Контекст запроса разделяет токен отмены с переданным, не подменяя его
+    assert future.request.context.cancellation is context.cancellation
+    assert not context.cancellation.cancelled
+    with pytest.raises(InvalidParams):
+        service.submit(Wide, params=dict(a=1), token=context.cancellation)
+    service.shutdown()
+    clear()
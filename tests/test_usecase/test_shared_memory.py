@@ -0,0 +1,86 @@
+import glob
+import os
+from collections import OrderedDict, namedtuple
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.distributed import LocalCluster
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis.sharedmem import SharedMemoryTransport, SharedHandle
+from fictilis import types
+
+from ..base import clear
+
+
+def blocks():
+    return set(glob.glob('/dev/shm/psm_*'))
+
+
+def register():
+    clear()
+    data = Parameter(name='data', type_=types.Any)
+    res = Parameter(name='res', type_=types.Any)
+
+    Reverse = Action('Reverse', [data], [res], pure=True)
+    Size = Action('Size', [data], [res], pure=True)
+    Implementation(action=Reverse, engine='python', function=lambda data: bytes(data)[::-1])
+    Implementation(action=Size, engine='python', function=lambda data: (len(data), os.getpid()))
+
+    return MagicAlgorithmBuilder.build(
+        'ReverseTwice', [data], [res], builder=lambda data: Size(Reverse(Reverse(data))))
+
+
+def test_pack_unpack():
+    transport = SharedMemoryTransport(threshold=1024)
+    before = blocks()
+    created = []
+    value = dict(big=bytes(range(256)) * 16, small=b'abc', items=[bytearray(2048), 1])
+    packed = transport.pack(value, created)
+    assert isinstance(packed['big'], SharedHandle)
+    assert isinstance(packed['items'][0], SharedHandle)
+    assert packed['small'] == b'abc' and packed['items'][1] == 1
+    assert len(created) == 2
+    assert transport.unpack(packed, owner=False) == dict(value, items=[bytes(2048), 1])
+    transport.release(created)
+    assert not created
+    assert blocks() == before
+
+
+def test_containers_keep_type():
+    transport = SharedMemoryTransport(threshold=1024)
+    before = blocks()
+    created = []
+    Pair = namedtuple('Pair', 'key data')
+    small = dict(items=[1, 2], pair=Pair('a', b'abc'))
+    # контейнеры без больших значений не пересобираются
+    assert transport.pack(small, created) is small
+    value = OrderedDict(pair=Pair('a', bytes(2048)), items=(b'x', bytearray(2048)))
+    packed = transport.pack(value, created)
+    assert type(packed) is OrderedDict and type(packed['pair']) is Pair and type(packed['items']) is tuple
+    assert packed['items'][0] is value['items'][0]
+    unpacked = transport.unpack(packed, owner=False)
+    assert type(unpacked) is OrderedDict and type(unpacked['pair']) is Pair
+    assert unpacked == OrderedDict(pair=Pair('a', bytes(2048)), items=(b'x', bytes(2048)))
+
+    # блок удаляется, даже если его буфер еще используется
+    view = created[0].buf[:16]
+    transport.release(created)
+    assert blocks() == before
+    view.release()
+
+
+def test_local_cluster_transport():
+    ReverseTwice = register()
+    before = blocks()
+    payload = os.urandom(256 * 1024)
+    transport = SharedMemoryTransport(threshold=1024)
+    with LocalCluster(workers=2, setup=register, heartbeat=0.05, transport=transport) as cluster:
+        res, pid = BaseInterpreter.evaluate(
+            ReverseTwice, params=dict(data=payload), executor=cluster.executor)['res']
+        assert res == len(payload) and pid != os.getpid()
+        future = cluster.executor.submit('Reverse', 'python', dict(data=payload))
+        assert future.result(timeout=10) == payload[::-1]
+    # блоки параметров и результатов удалены
+    assert blocks() == before
+    clear()
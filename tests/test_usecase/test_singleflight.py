@@ -0,0 +1,142 @@
+import threading
+import time
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.context import Context
+from fictilis.errors import EvaluationCancelled
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis.singleflight import SingleFlight
+from fictilis import types
+
+from ..base import clear
+
+
+def test_single_flight():
+    clear()
+    a = Parameter(name='a', type_=types.Any)
+    res = Parameter(name='res', type_=types.Numeric)
+
+    calls = []
+
+    def expensive(a):
+        calls.append(a)
+        time.sleep(0.1)
+        return sum(a)
+
+    Expensive = Action('Expensive', [a], [res])
+    Implementation(action=Expensive, engine='python', function=expensive)
+    Alg = MagicAlgorithmBuilder.build('Alg', [a], [res], builder=lambda a: Expensive(a))
+    SingleFlight(Alg)
+
+    results = []
+
+    def caller(value):
+        results.append(BaseInterpreter.evaluate(Alg, params=dict(a=value)))
+
+    threads = [threading.Thread(target=caller, args=([1, 2, 3], )) for _ in range(8)]
+    threads.append(threading.Thread(target=caller, args=([4, 5], )))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(r['res'] for r in results) == [6] * 8 + [9]
+    # одинаковые входы - один вызов, отличающиеся - свой
+    assert sorted(calls) == [[1, 2, 3], [4, 5]]
+
+    # после завершения вызов выполняется заново
+    BaseInterpreter.evaluate(Alg, params=dict(a=[1, 2, 3]))
+    assert len(calls) == 3
+    clear()
+
+
+def test_cancellation_is_not_shared():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    res = Parameter(name='res', type_=types.Numeric)
+
+    def slow(a):
+        time.sleep(0.1)
+        return a + 1
+
+    Slow = Action('Slow', [a], [res])
+    Implementation(action=Slow, engine='python', function=slow)
+    Alg = MagicAlgorithmBuilder.build('Alg', [a], [res], builder=lambda a: Slow(Slow(Slow(a))))
+    SingleFlight(Alg)
+
+    outcomes = dict()
+
+    def caller(name, deadline):
+        try:
+            outcomes[name] = BaseInterpreter.evaluate(Alg, params=dict(a=0), deadline=deadline)
+        except EvaluationCancelled as e:
+            outcomes[name] = e
+
+    # ведущий отменен своим deadline - ожидающий выполняет вызов сам
+    leader = threading.Thread(target=caller, args=('leader', 0.05))
+    follower = threading.Thread(target=caller, args=('follower', None))
+    leader.start()
+    time.sleep(0.02)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert isinstance(outcomes['leader'], EvaluationCancelled)
+    assert outcomes['follower'] == {'res': 3}
+
+    # ожидающий прерывается своим deadline, не дожидаясь ведущего
+    leader = threading.Thread(target=caller, args=('leader', None))
+    leader.start()
+    time.sleep(0.02)
+    start = time.time()
+    caller('follower', 0.05)
+    assert isinstance(outcomes['follower'], EvaluationCancelled)
+    assert time.time() - start < 0.2
+    leader.join()
+    assert outcomes['leader'] == {'res': 3}
+    clear()
+
+
+def test_contexts_are_not_merged():
+    clear()
+    a = Parameter(name='a', type_=types.Numeric)
+    ctx = Parameter(name='ctx', type_=types.ContextType)
+    res = Parameter(name='res', type_=types.Any)
+
+    calls = []
+
+    def tenant(a, ctx):
+        calls.append(ctx['tenant'])
+        time.sleep(0.1)
+        return ctx['tenant']
+
+    Tenant = Action('Tenant', [a, ctx], [res])
+    Implementation(action=Tenant, engine='python', function=tenant)
+    SingleFlight(Tenant)
+    ByTenant = Action('ByTenant', [a, ctx], [res])
+    Implementation(action=ByTenant, engine='python', function=tenant)
+    SingleFlight(ByTenant, context_key=lambda c: c['tenant'])
+
+    def run(action, contexts):
+        results = []
+        threads = [
+            threading.Thread(target=lambda c: results.append(
+                BaseInterpreter.evaluate(action, context=c, params=dict(a=1))['res']), args=(c, ))
+            for c in contexts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sorted(results)
+
+    # по умолчанию разные Контексты не объединяются, даже с одинаковыми данными
+    first, second = Context(tenant='x'), Context(tenant='y')
+    assert run(Tenant, [first, second, first]) == ['x', 'x', 'y']
+    assert sorted(calls) == ['x', 'y']
+
+    # отпечаток Контекста, заданный явно
+    del calls[:]
+    assert run(ByTenant, [Context(tenant='x'), Context(tenant='x'), Context(tenant='y')]) == ['x', 'x', 'y']
+    assert sorted(calls) == ['x', 'y']
+    clear()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.errors import InvalidDeclaration
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter
+from fictilis import types
+
+from ..base import clear
+
+
+def test_streaming_outlets(monkeypatch):
+    clear()
+    monkeypatch.setattr(BaseInterpreter, 'stream_buffer', 4)
+    n = Parameter(name='n', type_=types.Numeric)
+    total = Parameter(name='total', type_=types.Numeric)
+    rows = Parameter(name='rows', type_=types.Stream(types.Numeric))
+
+    produced = []
+    ahead = []
+
+    def read_rows(n):
+        for i in range(int(n)):
+            produced.append(i)
+            yield str(i)
+
+    def double(rows):
+        for row in rows:
+            yield row * 2
+
+    def summarize(rows):
+        result = 0
+        for i, row in enumerate(rows):
+            ahead.append(len(produced) - i)
+            result += row
+        return result
+
+    ReadRows = Action('ReadRows', [n], [rows], pure=True)
+    Double = Action('Double', [rows], [rows], pure=True)
+    Summarize = Action('Summarize', [rows], [total], pure=True)
+    Implementation(action=ReadRows, engine='python', function=read_rows)
+    Implementation(action=Double, engine='python', function=double)
+    Implementation(action=Summarize, engine='python', function=summarize)
+
+    Pipeline = MagicAlgorithmBuilder.build('Pipeline', [n], [total], builder=lambda n: Summarize(Double(ReadRows(n))))
+    assert BaseInterpreter.evaluate(Pipeline, params=dict(n=1000))['total'] == 2 * sum(range(1000))
+    # производитель не уходит дальше буфера (по буферу на каждую связь + элементы "в руках")
+    assert max(ahead) <= 2 * 4 + 4
+
+    # поток - результат Алгоритма: элементы приходят до окончания производства
+    Rows = MagicAlgorithmBuilder.build('Rows', [n], [rows], builder=lambda n: Double(ReadRows(n)))
+    del produced[:]
+    stream = BaseInterpreter.evaluate(Rows, params=dict(n=10 ** 6))['rows']
+    assert next(stream) == 0.
+    assert next(stream) == 2.
+    assert len(produced) < 10 ** 6
+    stream.close()
+
+    def consumed_twice(n):
+        rows = ReadRows(n)
+        Summarize(rows)
+        return Summarize(rows)
+
+    with pytest.raises(InvalidDeclaration):
+        MagicAlgorithmBuilder.build('Twice', [n], [total], builder=consumed_twice)
+    clear()
+
+
+def test_streams_closed_with_run(monkeypatch):
+    clear()
+    monkeypatch.setattr(BaseInterpreter, 'stream_buffer', 4)
+    n = Parameter(name='n', type_=types.Numeric)
+    total = Parameter(name='total', type_=types.Numeric)
+    rows = Parameter(name='rows', type_=types.Stream(types.Numeric))
+
+    closed = threading.Event()
+
+    def read_rows(n):
+        try:
+            for i in range(int(n)):
+                yield i
+        finally:
+            closed.set()
+
+    def first(rows):
+        return next(rows)
+
+    def broken(rows):
+        next(rows)
+        raise RuntimeError('consumer failed')
+
+    ReadRows = Action('ReadRows', [n], [rows])
+    First = Action('First', [rows], [total])
+    Broken = Action('Broken', [rows], [total])
+    Implementation(action=ReadRows, engine='python', function=read_rows)
+    Implementation(action=First, engine='python', function=first)
+    Implementation(action=Broken, engine='python', function=broken)
+
+    def wait_closed():
+        deadline = time.time() + 1
+        while not closed.is_set() and time.time() < deadline:
+            time.sleep(0.01)
+        return closed.is_set()
+
+    # потребитель прочитал не весь поток: производитель останавливается по завершении запуска
+    Head = MagicAlgorithmBuilder.build('Head', [n], [total], builder=lambda n: First(ReadRows(n)))
+    assert BaseInterpreter.evaluate(Head, params=dict(n=10 ** 6)) == {'total': 0}
+    assert wait_closed()
+
+    # ...и при ошибке Шага
+    closed.clear()
+    Failing = MagicAlgorithmBuilder.build('Failing', [n], [total], builder=lambda n: Broken(ReadRows(n)))
+    with pytest.raises(RuntimeError):
+        BaseInterpreter.evaluate(Failing, params=dict(n=10 ** 6))
+    assert wait_closed()
+    clear()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from fictilis.action import Action, Implementation
+from fictilis.algbuilder import MagicAlgorithmBuilder
+from fictilis.context import Context
+from fictilis.interpreter import BaseInterpreter
+from fictilis.parameter import Parameter, context_parameter
+from fictilis.workload import WorkloadRecorder, read_workload, replay
+from fictilis import types
+
+from ..base import clear
+
+
+def test_capture_and_replay(monkeypatch):
+    clear()
+    res = Parameter(name='res', type_=types.Numeric)
+    a = Parameter(name='a', type_=types.Numeric)
+    b = Parameter(name='b', type_=types.Numeric)
+
+    SumA = Action('Sum', [a, b, context_parameter], [res])
+    MultiA = Action('Multi', [a, b], [res])
+    Implementation(action=SumA, engine='python', function=lambda a, b, context: a + b)
+    Implementation(action=SumA, engine='broken', function=lambda a, b, context: a + b + (a > 5))
+    Implementation(action=MultiA, engine='python', function=lambda a, b: a * b)
+    Implementation(action=MultiA, engine='broken', function=lambda a, b: a * b)
+    Alg = MagicAlgorithmBuilder.build('Alg', [a, b], [res], builder=lambda a, b: MultiA(SumA(a, b), b))
+
+    path = os.path.join(tempfile.mkdtemp(), 'workload.gz')
+    recorder = WorkloadRecorder(path, max_records=8, capture_steps=True)
+    monkeypatch.setattr(BaseInterpreter, 'recorder', recorder)
+    for i in range(10):
+        BaseInterpreter.evaluate(Alg, context=Context(engine='python'), params=dict(a=i, b=2))
+    recorder.close()
+    monkeypatch.setattr(BaseInterpreter, 'recorder', None)
+
+    records = list(read_workload(path))
+    assert len(records) == 8
+    assert records[3]['action'] == 'Alg'
+    assert records[3]['engine'] == 'python'
+    assert records[3]['params'] == dict(a=3, b=2)
+    assert records[3]['result'] == dict(res=10)
+    # Контекст не записывается
+    assert records[3]['steps'][(0, )] == (dict(a=3, b=2), dict(res=5))
+
+    report = replay(path)
+    assert report.calls == 8
+    assert not report.errors and not report.mismatches
+    assert report.percentile(50) is not None and report.throughput > 0
+
+    report = replay(path, engine='broken')
+    assert [m[0] for m in report.mismatches] == [6, 7]
+    assert 'mismatch in #6 Alg' in str(report)
+
+    limited = WorkloadRecorder(os.path.join(tempfile.mkdtemp(), 'limited.gz'), max_bytes=300)
+    monkeypatch.setattr(BaseInterpreter, 'recorder', limited)
+    for i in range(10):
+        BaseInterpreter.evaluate(Alg, context=Context(), params=dict(a=i, b=2))
+    limited.close()
+    assert 0 < limited.records < 10 and limited.full
+    clear()